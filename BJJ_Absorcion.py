@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+#BJJ_Absorcion - Tiempo hasta la sumisión con la cadena de posiciones absorbente y álgebra lineal dispersa
+"""
+Cadena de Markov sobre las posiciones de la red compilada (posA, posO) para un enfrentamiento, con la energía de cada
+luchador fija (la inicial, salvo que se indique otra). Cada paso es una técnica ejecutada; sus probabilidades salen de
+ModeloExacto (elección uniforme, iniciativa y éxito en forma cerrada). Son absorbentes:
+
+    SUMISION_A / SUMISION_O   una sumisión exitosa (categoría "sumisión" del grafo)
+    ESTANCADO                 ninguno de los dos tiene técnicas habilitadas
+
+Con Q (transitorio -> transitorio) y R (transitorio -> absorbente) dispersos se resuelven con una factorización LU de
+(I - Q) la probabilidad de absorción, los pasos esperados y los segundos esperados hasta la absorción (total y
+condicionados a cada sumisión). La distribución completa se obtiene con productos matriz-vector: por pasos, y por
+segundos separando Q y R según el avance de tiempo de cada transición (las de avance 0, la sumisión no mantenida que
+dispara su versión fallida, se cierran con la misma factorización sobre Q_0).
+
+La energía no baja en esta cadena, así que es una aproximación del simulador (que sí la gasta); comparar_simulado
+la pone junto a la distribución de tiempo_combate de Resultados_analisis.py.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from BJJ_Exacto import SUMISION_A, SUMISION_O, ModeloExacto
+from BJJ_Motor import MAX_TIEMPO
+from BJJ_Perfil import factor_energia_exito
+
+ESTANCADO = "estancado"
+ABSORBENTES = [SUMISION_A, SUMISION_O, ESTANCADO]
+
+
+class CadenaAbsorcion:
+    """Cadena de posiciones absorbente de un enfrentamiento A vs O con energías fijas."""
+
+    def __init__(self, red, catalogo, A, O, energia_A=None, energia_O=None):
+        self.red = red
+        self.modelo = ModeloExacto(red, catalogo, A, O)
+        self.energia = {
+            "A": energia_A if energia_A is not None else self.modelo.energia_inicial["A"],
+            "O": energia_O if energia_O is not None else self.modelo.energia_inicial["O"]
+        }
+
+        #estados transitorios alcanzables desde el inicial, en orden de descubrimiento (el inicial es el 0)
+        self.estados = [red.estado_inicial]
+        self.indice = {red.estado_inicial: 0}
+        filas, columnas, probs, avances, absorbe = [], [], [], [], []
+        i = 0
+        while i < len(self.estados):
+            for p, destino, avance in self._pasos_estado(self.estados[i]):
+                if destino in ABSORBENTES:
+                    absorbe.append((i, ABSORBENTES.index(destino), avance, p))
+                    continue
+                if destino not in self.indice:
+                    self.indice[destino] = len(self.estados)
+                    self.estados.append(destino)
+                filas.append(i)
+                columnas.append(self.indice[destino])
+                probs.append(p)
+                avances.append(avance)
+            i += 1
+
+        n = len(self.estados)
+        filas, columnas = np.array(filas, dtype=np.int64), np.array(columnas, dtype=np.int64)
+        probs, avances = np.array(probs), np.array(avances, dtype=np.int64)
+        a_filas = np.array([a[0] for a in absorbe], dtype=np.int64)
+        a_columnas = np.array([a[1] for a in absorbe], dtype=np.int64)
+        a_avances = np.array([a[2] for a in absorbe], dtype=np.int64)
+        a_probs = np.array([a[3] for a in absorbe])
+
+        def matriz(f, c, v, forma):
+            return sp.csr_matrix((v, (f, c)), shape=forma)
+
+        forma_Q, forma_R = (n, n), (n, len(ABSORBENTES))
+        self.Q = matriz(filas, columnas, probs, forma_Q)
+        self.R = matriz(a_filas, a_columnas, a_probs, forma_R)
+        #mismas matrices ponderadas por el avance de tiempo de cada transición
+        self.Q_tiempo = matriz(filas, columnas, probs * avances, forma_Q)
+        self.R_tiempo = matriz(a_filas, a_columnas, a_probs * a_avances, forma_R)
+        #separadas por avance de tiempo, para la distribución en segundos
+        self.Q_avance = {
+            int(k): matriz(filas[avances == k], columnas[avances == k], probs[avances == k], forma_Q)
+            for k in np.unique(avances)
+        }
+        self.R_avance = {
+            int(k): matriz(a_filas[a_avances == k], a_columnas[a_avances == k], a_probs[a_avances == k], forma_R)
+            for k in np.unique(a_avances)
+        }
+        self._lu = splu(sp.identity(n, format="csc") - self.Q.tocsc())
+
+    #pasos desde un estado: lista de (prob, destino, avance) con destino = estado compilado o absorbente
+    def _pasos_estado(self, estado):
+        hab_A = self.modelo.habilitados["A"][estado]
+        hab_O = self.modelo.habilitados["O"][estado]
+        if not hab_A and not hab_O:
+            return [(1.0, ESTANCADO, 0)]
+        peso_A, peso_O = self.modelo.pesos(estado, self.energia["A"], self.energia["O"])
+
+        acumulado = {}
+        for actor, movs, pesos in (("A", hab_A, peso_A), ("O", hab_O, peso_O)):
+            for m, peso in zip(movs, pesos.tolist()):
+                if peso <= 0:
+                    continue
+                for p, destino, avance in self._pasos_movimiento(actor, m):
+                    clave = (destino, avance)
+                    acumulado[clave] = acumulado.get(clave, 0.0) + peso * p
+        return [(p, destino, avance) for (destino, avance), p in acumulado.items() if p > 0]
+
+    #desenlaces de una técnica como (prob, destino, avance), con las mismas reglas que BJJ_Motor.ejecutar_tecnica
+    def _pasos_movimiento(self, actor, m):
+        modelo = self.modelo
+        perfil = modelo.perfiles[actor]
+        info = modelo.info[m]
+        P = min(1.0, max(0.0, perfil.prob_base[modelo.fila[m]] * factor_energia_exito(self.energia[actor])))
+        tiempo_ejec = info["tiempo_ejecucion_s"]
+        mantencion = modelo.mantencion[m]
+        dest_exito = self.red.siguiente(m, True)
+        dest_fallo = self.red.siguiente(m, False)
+        salida = []
+
+        def fallo(prob):
+            if self.red.mov_fallido[m] is not None:
+                salida.extend((prob * p, dest_fallo, tiempo_ejec + aj) for aj, _, p in mantencion)
+            else:
+                salida.append((prob, dest_fallo, 1))
+
+        if info["categoria"] == "sumisión":
+            gana = SUMISION_A if actor == "A" else SUMISION_O
+            p_mantenida = sum(p for _, mantenida, p in mantencion if mantenida)
+            #primer sorteo: termina si se mantiene (sumando ejecución y mantención), si no, fallida sin costo
+            salida.extend((P * p, gana, tiempo_ejec + aj) for aj, mantenida, p in mantencion if mantenida)
+            if p_mantenida < 1:
+                salida.append((P * (1 - p_mantenida), dest_fallo, 0))
+            #segundo sorteo (regla general): el éxito termina el combate con cualquier mantención
+            salida.extend(((1 - P) * P * p, gana, tiempo_ejec + aj) for aj, _, p in mantencion)
+            fallo((1 - P) * (1 - P))
+        else:
+            salida.extend((P * p, dest_exito, tiempo_ejec + aj) for aj, _, p in mantencion)
+            fallo(1 - P)
+        return salida
+
+    def __len__(self):
+        return len(self.estados)
+
+    #(I - Q)^-1 b desde el estado inicial
+    def _fundamental(self, b):
+        return self._lu.solve(np.asarray(b, dtype=np.float64))
+
+    def resumen(self):
+        """
+        Probabilidad de cada absorción y pasos / segundos esperados desde el estado inicial, sin límite de tiempo.
+        Los esperados condicionados a una absorción con probabilidad 0 quedan en NaN.
+        """
+        unos = np.ones(len(self))
+        absorcion = np.column_stack([self._fundamental(self.R[:, j].toarray().ravel()) for j in range(len(ABSORBENTES))])
+        #segundos de cada paso: transiciones a transitorios y a absorbentes
+        segundos_paso = self.Q_tiempo @ unos + self.R_tiempo @ np.ones(len(ABSORBENTES))
+
+        resultado = {
+            "estados_transitorios": len(self),
+            "pasos_esperados": float(self._fundamental(unos)[0]),
+            "segundos_esperados": float(self._fundamental(segundos_paso)[0])
+        }
+        for j, nombre in enumerate(ABSORBENTES):
+            h = absorcion[:, j]
+            p = float(h[0])
+            #sumisiones como fracción del total de combates (frac_sumision_*, como en BJJ_Estadisticas.PROPORCIONES)
+            resultado[f"frac_{nombre}" if nombre in (SUMISION_A, SUMISION_O) else f"prob_{nombre}"] = p
+            #E[T · 1{absorbe en j}] = (I - Q)^-1 (Q h) para pasos y (I - Q)^-1 (Qτ h + Rτ e_j) para segundos
+            pasos = self._fundamental(self.Q @ h + self.R[:, j].toarray().ravel())[0]
+            segundos = self._fundamental(self.Q_tiempo @ h + self.R_tiempo[:, j].toarray().ravel())[0]
+            resultado[f"pasos_{nombre}"] = float(pasos / p) if p > 0 else float("nan")
+            resultado[f"segundos_{nombre}"] = float(segundos / p) if p > 0 else float("nan")
+        return resultado
+
+    def distribucion_pasos(self, max_pasos=200):
+        """P(absorción en el paso n) para n = 1..max_pasos, matriz [max_pasos, absorbentes]."""
+        v = np.zeros(len(self))
+        v[0] = 1.0
+        QT, RT = self.Q.T.tocsr(), self.R.T.tocsr()
+        salida = np.zeros((max_pasos, len(ABSORBENTES)))
+        for n in range(max_pasos):
+            salida[n] = RT @ v
+            v = QT @ v
+        return salida
+
+    def distribucion_segundos(self, max_tiempo=MAX_TIEMPO):
+        """
+        Distribución en segundos con el corte del simulador: solo se ejecutan técnicas que empiezan antes de
+        max_tiempo. Retorna (absorcion, corte): absorcion[t, j] = P(absorbe en j al segundo t) y corte[t] = P(el
+        combate termina por tiempo al segundo t, con t >= max_tiempo).
+        """
+        n = len(self)
+        horizonte = max_tiempo + max(max(self.Q_avance, default=0), max(self.R_avance, default=0)) + 1
+        entrante = np.zeros((horizonte, n))
+        entrante[0, 0] = 1.0
+        absorcion = np.zeros((horizonte, len(ABSORBENTES)))
+        QT = {k: Q.T.tocsr() for k, Q in self.Q_avance.items()}
+        RT = {k: R.T.tocsr() for k, R in self.R_avance.items()}
+        lu_0 = splu(sp.identity(n, format="csc") - QT[0].tocsc()) if 0 in QT else None
+
+        for t in range(max_tiempo):
+            #cierre de las transiciones sin avance de tiempo dentro del mismo segundo
+            v = lu_0.solve(entrante[t]) if lu_0 is not None else entrante[t]
+            for k, R in RT.items():
+                absorcion[t + k] += R @ v
+            for k, Q in QT.items():
+                if k > 0:
+                    entrante[t + k] += Q @ v
+
+        corte = entrante.sum(axis=1)
+        corte[:max_tiempo] = 0.0
+        return absorcion, corte
+
+
+#duración del combate según la cadena (absorción o corte por tiempo) junto a tiempo_combate simulado
+def comparar_simulado(cadena, resumen_csv, max_tiempo=MAX_TIEMPO):
+    absorcion, corte = cadena.distribucion_segundos(max_tiempo)
+    duracion = absorcion.sum(axis=1) + corte
+    tiempos = np.arange(len(duracion))
+
+    simulado = pd.read_csv(resumen_csv)["tiempo_combate"].to_numpy()
+    frecuencia = np.bincount(np.clip(simulado, 0, len(duracion) - 1).astype(np.int64), minlength=len(duracion))
+
+    tabla = pd.DataFrame({
+        "tiempo": tiempos,
+        "frac_sumision_A": absorcion[:, 0],
+        "frac_sumision_O": absorcion[:, 1],
+        "prob_estancado": absorcion[:, 2],
+        "prob_corte_tiempo": corte,
+        "prob_duracion": duracion,
+        "frec_simulada": frecuencia / max(len(simulado), 1)
+    })
+
+    acumulada = np.cumsum(duracion)
+    resumen = {
+        "tiempo_promedio_cadena": float((tiempos * duracion).sum()),
+        "tiempo_mediana_cadena": int(np.searchsorted(acumulada, 0.5)),
+        "tiempo_promedio_simulado": float(simulado.mean()) if len(simulado) else float("nan"),
+        "tiempo_mediana_simulado": float(np.median(simulado)) if len(simulado) else float("nan"),
+        "combates_simulados": int(len(simulado))
+    }
+    return tabla, resumen
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Absorcion.py Experimentos/Inputs/Caso1.json "Caso de estudio 1"
+if __name__ == "__main__":
+    from BJJ_Catalogo import cargar_catalogo
+    from BJJ_Experimentos import cargar_caso, cargar_red
+
+    caso_json = sys.argv[1] if len(sys.argv) > 1 else "Experimentos/Inputs/Caso1.json"
+    caso = sys.argv[2] if len(sys.argv) > 2 else "Caso de estudio 1"
+    A, O = cargar_caso(caso_json)
+    cadena = CadenaAbsorcion(cargar_red(), cargar_catalogo("Input/Grafo_Explicito.csv"), A, O)
+
+    for clave, valor in cadena.resumen().items():
+        print(f"{clave}: {valor}")
+
+    carpeta = os.path.join("Experimentos", "Analisis", caso)
+    resumen_csv = os.path.join(carpeta, "resumen_por_archivo.csv")
+    if os.path.exists(resumen_csv):
+        tabla, comparacion = comparar_simulado(cadena, resumen_csv)
+        tabla.to_csv(os.path.join(carpeta, "absorcion_tiempos.csv"), index=False)
+        for clave, valor in comparacion.items():
+            print(f"{clave}: {valor}")
+    else:
+        print(f"No existe {resumen_csv}; ejecutar antes Resultados_analisis.py para comparar con lo simulado.")
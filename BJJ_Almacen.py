@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#BJJ_Almacen - Almacén de resultados por caso de estudio: archivos binarios de solo anexado
+"""
+Cada caso de estudio tiene una carpeta con dos archivos en el formato de BJJ_LogBinario (encabezado con las tablas de
+nombres y registros de ancho fijo):
+
+    combates.bjjstore   un registro COMBATE por combate: match_id, semilla, bloque, hash_config y resultado
+    eventos.bjjstore    un registro EVENTO por evento del combate, identificado por match_id
+
+Los lotes se anexan con O_APPEND bajo un flock exclusivo, así varios workers pueden escribir en paralelo sin
+pisarse; si un proceso murió a mitad de una escritura, el siguiente recorta el registro incompleto antes de anexar.
+Los eventos de un lote se escriben antes que sus combates, de modo que el archivo de combates hace de confirmación:
+cada registro de combate guarda en fin_eventos la cantidad de eventos que tenía eventos.bjjstore al confirmar su
+lote. Los eventos posteriores al fin_eventos del último combate son de un lote cuyo guardado se interrumpió antes de
+escribir sus combates: al leer se ignoran y el siguiente guardado los recorta antes de anexar, así reintentar ese
+bloque no deja sus eventos dos veces.
+
+El match_id se deriva de (hash_config, semilla, bloque) más la posición del combate en el bloque, por lo que es
+estable entre ejecuciones y no depende de la hora (los registro_bjj_%Y%m%d_%H%M%S.csv se pisaban si dos combates
+terminaban en el mismo segundo). Por lo mismo un bloque (hash_config, semilla, bloque) se escribe una sola vez: volver
+a guardar el mismo caso con la misma semilla en la misma carpeta duplicaría sus match_id, así que agregar_lote y
+agregar_combates lo rechazan con ValueError (revisando bajo el flock los combates anexados por otros procesos).
+cargar_almacen lee el caso completo en una sola carga.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from BJJ_LogBinario import (REGISTRO, Codificador, decodificar, encabezado, leer_encabezado,
+                            mapear_registros)
+
+ARCHIVO_COMBATES = "combates.bjjstore"
+ARCHIVO_EVENTOS = "eventos.bjjstore"
+
+#bits bajos del match_id reservados para la posición del combate dentro del bloque
+BITS_BLOQUE = 24
+#registros de combates leídos por llamada al actualizar los bloques existentes
+REGISTROS_LECTURA = 1 << 20
+
+EVENTO = np.dtype([("match_id", "<u8")] + [(nombre, REGISTRO.fields[nombre][0]) for nombre in REGISTRO.names[1:]])
+
+COMBATE = np.dtype([
+    ("match_id", "<u8"),
+    ("semilla", "<i8"),
+    ("bloque", "<i4"),
+    ("hash_config", "<u8"),
+    ("tiempo", "<i4"),
+    ("puntaje_A", "<i4"),
+    ("puntaje_O", "<i4"),
+    ("pasos", "<i4"),
+    ("ganador", "i1"),     #0 = sin ganador, 1 = A, 2 = O (códigos de BJJ_Lote)
+    ("sumision", "u1"),
+    ("fin_eventos", "<u8")  #eventos en eventos.bjjstore al confirmar el lote del combate
+])
+
+GANADORES = {None: 0, "A": 1, "O": 2}
+
+
+#hash de la configuración de un combate (luchadores y horizonte), como entero de 64 bits
+def hash_configuracion(A, O, max_tiempo):
+    texto = json.dumps({"A": A, "O": O, "max_tiempo": max_tiempo}, sort_keys=True, ensure_ascii=False)
+    return int.from_bytes(hashlib.sha256(texto.encode("utf-8")).digest()[:8], "little")
+
+
+#match_id de los n combates de un bloque
+def ids_bloque(hash_config, semilla, bloque, n):
+    if n > 1 << BITS_BLOQUE:
+        raise ValueError(f"Un bloque del almacén admite a lo más {1 << BITS_BLOQUE} combates")
+    clave = f"{hash_config}:{semilla}:{bloque}".encode("utf-8")
+    base = int.from_bytes(hashlib.blake2b(clave, digest_size=8).digest(), "little")
+    base &= ~((1 << BITS_BLOQUE) - 1) & ((1 << 64) - 1)
+    return np.uint64(base) + np.arange(n, dtype=np.uint64)
+
+
+class Almacen:
+    """Escritor de solo anexado del almacén de un caso (carpeta con combates.bjjstore y eventos.bjjstore)."""
+
+    def __init__(self, carpeta, red):
+        self.carpeta = carpeta
+        self.codificador = Codificador(red)
+        self.ruta_combates = os.path.join(carpeta, ARCHIVO_COMBATES)
+        self.ruta_eventos = os.path.join(carpeta, ARCHIVO_EVENTOS)
+        os.makedirs(carpeta, exist_ok=True)
+        self._inicio = {
+            self.ruta_combates: self._preparar(self.ruta_combates, "combates"),
+            self.ruta_eventos: self._preparar(self.ruta_eventos, "eventos")
+        }
+        #bloques ya escritos (match_id >> BITS_BLOQUE) y bytes de combates.bjjstore ya revisados
+        self._bloques = set()
+        self._leido = self._inicio[self.ruta_combates]
+
+    #crea el archivo con su encabezado (de forma atómica, con os.link) o valida el encabezado existente
+    def _preparar(self, ruta, tipo):
+        diccionario = dict(self.codificador.diccionario, registro=tipo)
+        if not os.path.exists(ruta):
+            fd, temporal = tempfile.mkstemp(dir=self.carpeta)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(encabezado(diccionario))
+                try:
+                    os.link(temporal, ruta)
+                except FileExistsError:
+                    pass    #otro proceso lo creó primero
+            finally:
+                os.remove(temporal)
+
+        existente, inicio = leer_encabezado(ruta)
+        if existente != diccionario:
+            raise ValueError(f"{ruta} fue escrito con otra red o es de otro tipo de registro")
+        return inicio
+
+    #descriptor del archivo con un flock exclusivo tomado
+    @contextmanager
+    def _bloqueo(self, ruta):
+        fd = os.open(ruta, os.O_RDWR | os.O_APPEND)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    #anexa los bytes de un lote completo en un archivo ya bloqueado
+    def _escribir(self, fd, ruta, registros):
+        datos = memoryview(registros.tobytes())
+        #registro incompleto de una escritura interrumpida: se descarta antes de anexar
+        sobrante = (os.fstat(fd).st_size - self._inicio[ruta]) % registros.dtype.itemsize
+        if sobrante:
+            os.ftruncate(fd, os.fstat(fd).st_size - sobrante)
+        while datos:
+            escritos = os.write(fd, datos)
+            datos = datos[escritos:]
+
+    #eventos confirmados: el fin_eventos del último combate completo (con combates.bjjstore bloqueado)
+    def _eventos_confirmados(self, fd):
+        ancho = COMBATE.itemsize
+        completos = (os.fstat(fd).st_size - self._inicio[self.ruta_combates]) // ancho
+        if completos == 0:
+            return 0
+        ultimo = os.pread(fd, ancho, self._inicio[self.ruta_combates] + (completos - 1) * ancho)
+        return int(np.frombuffer(ultimo, dtype=COMBATE)["fin_eventos"][0])
+
+    #recorta eventos.bjjstore a los eventos confirmados (descarta los de un guardado interrumpido), anexa los del lote
+    #y retorna la cantidad total de eventos, que es el fin_eventos de sus combates
+    def _anexar_eventos(self, eventos, confirmados):
+        with self._bloqueo(self.ruta_eventos) as fd:
+            fin = self._inicio[self.ruta_eventos] + confirmados * EVENTO.itemsize
+            if os.fstat(fd).st_size > fin:
+                os.ftruncate(fd, fin)
+            if eventos is not None and len(eventos):
+                self._escribir(fd, self.ruta_eventos, eventos)
+            return (os.fstat(fd).st_size - self._inicio[self.ruta_eventos]) // EVENTO.itemsize
+
+    #agrega a los bloques conocidos los combates anexados desde la última revisión (con combates.bjjstore bloqueado)
+    def _actualizar_bloques(self, fd):
+        ancho = COMBATE.itemsize
+        completos = (os.fstat(fd).st_size - self._leido) // ancho
+        while completos > 0:
+            n = min(completos, REGISTROS_LECTURA)
+            ids = np.frombuffer(os.pread(fd, n * ancho, self._leido), dtype=COMBATE)["match_id"]
+            self._bloques.update(np.unique(ids >> np.uint64(BITS_BLOQUE)).tolist())
+            self._leido += n * ancho
+            completos -= n
+
+    #rechaza un bloque que ya está en el almacén (sus match_id quedarían duplicados)
+    def _verificar_bloque(self, fd, ids, semilla, bloque):
+        self._actualizar_bloques(fd)
+        if int(ids[0]) >> BITS_BLOQUE in self._bloques:
+            raise ValueError(
+                f"El bloque {bloque} de la semilla {semilla} con esta configuración ya está en {self.carpeta}; "
+                f"use otra semilla u otra carpeta para no duplicar sus match_id"
+            )
+
+    #escribe eventos y combates de un bloque nuevo; combates.bjjstore queda bloqueado durante toda la escritura para
+    #que dos procesos no puedan guardar el mismo bloque a la vez
+    def _guardar_bloque(self, ids, semilla, bloque, eventos, combates):
+        with self._bloqueo(self.ruta_combates) as fd:
+            self._verificar_bloque(fd, ids, semilla, bloque)
+            combates["fin_eventos"] = self._anexar_eventos(eventos, self._eventos_confirmados(fd))
+            self._escribir(fd, self.ruta_combates, combates)
+            self._leido = os.fstat(fd).st_size
+            self._bloques.add(int(ids[0]) >> BITS_BLOQUE)
+
+    def agregar_lote(self, resultado, semilla, bloque, hash_config):
+        """
+        Anexa un resultado de MotorLote.simular (los eventos solo si se simuló con registrar_eventos=True).
+        Retorna los match_id asignados; ValueError si el bloque ya está en el almacén.
+        """
+        n = len(resultado["ganador"])
+        ids = ids_bloque(hash_config, semilla, bloque, n)
+        eventos = None
+        if "eventos" in resultado:
+            pasos = [self.codificador.paso(e, ids[e["combate"]], EVENTO, "match_id") for e in resultado["eventos"]]
+            if pasos:
+                eventos = np.concatenate(pasos)
+
+        combates = np.zeros(n, dtype=COMBATE)
+        combates["match_id"] = ids
+        combates["semilla"] = semilla
+        combates["bloque"] = bloque
+        combates["hash_config"] = hash_config
+        for campo in ("tiempo", "puntaje_A", "puntaje_O", "pasos", "ganador", "sumision"):
+            combates[campo] = resultado[campo]
+        self._guardar_bloque(ids, semilla, bloque, eventos, combates)
+        return ids
+
+    def agregar_combates(self, resultados, semilla, hash_config, bloque=0):
+        """
+        Anexa una lista de resultados de Simulador.combate() (con su "registro"). Retorna los match_id asignados;
+        ValueError si el bloque ya está en el almacén.
+        """
+        ids = ids_bloque(hash_config, semilla, bloque, len(resultados))
+        eventos = [e for r in resultados for e in r["registro"]]
+        ids_eventos = np.repeat(ids, [len(r["registro"]) for r in resultados])
+        eventos = self.codificador.eventos(eventos, ids_eventos, EVENTO, "match_id")
+
+        combates = np.zeros(len(resultados), dtype=COMBATE)
+        combates["match_id"] = ids
+        combates["semilla"] = semilla
+        combates["bloque"] = bloque
+        combates["hash_config"] = hash_config
+        combates["tiempo"] = [r["tiempo"] for r in resultados]
+        combates["puntaje_A"] = [r["puntaje_A"] for r in resultados]
+        combates["puntaje_O"] = [r["puntaje_O"] for r in resultados]
+        combates["pasos"] = [len(r["registro"]) for r in resultados]
+        combates["ganador"] = [GANADORES[r["ganador"]] for r in resultados]
+        combates["sumision"] = [r["sumision"] is not None for r in resultados]
+        self._guardar_bloque(ids, semilla, bloque, eventos, combates)
+        return ids
+
+
+#True si la carpeta tiene un almacén
+def existe_almacen(carpeta):
+    return os.path.exists(os.path.join(carpeta, ARCHIVO_COMBATES))
+
+
+#registros del almacén como np.memmap: (combates, eventos confirmados, diccionario de nombres)
+def leer_almacen(carpeta):
+    ruta_combates = os.path.join(carpeta, ARCHIVO_COMBATES)
+    ruta_eventos = os.path.join(carpeta, ARCHIVO_EVENTOS)
+    diccionario, inicio = leer_encabezado(ruta_combates)
+    combates = mapear_registros(ruta_combates, COMBATE, inicio)
+    eventos = np.zeros(0, dtype=EVENTO)
+    if os.path.exists(ruta_eventos):
+        _, inicio = leer_encabezado(ruta_eventos)
+        eventos = mapear_registros(ruta_eventos, EVENTO, inicio)
+        #los eventos después del fin_eventos del último combate son de un lote sin confirmar
+        eventos = eventos[:int(combates["fin_eventos"][-1]) if len(combates) else 0]
+    return combates, eventos, diccionario
+
+
+#caso completo en una carga: (DataFrame de combates, DataFrame de eventos con las columnas de los CSV + match_id)
+def cargar_almacen(carpeta):
+    combates, eventos, diccionario = leer_almacen(carpeta)
+    return pd.DataFrame(np.asarray(combates)), decodificar(eventos, diccionario, "match_id")
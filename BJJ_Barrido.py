@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+#BJJ_Barrido - Barrido paralelo de atributos de los luchadores con resultados en un cubo N-dimensional en disco
+"""
+Un barrido parte de un caso (Experimentos/Inputs/Caso*.json) y cambia atributos de los luchadores (ejes "A.fueAt",
+"O.velDef", "A.energy", ...) según un diseño:
+
+    grilla(ejes)                             producto cartesiano, un eje del cubo por atributo
+    hipercubo_latino(rangos, n_puntos)       muestreo por hipercubo latino, cubo de un solo eje "punto"
+
+Cada punto simula n_matches combates con MotorLote en un pool de procesos. Todos los puntos usan la misma semilla
+(números aleatorios comunes), así las superficies de probabilidad salen suaves y la diferencia entre puntos vecinos
+refleja el cambio de atributos y no el ruido de muestreo.
+
+El cubo es una carpeta con cubo.json (dimensiones, coordenadas, caso, combates y semilla) y un .npy por métrica con
+la forma del diseño, más <métrica>_semiancho.npy con el semiancho del intervalo de confianza al 95% y hecho.npy con
+los puntos terminados. Los arreglos se escriben con np.lib.format.open_memmap a medida que terminan los puntos, así
+un barrido interrumpido se retoma con la misma llamada y solo simula los puntos que faltan. cargar_cubo abre los
+arreglos como np.memmap con sus coordenadas (al estilo de xarray, sin depender de él).
+"""
+import copy
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from BJJ_Catalogo import cargar_catalogo
+from BJJ_Estadisticas import PROPORCIONES, MetricasCombates
+from BJJ_Experimentos import bloques, cargar_caso, cargar_red
+from BJJ_Lote import MotorLote
+from BJJ_Motor import MAX_TIEMPO
+
+ATRIBUTOS = ["fueAt", "fueDef", "velAt", "velDef", "energy"]
+#probabilidades sobre el total de combates y medias por combate
+METRICAS_CUBO = list(PROPORCIONES) + ["tiempo_combate", "puntaje_A", "puntaje_O", "mantencion_A", "mantencion_O",
+                                      "efectividad_A", "efectividad_O"]
+
+ARCHIVO_CUBO = "cubo.json"
+ARCHIVO_HECHO = "hecho.npy"
+TAMANO_BLOQUE_BARRIDO = 2_000
+
+#red, catálogo y horizonte del proceso actual (se cargan una vez por worker)
+_CONTEXTO = None
+
+
+#valida un eje "A.fueAt" y lo separa en (luchador, atributo)
+def separar_eje(eje):
+    luchador, _, atributo = eje.partition(".")
+    if luchador not in ("A", "O") or atributo not in ATRIBUTOS:
+        raise ValueError(f"Eje de barrido inválido: {eje} (se espera A|O.{'|'.join(ATRIBUTOS)})")
+    return luchador, atributo
+
+
+#la energía es entera en el motor (energia_A/O son arreglos int64)
+def _valor(eje, valor):
+    return int(round(valor)) if eje.endswith(".energy") else float(valor)
+
+
+def grilla(ejes):
+    """Diseño en grilla: ejes = {"A.fueAt": [1, 2, 3], ...}; una dimensión del cubo por eje, en ese orden."""
+    for eje in ejes:
+        separar_eje(eje)
+    coords = {eje: [_valor(eje, v) for v in valores] for eje, valores in ejes.items()}
+    return {
+        "dims": list(coords),
+        "coords": coords,
+        "puntos": [dict(zip(coords, combinacion)) for combinacion in itertools.product(*coords.values())]
+    }
+
+
+def hipercubo_latino(rangos, n_puntos, semilla=0):
+    """
+    Diseño por hipercubo latino: rangos = {"A.fueAt": (1, 5), ...}; cada eje se divide en n_puntos estratos y cada
+    estrato se usa una sola vez. El cubo tiene una dimensión "punto" y el valor de cada eje es una coordenada de ella.
+    """
+    rng = np.random.default_rng(semilla)
+    coords = {}
+    for eje, (minimo, maximo) in rangos.items():
+        separar_eje(eje)
+        estratos = (rng.permutation(n_puntos) + rng.random(n_puntos)) / n_puntos
+        coords[eje] = [_valor(eje, v) for v in minimo + estratos * (maximo - minimo)]
+    puntos = [{eje: coords[eje][i] for eje in coords} for i in range(n_puntos)]
+    return {"dims": ["punto"], "coords": coords, "puntos": puntos}
+
+
+#forma del cubo de un diseño
+def forma_diseno(diseno):
+    if diseno["dims"] == ["punto"]:
+        return (len(diseno["puntos"]),)
+    return tuple(len(diseno["coords"][eje]) for eje in diseno["dims"])
+
+
+#luchadores del caso con los atributos de un punto
+def aplicar_punto(A, O, punto):
+    luchadores = {"A": copy.deepcopy(A), "O": copy.deepcopy(O)}
+    for eje, valor in punto.items():
+        luchador, atributo = separar_eje(eje)
+        luchadores[luchador][atributo] = valor
+    return luchadores["A"], luchadores["O"]
+
+
+def _iniciar_worker(red, catalogo, max_tiempo):
+    global _CONTEXTO
+    _CONTEXTO = (red, catalogo, max_tiempo)
+
+
+#simula un punto (los mismos bloques y semillas para todos los puntos) y retorna sus estimaciones y semianchos
+def _simular_punto(args):
+    indice, A, O, n, semilla, tamano_bloque = args
+    red, catalogo, max_tiempo = _CONTEXTO
+    motor = MotorLote(red, catalogo, A, O, max_tiempo=max_tiempo)
+    agregado = MetricasCombates(semilla=semilla)
+    for semilla_bloque, n_bloque in bloques(n, semilla, tamano_bloque):
+        agregado.agregar_lote(motor.simular(n_bloque, np.random.default_rng(semilla_bloque)))
+    valores = {}
+    for metrica in METRICAS_CUBO:
+        estimacion, inferior, superior = agregado.intervalo(metrica)
+        valores[metrica] = (estimacion, (superior - inferior) / 2)
+    return indice, valores
+
+
+#abre (o crea) los arreglos del cubo en la carpeta; un cubo existente debe ser del mismo barrido
+def _abrir_cubo(carpeta, meta):
+    ruta_meta = os.path.join(carpeta, ARCHIVO_CUBO)
+    forma = tuple(meta["forma"])
+    if os.path.exists(ruta_meta):
+        with open(ruta_meta, "r", encoding="utf-8") as f:
+            existente = json.load(f)
+        if existente != meta:
+            raise ValueError(f"{carpeta} ya tiene un cubo de otro barrido (caso, diseño, combates o semilla)")
+        modo = "r+"
+    else:
+        os.makedirs(carpeta, exist_ok=True)
+        modo = "w+"
+
+    arreglos = {}
+    for nombre in METRICAS_CUBO + [f"{m}_semiancho" for m in METRICAS_CUBO]:
+        ruta = os.path.join(carpeta, f"{nombre}.npy")
+        arreglos[nombre] = np.lib.format.open_memmap(ruta, mode=modo, dtype=np.float64, shape=forma)
+        if modo == "w+":
+            arreglos[nombre][:] = np.nan
+    hecho = np.lib.format.open_memmap(os.path.join(carpeta, ARCHIVO_HECHO), mode=modo, dtype=bool, shape=forma)
+
+    #cubo.json se escribe al final: sin él la carpeta se vuelve a crear desde cero
+    if modo == "w+":
+        with open(ruta_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+    return arreglos, hecho
+
+
+def barrer(case_json, diseno, carpeta, n_matches=2_000, workers=1, semilla=0, red=None, catalogo=None,
+           tamano_bloque=TAMANO_BLOQUE_BARRIDO, max_tiempo=MAX_TIEMPO, verbose=False):
+    """
+    Simula n_matches combates en cada punto del diseño (grilla o hipercubo_latino) sobre el caso case_json y escribe
+    el cubo en carpeta. Si la carpeta ya tiene el mismo barrido, solo simula los puntos que faltan. Retorna cargar_cubo.
+    """
+    A, O = cargar_caso(case_json)
+    red = red if red is not None else cargar_red()
+    catalogo = catalogo if catalogo is not None else cargar_catalogo("Input/Grafo_Explicito.csv")
+
+    forma = forma_diseno(diseno)
+    meta = {
+        "caso": case_json,
+        "dims": diseno["dims"],
+        "forma": list(forma),
+        "coords": diseno["coords"],
+        "metricas": METRICAS_CUBO,
+        "n_combates": n_matches,
+        "semilla": semilla,
+        "tamano_bloque": tamano_bloque,
+        "max_tiempo": max_tiempo
+    }
+    arreglos, hecho = _abrir_cubo(carpeta, meta)
+
+    plano = hecho.reshape(-1)
+    tareas = [(i, *aplicar_punto(A, O, punto), n_matches, semilla, tamano_bloque)
+              for i, punto in enumerate(diseno["puntos"]) if not plano[i]]
+    if verbose:
+        print(f"Barrido: {len(tareas)} de {len(diseno['puntos'])} puntos por simular ({n_matches} combates c/u)")
+
+    #cada punto se escribe apenas termina; hecho se marca después de sus métricas
+    def guardar(indice, valores):
+        posicion = np.unravel_index(indice, forma)
+        for metrica, (estimacion, semiancho) in valores.items():
+            arreglos[metrica][posicion] = estimacion
+            arreglos[f"{metrica}_semiancho"][posicion] = semiancho
+        hecho[posicion] = True
+
+    terminados = 0
+    if workers <= 1:
+        _iniciar_worker(red, catalogo, max_tiempo)
+        resultados = map(_simular_punto, tareas)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                                   initargs=(red, catalogo, max_tiempo))
+        resultados = (futuro.result() for futuro in as_completed([pool.submit(_simular_punto, t) for t in tareas]))
+    try:
+        for indice, valores in resultados:
+            guardar(indice, valores)
+            terminados += 1
+            if terminados % 100 == 0:
+                for arreglo in list(arreglos.values()) + [hecho]:
+                    arreglo.flush()
+                if verbose:
+                    print(f"  {terminados}/{len(tareas)} puntos")
+    finally:
+        for arreglo in list(arreglos.values()) + [hecho]:
+            arreglo.flush()
+        if workers > 1:
+            pool.shutdown(cancel_futures=True)
+    return cargar_cubo(carpeta)
+
+
+def cargar_cubo(carpeta):
+    """Cubo de un barrido: {"dims", "coords", "forma", ..., "datos": {métrica: np.memmap}, "hecho": np.memmap}."""
+    with open(os.path.join(carpeta, ARCHIVO_CUBO), "r", encoding="utf-8") as f:
+        cubo = json.load(f)
+    nombres = cubo["metricas"] + [f"{m}_semiancho" for m in cubo["metricas"]]
+    cubo["datos"] = {nombre: np.load(os.path.join(carpeta, f"{nombre}.npy"), mmap_mode="r") for nombre in nombres}
+    cubo["hecho"] = np.load(os.path.join(carpeta, ARCHIVO_HECHO), mmap_mode="r")
+    return cubo
+
+
+#corte 2D de una métrica sobre los ejes x e y de una grilla; los demás ejes se fijan en fijos ({eje: índice}, 0 por
+#defecto)
+def corte(cubo, metrica, eje_x, eje_y, fijos=None):
+    fijos = fijos or {}
+    indices = tuple(slice(None) if eje in (eje_x, eje_y) else fijos.get(eje, 0) for eje in cubo["dims"])
+    datos = np.asarray(cubo["datos"][metrica][indices])
+    restantes = [eje for eje in cubo["dims"] if eje in (eje_x, eje_y)]
+    return datos if restantes == [eje_y, eje_x] else datos.T
+
+
+#superficie de una métrica (por defecto probabilidad de victoria de A) sobre dos ejes de una grilla
+def graficar_superficie(cubo, ruta, eje_x, eje_y, metrica="prob_victoria_A", fijos=None):
+    datos = corte(cubo, metrica, eje_x, eje_y, fijos)
+    plt.figure(figsize=(8, 6))
+    plt.imshow(datos, origin="lower", aspect="auto")
+    plt.colorbar(label=metrica)
+    plt.xticks(range(len(cubo["coords"][eje_x])), cubo["coords"][eje_x])
+    plt.yticks(range(len(cubo["coords"][eje_y])), cubo["coords"][eje_y])
+    plt.xlabel(eje_x)
+    plt.ylabel(eje_y)
+    plt.title(f"{metrica} ({cubo['n_combates']} combates por punto)")
+    plt.savefig(ruta)
+    plt.close()
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso (grilla):    python BJJ_Barrido.py Caso1.json carpeta 2000 4 0 A.fueAt=1,2,3,4,5 O.fueDef=1,2,3,4,5
+#uso (hipercubo): python BJJ_Barrido.py Caso1.json carpeta 2000 4 0 --lhs 200 A.fueAt=1:5 A.energy=60:100
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    n_lhs = None
+    if "--lhs" in argumentos:
+        i = argumentos.index("--lhs")
+        n_lhs = int(argumentos[i + 1])
+        argumentos = argumentos[:i] + argumentos[i + 2:]
+    caso, carpeta, n, workers, semilla = argumentos[:5]
+    ejes = dict(a.split("=", 1) for a in argumentos[5:])
+
+    if n_lhs is None:
+        diseno = grilla({eje: [float(v) for v in valores.split(",")] for eje, valores in ejes.items()})
+    else:
+        diseno = hipercubo_latino({eje: tuple(float(v) for v in rango.split(":")) for eje, rango in ejes.items()},
+                                  n_lhs, int(semilla))
+
+    cubo = barrer(caso, diseno, carpeta, int(n), int(workers), int(semilla), verbose=True)
+    if n_lhs is None and len(cubo["dims"]) >= 2:
+        ruta = os.path.join(carpeta, "superficie_prob_victoria_A.png")
+        graficar_superficie(cubo, ruta, cubo["dims"][0], cubo["dims"][1])
+        print(f"Superficie guardada en {ruta}")
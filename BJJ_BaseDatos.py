@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+#BJJ_BaseDatos - Base SQLite opcional con combates y eventos de todos los casos, indexada para consultas
+"""
+Guarda en un archivo SQLite local los combates (un resumen por combate) y sus eventos, de cualquier caso:
+
+    combates(match_id, caso, hash_config, semilla, bloque, tiempo, puntaje_A, puntaje_O, pasos, ganador, sumision)
+    eventos(match_id, caso, paso, tiempo, actor, id_tecnica, tecnica, resultado, exito, mantencion,
+            pos_actor, pos_A, pos_O, puntaje_A, puntaje_O)
+
+pos_actor es la posición del actor antes de ejecutar la técnica (pos_A / pos_O son las posiciones después, como en
+los CSV). Hay índices por caso, hash de configuración de los luchadores, técnica (id_tecnica, pos_actor) y posición,
+así que preguntas como "tasa de éxito de T26 desde Guardia_Cerrada_Inferior en todos los casos" son consultas
+indexadas (tasa_exito) en vez de releer cada CSV con pandas.
+
+Las inserciones van en lotes con executemany dentro de una transacción, en modo WAL; varios procesos pueden escribir
+en la misma base (SQLite serializa las transacciones, con busy timeout). match_id (entero sin signo de 64 bits de
+BJJ_Almacen) se guarda con el mismo patrón de bits como INTEGER con signo, y hash_config en hexadecimal. Cada evento
+es único por (match_id, paso): volver a insertar un lote o un combate reemplaza sus filas en vez de duplicarlas.
+"""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from BJJ_Almacen import GANADORES, ids_bloque
+from BJJ_LogBinario import RESULTADOS
+from BJJ_Registro import CAMPOS_LOTE, Sumidero
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS combates (
+    match_id INTEGER PRIMARY KEY,
+    caso TEXT NOT NULL,
+    hash_config TEXT NOT NULL,
+    semilla INTEGER,
+    bloque INTEGER,
+    tiempo INTEGER,
+    puntaje_A INTEGER,
+    puntaje_O INTEGER,
+    pasos INTEGER,
+    ganador TEXT,
+    sumision INTEGER
+);
+CREATE TABLE IF NOT EXISTS eventos (
+    match_id INTEGER NOT NULL,
+    caso TEXT NOT NULL,
+    paso INTEGER NOT NULL,
+    tiempo INTEGER,
+    actor TEXT,
+    id_tecnica TEXT,
+    tecnica TEXT,
+    resultado TEXT,
+    exito INTEGER,
+    mantencion INTEGER,
+    pos_actor TEXT,
+    pos_A TEXT,
+    pos_O TEXT,
+    puntaje_A INTEGER,
+    puntaje_O INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_combates_caso ON combates (caso);
+CREATE INDEX IF NOT EXISTS idx_combates_hash ON combates (hash_config);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_eventos_paso ON eventos (match_id, paso);
+CREATE INDEX IF NOT EXISTS idx_eventos_caso ON eventos (caso);
+CREATE INDEX IF NOT EXISTS idx_eventos_tecnica ON eventos (id_tecnica, pos_actor);
+CREATE INDEX IF NOT EXISTS idx_eventos_posicion ON eventos (pos_actor);
+"""
+
+INSERTAR_COMBATE = "INSERT OR REPLACE INTO combates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+INSERTAR_EVENTO = "INSERT OR REPLACE INTO eventos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+#carga por columnas de agregar_lote: los eventos del lote van con códigos enteros a una tabla temporal (de la
+#conexión) y un solo INSERT ... SELECT los pasa a eventos con los nombres de técnica, lugar y resultado de cada código
+ESQUEMA_CARGA = """
+CREATE TEMP TABLE IF NOT EXISTS carga_eventos (
+    match_id INTEGER,
+    paso INTEGER,
+    tiempo INTEGER,
+    actor INTEGER,
+    tecnica INTEGER,
+    resultado INTEGER,
+    mantencion INTEGER,
+    pos_actor INTEGER,
+    pos_A INTEGER,
+    pos_O INTEGER,
+    puntaje_A INTEGER,
+    puntaje_O INTEGER
+);
+CREATE TEMP TABLE IF NOT EXISTS carga_tecnicas (codigo INTEGER PRIMARY KEY, id_tecnica TEXT, tecnica TEXT);
+CREATE TEMP TABLE IF NOT EXISTS carga_lugares (codigo INTEGER PRIMARY KEY, lugar TEXT);
+CREATE TEMP TABLE IF NOT EXISTS carga_resultados (codigo INTEGER PRIMARY KEY, resultado TEXT);
+"""
+INSERTAR_CARGA = "INSERT INTO carga_eventos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+CARGAR_EVENTOS = """
+INSERT OR REPLACE INTO eventos
+SELECT e.match_id, ?, e.paso, e.tiempo, CASE e.actor WHEN 0 THEN 'A' ELSE 'O' END, t.id_tecnica, t.tecnica,
+       r.resultado, e.resultado, e.mantencion, l_actor.lugar, l_A.lugar, l_O.lugar, e.puntaje_A, e.puntaje_O
+FROM carga_eventos e
+JOIN carga_tecnicas t ON t.codigo = e.tecnica
+JOIN carga_resultados r ON r.codigo = e.resultado
+LEFT JOIN carga_lugares l_actor ON l_actor.codigo = e.pos_actor
+LEFT JOIN carga_lugares l_A ON l_A.codigo = e.pos_A
+LEFT JOIN carga_lugares l_O ON l_O.codigo = e.pos_O
+ORDER BY e.rowid
+"""
+
+NOMBRES_GANADOR = {v: k for k, v in GANADORES.items()}
+POSICION_INICIAL = "De_Pie"
+
+
+#match_id sin signo (numpy uint64) como INTEGER de SQLite, mismo patrón de bits
+def _id_sqlite(ids):
+    return np.asarray(ids, dtype=np.uint64).view(np.int64).tolist()
+
+
+def _id_tecnica(nombre):
+    return nombre.split("_")[0].strip() if nombre else ""
+
+
+class BaseResultados:
+    """Conexión a la base SQLite de resultados; crea el esquema e índices si no existen."""
+
+    def __init__(self, ruta, timeout=60.0):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta, timeout=timeout)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(ESQUEMA)
+        self.conexion.executescript(ESQUEMA_CARGA)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    #inserta filas de combates y eventos en una sola transacción
+    def _insertar(self, combates, eventos):
+        with self.conexion:
+            if eventos:
+                self.conexion.executemany(INSERTAR_EVENTO, eventos)
+            if combates:
+                self.conexion.executemany(INSERTAR_COMBATE, combates)
+
+    #inserta un lote en una sola transacción: columnas = códigos enteros de los eventos (las de carga_eventos) o None
+    def _cargar_lote(self, combates, columnas, red, caso):
+        n_exitosos = len(red.mov_exitoso)
+        tecnicas = [(i, _id_tecnica(nombre), nombre) for i, nombre in enumerate(red.mov_exitoso)]
+        tecnicas += [(n_exitosos + i, _id_tecnica(nombre), fallido or "")
+                     for i, (nombre, fallido) in enumerate(zip(red.mov_exitoso, red.mov_fallido))]
+        with self.conexion:
+            if columnas is not None:
+                self.conexion.executemany("INSERT OR REPLACE INTO carga_tecnicas VALUES (?, ?, ?)", tecnicas)
+                self.conexion.executemany("INSERT OR REPLACE INTO carga_lugares VALUES (?, ?)", enumerate(red.lugares))
+                self.conexion.executemany("INSERT OR REPLACE INTO carga_resultados VALUES (?, ?)",
+                                          enumerate(RESULTADOS))
+                self.conexion.executemany(INSERTAR_CARGA, zip(*[c.tolist() for c in columnas]))
+                self.conexion.execute(CARGAR_EVENTOS, (caso,))
+                self.conexion.execute("DELETE FROM carga_eventos")
+            self.conexion.executemany(INSERTAR_COMBATE, combates)
+
+    def agregar_lote(self, resultado, red, caso, semilla, bloque, hash_config, ids=None):
+        """
+        Inserta un resultado de MotorLote.simular (los eventos si trae "eventos") con los mismos match_id que
+        BJJ_Almacen. Retorna los match_id.
+        """
+        n = len(resultado["ganador"])
+        ids = ids if ids is not None else ids_bloque(hash_config, semilla, bloque, n)
+        ids_sql = np.asarray(ids, dtype=np.uint64).view(np.int64)
+        hash_hex = format(hash_config, "016x")
+
+        columnas = None
+        if "eventos" in resultado:
+            #columnas de cada paso con los códigos de técnica (fallida: desplazada en len(mov_exitoso)) y de lugar;
+            #la posición del actor antes de la técnica sale del estado previo de cada combate
+            estado_previo = np.full(n, red.estado_inicial, dtype=np.int64)
+            paso = np.zeros(n, dtype=np.int64)
+            por_paso = []
+            for evento in resultado["eventos"]:
+                idx = evento["combate"]
+                m = evento["movimiento"]
+                previo_A, previo_O = red.posiciones(estado_previo[idx])
+                pos_A, pos_O = red.posiciones(evento["estado"])
+                actor_A = evento["actor"] == 0
+                por_paso.append([
+                    ids_sql[idx],
+                    paso[idx],
+                    evento["tiempo"],
+                    evento["actor"],
+                    np.where(evento["nombre_fallido"], len(red.mov_exitoso) + m, m),
+                    evento["resultado"],
+                    evento["mantencion"],
+                    np.where(actor_A, previo_A, previo_O),
+                    pos_A,
+                    pos_O,
+                    evento["puntaje_A"],
+                    evento["puntaje_O"]
+                ])
+                estado_previo[idx] = evento["estado"]
+                paso[idx] += 1
+            columnas = [np.concatenate(columna) for columna in zip(*por_paso)] if por_paso else None
+
+        combates = list(zip(
+            ids_sql.tolist(),
+            [caso] * n,
+            [hash_hex] * n,
+            [int(semilla)] * n,
+            [int(bloque)] * n,
+            np.asarray(resultado["tiempo"]).tolist(),
+            np.asarray(resultado["puntaje_A"]).tolist(),
+            np.asarray(resultado["puntaje_O"]).tolist(),
+            np.asarray(resultado["pasos"]).tolist(),
+            [NOMBRES_GANADOR[g] for g in np.asarray(resultado["ganador"]).tolist()],
+            np.asarray(resultado["sumision"], dtype=np.int64).tolist()
+        ))
+        self._cargar_lote(combates, columnas, red, caso)
+        return ids
+
+    def agregar_combates(self, resultados, caso, semilla, hash_config, bloque=0):
+        """Inserta resultados de Simulador.combate() (con su "registro"). Retorna los match_id."""
+        ids = ids_bloque(hash_config, semilla, bloque, len(resultados))
+        hash_hex = format(hash_config, "016x")
+        combates, eventos = [], []
+        for match_id, r in zip(_id_sqlite(ids), resultados):
+            eventos.extend(filas_eventos(r["registro"], match_id, caso))
+            combates.append((
+                match_id, caso, hash_hex, int(semilla), int(bloque), r["tiempo"], r["puntaje_A"], r["puntaje_O"],
+                len(r["registro"]), r["ganador"], int(r["sumision"] is not None)
+            ))
+        self._insertar(combates, eventos)
+        return ids
+
+    def consultar(self, sql, parametros=()):
+        return pd.read_sql_query(sql, self.conexion, params=parametros)
+
+    def tasa_exito(self, id_tecnica, pos_actor=None, caso=None):
+        """Intentos, éxitos y tasa de éxito de una técnica, opcionalmente desde una posición del actor y en un caso."""
+        condiciones, parametros = ["id_tecnica = ?"], [id_tecnica]
+        if pos_actor is not None:
+            condiciones.append("pos_actor = ?")
+            parametros.append(pos_actor)
+        if caso is not None:
+            condiciones.append("caso = ?")
+            parametros.append(caso)
+        fila = self.conexion.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(exito), 0) FROM eventos WHERE {' AND '.join(condiciones)}",
+            parametros
+        ).fetchone()
+        intentos, exitos = fila
+        return {"intentos": intentos, "exitos": exitos, "tasa_exito": exitos / intentos if intentos else float("nan")}
+
+
+#filas de la tabla eventos para el registro de un combate (posición del actor antes de cada técnica incluida)
+def filas_eventos(registro, match_id, caso):
+    filas = []
+    previo = {"A": POSICION_INICIAL, "O": POSICION_INICIAL}
+    for paso, e in enumerate(registro):
+        filas.append((
+            match_id, caso, paso, e["tiempo"], e["actor"], _id_tecnica(e["tecnica"]), e["tecnica"],
+            e["resultado"], int(e["resultado"] == "exito"), e["mantencion"], previo[e["actor"]],
+            e["pos_A"] or None, e["pos_O"] or None, e["puntaje_A"], e["puntaje_O"]
+        ))
+        previo = {"A": e["pos_A"], "O": e["pos_O"]}
+    return filas
+
+
+class SumideroSQLite(Sumidero):
+    """
+    Sumidero de BJJ_Registro que inserta los eventos en la tabla eventos con buffer acotado. ids son los match_id de
+    los combates (los de ids_bloque del bloque, o los que retorna agregar_lote) y la columna "combate" de cada evento
+    es su posición en ids, como en MotorLote.escribir_eventos. No escribe la tabla combates (para eso
+    BaseResultados.agregar_lote o agregar_combates).
+    """
+
+    def __init__(self, ruta, caso, ids, campos=CAMPOS_LOTE, **kwargs):
+        super().__init__(ruta, campos, **kwargs)
+        self.caso = caso
+        self.ids = _id_sqlite(ids)
+        self.base = BaseResultados(ruta)
+        self._previo = {}
+        self._pasos = {}
+
+    def _escribir_buffer(self, eventos):
+        filas = []
+        for e in eventos:
+            combate = e.get("combate")
+            if combate is None or not 0 <= int(combate) < len(self.ids):
+                raise ValueError(f"Evento sin combate válido para SumideroSQLite (combate={combate}, "
+                                 f"{len(self.ids)} match_id)")
+            match_id = self.ids[int(combate)]
+            previo = self._previo.get(match_id, {"A": POSICION_INICIAL, "O": POSICION_INICIAL})
+            paso = self._pasos.get(match_id, 0)
+            filas.append((
+                match_id, self.caso, paso, e["tiempo"], e["actor"], _id_tecnica(e["tecnica"]), e["tecnica"],
+                e["resultado"], int(e["resultado"] == "exito"), e["mantencion"], previo[e["actor"]],
+                e["pos_A"] or None, e["pos_O"] or None, e["puntaje_A"], e["puntaje_O"]
+            ))
+            self._previo[match_id] = {"A": e["pos_A"], "O": e["pos_O"]}
+            self._pasos[match_id] = paso + 1
+        self.base._insertar([], filas)
+
+    def _cerrar_archivo(self):
+        self.base.cerrar()
+
+
+#carga el almacén de un caso (BJJ_Almacen) en la base, con los mismos match_id
+def importar_almacen(base, carpeta, caso):
+    from BJJ_Almacen import cargar_almacen
+    df_combates, df_eventos = cargar_almacen(carpeta)
+    ids = _id_sqlite(df_combates["match_id"].to_numpy())
+    combates = list(zip(
+        ids,
+        [caso] * len(ids),
+        [format(int(h), "016x") for h in df_combates["hash_config"]],
+        df_combates["semilla"].tolist(),
+        df_combates["bloque"].tolist(),
+        df_combates["tiempo"].tolist(),
+        df_combates["puntaje_A"].tolist(),
+        df_combates["puntaje_O"].tolist(),
+        df_combates["pasos"].tolist(),
+        [NOMBRES_GANADOR[g] for g in df_combates["ganador"].tolist()],
+        df_combates["sumision"].astype(np.int64).tolist()
+    ))
+    eventos = []
+    for match_id, df in df_eventos.groupby("match_id", sort=False):
+        registro = df.drop(columns="match_id").to_dict("records")
+        for e in registro:
+            e["pos_A"] = e["pos_A"] if isinstance(e["pos_A"], str) else None
+            e["pos_O"] = e["pos_O"] if isinstance(e["pos_O"], str) else None
+        eventos.extend(filas_eventos(registro, _id_sqlite([match_id])[0], caso))
+    base._insertar(combates, eventos)
+    return len(combates)
+
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#BJJ_Carrera - Selección por carreras (racing) de la mejor variante de un luchador contra un oponente fijo
+"""
+carrera elige la mejor de muchas variantes de un luchador (un plantel {nombre: luchador} en el formato de BJJ_Liga)
+contra el oponente del caso sin darle a todas la misma cantidad de combates. Por rondas, cada variante que sigue en
+carrera simula combates_ronda combates más y se eliminan las que ya no pueden ser la mejor:
+
+    modo="confianza"   eliminación por cotas de confianza pareadas: la variante i sale si para alguna otra j la cota
+                       inferior de media(x_j - x_i) es positiva. El nivel por ronda y variante es
+                       (1 - confianza) / (n_variantes * r * (r + 1)), cuya suma sobre rondas y variantes no pasa de
+                       1 - confianza, así la probabilidad de eliminar alguna vez a la mejor queda acotada aunque se
+                       mire después de cada ronda
+    modo="mitad"       successive halving: después de cada ronda sigue la mejor mitad por media y la ronda siguiente
+                       duplica los combates por variante
+
+Todas las variantes en carrera pelean cada ronda con los mismos sorteos (números aleatorios comunes: MotorLote con el
+plantel en un rol y la matriz de sorteos de cada paso repetida por variante), así x_j - x_i se estima combate a combate
+y su varianza es mucho menor que la de dos muestras independientes. Por variante se acumula la suma de x y por par la
+suma de x_i * x_j, de donde salen la media y la varianza de cada diferencia. Los combates de una ronda se reparten en
+bloques de semillas fijas (independientes de la cantidad de workers) que se simulan en un pool de procesos.
+"""
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from BJJ_Catalogo import cargar_catalogo
+from BJJ_Estadisticas import valor_z
+from BJJ_Experimentos import cargar_caso, cargar_red
+from BJJ_Liga import cargar_plantel, plantel_aleatorio
+from BJJ_Lote import GANA_A, GANA_O, SORTEOS, MotorLote
+from BJJ_Motor import MAX_TIEMPO
+from BJJ_Repertorio import metrica_objetivo
+
+MODOS_CARRERA = ["confianza", "mitad"]
+COMBATES_RONDA = 500
+TAMANO_BLOQUE_CARRERA = 500
+
+#motor con las variantes en el rol del luchador y el oponente fijo (se arma una vez por worker)
+_CONTEXTO = None
+
+
+def _iniciar_worker(red, catalogo, variantes, oponente, luchador, objetivo, max_tiempo):
+    global _CONTEXTO
+    if luchador == "A":
+        motor = MotorLote(red, catalogo, variantes, [oponente], max_tiempo=max_tiempo)
+    else:
+        motor = MotorLote(red, catalogo, [oponente], variantes, max_tiempo=max_tiempo)
+    _CONTEXTO = (motor, luchador, objetivo)
+
+
+#simula n combates de cada variante viva con los mismos sorteos; retorna (suma de x por variante, matriz de x_i * x_j)
+def _simular_bloque(args):
+    vivas, n, semilla = args
+    motor, luchador, objetivo = _CONTEXTO
+    rng = np.random.default_rng(semilla)
+    k = len(vivas)
+
+    #sorteos comunes: la matriz de cada paso para n combates se repite para cada variante
+    def sorteos(paso):
+        return np.tile(rng.random((n, SORTEOS)), (k, 1))
+
+    indices = np.repeat(vivas, n)
+    fijo = np.zeros(k * n, dtype=np.int64)
+    if luchador == "A":
+        resultado = motor.simular(k * n, None, sorteos=sorteos, luchador_A=indices, luchador_O=fijo)
+    else:
+        resultado = motor.simular(k * n, None, sorteos=sorteos, luchador_A=fijo, luchador_O=indices)
+    x = resultado["ganador"] == (GANA_A if luchador == "A" else GANA_O)
+    if objetivo == "sumision":
+        x &= resultado["sumision"]
+    X = x.reshape(k, n).astype(np.float64)
+    return X.sum(axis=1), X @ X.T
+
+
+#pool de simulación (o el proceso actual con workers <= 1): entrega una función map
+@contextmanager
+def _simulador(red, catalogo, variantes, oponente, luchador, objetivo, workers, max_tiempo):
+    argumentos = (red, catalogo, variantes, oponente, luchador, objetivo, max_tiempo)
+    if workers <= 1:
+        _iniciar_worker(*argumentos)
+        yield lambda tareas: map(_simular_bloque, tareas)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker, initargs=argumentos) as pool:
+        yield lambda tareas: pool.map(_simular_bloque, tareas)
+
+
+def carrera(case_json, variantes, luchador="A", objetivo="victoria", modo="confianza", confianza=0.95,
+            combates_ronda=COMBATES_RONDA, min_combates=COMBATES_RONDA, max_combates=100_000, workers=1, semilla=0,
+            red=None, catalogo=None, tamano_bloque=TAMANO_BLOQUE_CARRERA, max_tiempo=MAX_TIEMPO, verbose=False):
+    """
+    Carrera entre las variantes (plantel {nombre: luchador} o ruta a su JSON) en el rol del luchador contra el otro
+    luchador del caso, maximizando metrica_objetivo(luchador, objetivo). En modo "confianza" no se elimina antes de
+    min_combates y la carrera termina cuando queda una variante o las vivas llegan a max_combates.
+
+    Retorna un diccionario con el ranking (DataFrame: media, semiancho al nivel de confianza, combates y ronda de
+    eliminación de cada variante), las variantes vivas, los combates totales y los que habría usado darle a todas las
+    variantes los combates de la ganadora.
+    """
+    metrica = metrica_objetivo(luchador, objetivo)
+    if modo not in MODOS_CARRERA:
+        raise ValueError(f"Modo de carrera inválido: {modo} (se espera {' o '.join(MODOS_CARRERA)})")
+    variantes = cargar_plantel(variantes) if isinstance(variantes, str) else variantes
+    nombres = list(variantes)
+    k = len(nombres)
+    A, O = cargar_caso(case_json)
+    oponente = O if luchador == "A" else A
+    red = red if red is not None else cargar_red()
+    catalogo = catalogo if catalogo is not None else cargar_catalogo("Input/Grafo_Explicito.csv")
+
+    suma = np.zeros(k)
+    gram = np.zeros((k, k))
+    combates = np.zeros(k, dtype=np.int64)
+    eliminada = np.full(k, -1)
+    vivas = np.arange(k)
+    semillas_ronda = np.random.SeedSequence(semilla)
+    ronda = 0
+
+    with _simulador(red, catalogo, [variantes[n] for n in nombres], oponente, luchador, objetivo, workers,
+                    max_tiempo) as mapear:
+        while len(vivas) > 1 and combates[vivas[0]] < max_combates:
+            ronda += 1
+            n_ronda = combates_ronda * 2 ** (ronda - 1) if modo == "mitad" else combates_ronda
+            n_ronda = min(n_ronda, max_combates - int(combates[vivas[0]]))
+            cortes = range(0, n_ronda, tamano_bloque)
+            semillas = semillas_ronda.spawn(1)[0].spawn(len(cortes))
+            tareas = [(vivas, min(tamano_bloque, n_ronda - c), s) for c, s in zip(cortes, semillas)]
+            for suma_bloque, gram_bloque in mapear(tareas):
+                suma[vivas] += suma_bloque
+                gram[np.ix_(vivas, vivas)] += gram_bloque
+            combates[vivas] += n_ronda
+            n = combates[vivas[0]]
+            medias = suma[vivas] / n
+
+            if modo == "mitad":
+                orden = np.argsort(-medias, kind="stable")
+                salen = orden[math.ceil(len(vivas) / 2):]
+            elif n >= min_combates:
+                #cotas pareadas: diferencia[i, j] = media(x_j - x_i) y su error estándar
+                g = gram[np.ix_(vivas, vivas)]
+                diferencia = medias[None, :] - medias[:, None]
+                cuadrados = (np.diag(g)[:, None] + np.diag(g)[None, :] - 2 * g) / n
+                varianza = np.maximum(cuadrados - diferencia ** 2, 0) * n / (n - 1)
+                z = valor_z(1 - 2 * (1 - confianza) / (k * ronda * (ronda + 1)))
+                inferior = diferencia - z * np.sqrt(varianza / n)
+                salen = np.flatnonzero((inferior > 0).any(axis=1))
+            else:
+                salen = np.array([], dtype=np.int64)
+
+            eliminada[vivas[salen]] = ronda
+            vivas = np.delete(vivas, salen)
+            if verbose and (len(salen) or ronda % 20 == 0):
+                print(f"Ronda {ronda}: {n} combates por variante, {len(salen)} eliminadas, {len(vivas)} en carrera "
+                      f"(mejor {metrica} = {medias.max():.4f})")
+
+    z = valor_z(confianza)
+    medias = suma / np.maximum(combates, 1)
+    ranking = pd.DataFrame({
+        "variante": nombres,
+        metrica: medias,
+        "semiancho": z * np.sqrt(medias * (1 - medias) / np.maximum(combates, 1)),
+        "combates": combates,
+        "ronda_eliminada": np.where(eliminada >= 0, eliminada, np.nan)
+    })
+    #vivas primero, luego por ronda de eliminación (más tarde = mejor) y por media
+    ranking["_orden"] = np.where(eliminada >= 0, eliminada, ronda + 1)
+    ranking = ranking.sort_values(["_orden", metrica], ascending=False, ignore_index=True).drop(columns="_orden")
+    if verbose:
+        print(f"{int(combates.sum())} combates en total ({k} variantes x {int(combates.max())} con reparto uniforme "
+              f"= {k * int(combates.max())})")
+    return {
+        "metrica": metrica,
+        "ranking": ranking,
+        "vivas": [nombres[i] for i in vivas],
+        "rondas": ronda,
+        "combates_totales": int(combates.sum()),
+        "combates_uniforme": k * int(combates.max())
+    }
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Carrera.py Experimentos/Inputs/Caso1.json variantes.json A victoria [confianza|mitad] 4 [semilla]
+#     python BJJ_Carrera.py Experimentos/Inputs/Caso1.json --aleatorio 50 A victoria [confianza|mitad] 4 [semilla]
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    caso = argumentos[0] if argumentos else "Experimentos/Inputs/Caso1.json"
+    argumentos = argumentos[1:]
+    if argumentos and argumentos[0] == "--aleatorio":
+        fuente = int(argumentos[1])
+        argumentos = argumentos[2:]
+    else:
+        fuente = argumentos[0] if argumentos else "Input/Luchadores.json"
+        argumentos = argumentos[1:]
+    luchador = argumentos[0] if len(argumentos) > 0 else "A"
+    objetivo = argumentos[1] if len(argumentos) > 1 else "victoria"
+    modo = argumentos[2] if len(argumentos) > 2 else "confianza"
+    workers = int(argumentos[3]) if len(argumentos) > 3 else 1
+    semilla = int(argumentos[4]) if len(argumentos) > 4 else 0
+
+    if isinstance(fuente, int):
+        variantes = plantel_aleatorio(fuente, cargar_catalogo("Input/Grafo_Explicito.csv"), semilla)
+    else:
+        variantes = cargar_plantel(fuente)
+    resultado = carrera(caso, variantes, luchador, objetivo, modo, workers=workers, semilla=semilla, verbose=True)
+    print(resultado["ranking"].head(10).to_string(index=False))
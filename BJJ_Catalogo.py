@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#BJJ_Catalogo - Catálogo de técnicas de Grafo_Explicito.csv indexado por ID
+"""
+Carga Grafo_Explicito.csv una sola vez en columnas (struct-of-arrays) indexadas por la posición de cada técnica, con
+la categoría ya normalizada a minúsculas y su clase (ofensiva / defensiva / neutral) precalculada. Las consultas por
+nombre de transición (p. ej. "T26_inv_..._exitoso") se resuelven con un diccionario, en tiempo constante.
+"""
+import csv
+
+import numpy as np
+
+#clases de técnica usadas por iniciativa, stamina y probabilidad de éxito
+OFENSIVA = 0
+DEFENSIVA = 1
+NEUTRAL = 2
+CLASES = ["ofensiva", "defensiva", "neutral"]
+
+#catálogos ya cargados por ruta, para no releer el archivo
+_CATALOGOS = {}
+
+
+#normaliza la categoría del grafo a ofensiva / defensiva / neutral
+def clase_categoria(categoria):
+    categoria = categoria.lower()
+    if categoria in ["derribo", "pase de guardia", "sumisión"]:
+        return OFENSIVA
+    elif categoria == "escape":
+        return DEFENSIVA
+    return NEUTRAL
+
+
+#convierte un valor numérico del csv a int (vacío = 0, puede venir como texto "5.0")
+def _entero(valor):
+    valor = (valor or "").strip()
+    return int(float(valor)) if valor else 0
+
+
+class Catalogo:
+    """Columnas del grafo de técnicas; la fila i corresponde a la técnica ids[i]."""
+
+    def __init__(self, filas):
+        self.ids = [f["ID"] for f in filas]
+        self.indice = {}
+        for i, id_tecnica in enumerate(self.ids):
+            self.indice.setdefault(id_tecnica, i)   #igual que el filtro original, gana la primera fila
+
+        self.nombre = [f.get("Nombre", "") for f in filas]
+        self.categoria = [f["Categoría"] for f in filas]
+        self.clase = np.array([clase_categoria(c) for c in self.categoria], dtype=np.int8)
+        self.es_sumision = np.array([c == "sumisión" for c in self.categoria], dtype=bool)
+        self.tiempo_posicion = np.array([f["Tiempo Posición"] for f in filas], dtype=np.int64)
+        self.costo_stamina = np.array([f["Costo Stamina"] for f in filas], dtype=np.int64)
+        self.tiempo_ejecucion = np.array([f["Tiempo Ejecución"] for f in filas], dtype=np.int64)
+        self.puntaje = np.array([f["Puntaje"] for f in filas], dtype=np.int64)
+
+        #cache nombre de transición -> fila (-1 si no está en el grafo)
+        self._indice_transicion = {}
+        self._info = [
+            {
+                "tiempo_posicion": int(self.tiempo_posicion[i]),
+                "categoria": self.categoria[i],
+                "costo_stamina": int(self.costo_stamina[i]),
+                "tiempo_ejecucion_s": int(self.tiempo_ejecucion[i]),
+                "puntaje": int(self.puntaje[i]),
+                "clase": int(self.clase[i])
+            }
+            for i in range(len(self.ids))
+        ]
+
+    def __len__(self):
+        return len(self.ids)
+
+    #fila de la técnica a partir del nombre de transición, por el ID antes del primer "_"
+    def indice_tecnica(self, nombre_transicion):
+        i = self._indice_transicion.get(nombre_transicion)
+        if i is None:
+            id_tecnica = nombre_transicion.split("_")[0].strip() if nombre_transicion else ""
+            i = self.indice.get(id_tecnica, -1)
+            self._indice_transicion[nombre_transicion] = i
+        return i
+
+    #mismo diccionario que entregaba info_tecnica (no modificar, se comparte entre llamadas)
+    def info(self, nombre_transicion):
+        i = self.indice_tecnica(nombre_transicion)
+        if i < 0:
+            return INFO_DESCONOCIDA
+        return self._info[i]
+
+
+INFO_DESCONOCIDA = {
+    "tiempo_posicion": 0,
+    "categoria": "desconocida",
+    "costo_stamina": 0,
+    "tiempo_ejecucion_s": 0,
+    "puntaje": 0,
+    "clase": NEUTRAL
+}
+
+
+#CARGA DE GRAFO TECNICAS---------------------------------------------------------------------------------------------------------
+#carga el catálogo una vez por ruta; retorna None si el archivo no se pudo leer
+def cargar_catalogo(ruta="Input/Grafo_Explicito.csv"):
+    if ruta in _CATALOGOS:
+        return _CATALOGOS[ruta]
+    try:
+        filas = []
+        with open(ruta, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                #normalización de datos.
+                filas.append({
+                    "ID": str(row["ID"]).strip(),
+                    "Nombre": str(row.get("Nombre de la Técnica") or "").strip(),
+                    "Categoría": str(row["Categoría"]).lower().strip(),
+                    "Tiempo Posición": _entero(row["Tiempo Posición"]),
+                    "Costo Stamina": _entero(row["Costo Stamina"]),
+                    "Tiempo Ejecución": _entero(row["Tiempo Ejecución"]),
+                    "Puntaje": _entero(row["Puntaje"])
+                })
+        catalogo = Catalogo(filas)
+        _CATALOGOS[ruta] = catalogo
+        #debug
+        print("Carga de archivo con técnicas correcta")
+
+    except Exception as e:
+        print(f"No se pudo cargar el archivo de técnicas: {e}")
+        catalogo = None
+
+    return catalogo
+
+
+#identifica la transición por ID en el catálogo y entrega sus datos (si no encuentra es desconocida)
+def info_tecnica(nombre_transicion, catalogo):
+    if catalogo is None:
+        return INFO_DESCONOCIDA
+    return catalogo.info(nombre_transicion)
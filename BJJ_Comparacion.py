@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#BJJ_Comparacion - Comparación pareada de dos casos (o variantes de un luchador) con números aleatorios comunes
+"""
+comparar simula los mismos bloques de combates para dos configuraciones y estima la diferencia de cada métrica con el
+estimador pareado: media y error estándar de d_i = x_i(config 1) - x_i(config 2) sobre los combates emparejados.
+
+Con crn=True (números aleatorios comunes) el combate i de las dos configuraciones usa la misma semilla de bloque. Como
+MotorLote consume una matriz de sorteos por paso con una columna fija por sorteo (elección de técnica, ruido de
+iniciativa, éxito y tiempo de mantención), los combates emparejados comparten todos sus sorteos y la varianza de la
+diferencia baja en la medida en que las dos configuraciones responden parecido a los mismos números. Con crn=False
+cada configuración usa su propio flujo (hijos 0 y 1 de la semilla del bloque) y el estimador queda como el de dos
+muestras independientes.
+
+reduccion_varianza = (var_1 + var_2) / var(d) compara con lo que darían flujos independientes con el mismo cómputo
+(1 sin CRN, en promedio). Cada worker simula un bloque de ambas configuraciones y devuelve solo los Momentos
+(BJJ_Estadisticas) de cada métrica, que se combinan en el orden de los bloques.
+"""
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from BJJ_Catalogo import cargar_catalogo
+from BJJ_Estadisticas import Momentos, valor_z
+from BJJ_Experimentos import TAMANO_BLOQUE, bloques, cargar_caso, cargar_red
+from BJJ_Lote import GANA_A, GANA_O, MotorLote
+from BJJ_Motor import MAX_TIEMPO
+
+#métricas por combate que se comparan (probabilidades como indicadores 0/1 sobre el total de combates)
+METRICAS_PAREADAS = {
+    "prob_victoria_A": lambda r: r["ganador"] == GANA_A,
+    "prob_victoria_O": lambda r: r["ganador"] == GANA_O,
+    "frac_sumision_A": lambda r: r["sumision"] & (r["ganador"] == GANA_A),
+    "frac_sumision_O": lambda r: r["sumision"] & (r["ganador"] == GANA_O),
+    "tiempo_combate": lambda r: r["tiempo"],
+    "puntaje_A": lambda r: r["puntaje_A"],
+    "puntaje_O": lambda r: r["puntaje_O"]
+}
+
+#motores de las dos configuraciones en el proceso actual (se arman una vez por worker)
+_MOTORES = None
+
+
+#luchadores (A, O) de un caso: ruta a un Caso*.json o par de diccionarios de luchador
+def luchadores_caso(caso):
+    if isinstance(caso, str):
+        return cargar_caso(caso)
+    return caso
+
+
+def _iniciar_worker(red, catalogo, configuraciones, max_tiempo):
+    global _MOTORES
+    _MOTORES = [MotorLote(red, catalogo, A, O, max_tiempo=max_tiempo) for A, O in configuraciones]
+
+
+#un bloque de ambas configuraciones: {métrica: [Momentos config 1, Momentos config 2, Momentos diferencia]}
+def _comparar_bloque(args):
+    semilla_bloque, n, crn = args
+    semillas = [semilla_bloque, semilla_bloque] if crn else semilla_bloque.spawn(2)
+    resultados = [motor.simular(n, np.random.default_rng(s)) for motor, s in zip(_MOTORES, semillas)]
+    parcial = {}
+    for metrica, valor in METRICAS_PAREADAS.items():
+        x = valor(resultados[0]).astype(np.float64)
+        y = valor(resultados[1]).astype(np.float64)
+        momentos = [Momentos(), Momentos(), Momentos()]
+        for m, valores in zip(momentos, (x, y, x - y)):
+            m.agregar_arreglo(valores)
+        parcial[metrica] = momentos
+    return parcial
+
+
+def comparar(caso_1, caso_2, n_matches, workers=1, semilla=0, crn=True, confianza=0.95, red=None, catalogo=None,
+             tamano_bloque=TAMANO_BLOQUE, max_tiempo=MAX_TIEMPO):
+    """
+    Compara caso_1 contra caso_2 (rutas a Caso*.json o pares (A, O)) con n_matches combates emparejados. Retorna un
+    DataFrame con una fila por métrica: media de cada configuración, diferencia (1 - 2), su error estándar pareado,
+    el intervalo de confianza y la reducción de varianza respecto de flujos independientes.
+    """
+    configuraciones = [luchadores_caso(caso_1), luchadores_caso(caso_2)]
+    red = red if red is not None else cargar_red()
+    catalogo = catalogo if catalogo is not None else cargar_catalogo("Input/Grafo_Explicito.csv")
+
+    tareas = [(semilla_bloque, n, crn) for semilla_bloque, n in bloques(n_matches, semilla, tamano_bloque)]
+    totales = {metrica: [Momentos(), Momentos(), Momentos()] for metrica in METRICAS_PAREADAS}
+
+    def recibir(parciales):
+        for parcial in parciales:
+            for metrica, momentos in parcial.items():
+                for total, m in zip(totales[metrica], momentos):
+                    total.combinar(m)
+
+    if workers <= 1:
+        _iniciar_worker(red, catalogo, configuraciones, max_tiempo)
+        recibir(map(_comparar_bloque, tareas))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_iniciar_worker,
+            initargs=(red, catalogo, configuraciones, max_tiempo)
+        ) as pool:
+            recibir(pool.map(_comparar_bloque, tareas))
+
+    z = valor_z(confianza)
+    filas = []
+    for metrica, (m1, m2, d) in totales.items():
+        n = d.n
+        error = float(np.sqrt(d.varianza(ddof=1) / n)) if n > 1 else float("inf")
+        var_independiente = m1.varianza(ddof=1) + m2.varianza(ddof=1)
+        var_pareada = d.varianza(ddof=1)
+        filas.append({
+            "metrica": metrica,
+            "combates": n,
+            "media_1": m1.media,
+            "media_2": m2.media,
+            "diferencia": d.media,
+            "error_estandar": error,
+            "ic_inferior": d.media - z * error,
+            "ic_superior": d.media + z * error,
+            "reduccion_varianza": var_independiente / var_pareada if var_pareada > 0 else float("inf")
+        })
+    return pd.DataFrame(filas)
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Comparacion.py Experimentos/Inputs/Caso1.json Experimentos/Inputs/Caso2.json 100000 4 [semilla]
+#     [--independiente]
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if a != "--independiente"]
+    crn = "--independiente" not in sys.argv
+    caso_1 = argumentos[0] if len(argumentos) > 0 else "Experimentos/Inputs/Caso1.json"
+    caso_2 = argumentos[1] if len(argumentos) > 1 else "Experimentos/Inputs/Caso2.json"
+    n = int(argumentos[2]) if len(argumentos) > 2 else 100_000
+    workers = int(argumentos[3]) if len(argumentos) > 3 else 1
+    semilla = int(argumentos[4]) if len(argumentos) > 4 else 0
+
+    tabla = comparar(caso_1, caso_2, n, workers=workers, semilla=semilla, crn=crn)
+    print(f"{caso_1} - {caso_2} ({'números aleatorios comunes' if crn else 'flujos independientes'}):")
+    print(tabla.to_string(index=False))
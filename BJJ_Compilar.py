@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#BJJ_Compilar - Compilación de la CPN de BJJ_CPN a una tabla de estados indexada por enteros
+"""
+Las transiciones de la red no tienen guardas: una transición está habilitada solo según el lugar donde están los
+tokens A y O. Por eso la red completa puede resumirse en una tabla indexada por (lugar de A, lugar de O) que entrega
+las técnicas habilitadas para cada actor y las posiciones resultantes de su versión exitosa y fallida.
+
+Un "movimiento" es una transición _exitoso junto a su par _fallido. Los lugares se identifican por enteros según
+RedCompilada.lugares; el índice FUERA (= len(lugares)) representa un token que salió de la red (p. ej. tras una
+sumisión exitosa).
+"""
+from snakes.nets import Marking, MultiSet
+
+
+#extrae los tokens (A / O) que mueve un arco, sea Value o MultiArc
+def _tokens_arco(label):
+    if hasattr(label, "value"):
+        return [label.value]
+    return [componente.value for componente in label]
+
+
+class RedCompilada:
+    """Tabla de transición de la CPN indexada por enteros (ver compilar_red)."""
+
+    def __init__(self, lugares, movimientos, tabla):
+        self.lugares = lugares
+        self.indice_lugar = {nombre: i for i, nombre in enumerate(lugares)}
+        self.FUERA = len(lugares)
+        self.n_lugares = len(lugares) + 1   #incluye FUERA
+
+        #columnas por movimiento (struct-of-arrays)
+        self.mov_actor = [m["actor"] for m in movimientos]
+        self.mov_exitoso = [m["exitoso"] for m in movimientos]
+        self.mov_fallido = [m["fallido"] for m in movimientos]      #None si la técnica no tiene versión fallida
+        self.mov_id_tecnica = [m["exitoso"].split("_")[0].strip() for m in movimientos]
+        self.mov_dest_exito = [m["dest_exito"] for m in movimientos]
+        self.mov_dest_fallo = [m["dest_fallo"] for m in movimientos]
+        self.indice_movimiento = {m["exitoso"]: i for i, m in enumerate(movimientos)}
+
+        #tabla[actor][estado] -> tupla de movimientos habilitados, estado = posA * n_lugares + posO
+        self.tabla = tabla
+
+        #marcado inicial de BJJ_CPN: ambos tokens en De_Pie
+        self.estado_inicial = self.estado(self.indice_lugar["De_Pie"], self.indice_lugar["De_Pie"])
+
+    def estado(self, pos_A, pos_O):
+        return pos_A * self.n_lugares + pos_O
+
+    def posiciones(self, estado):
+        return divmod(estado, self.n_lugares)
+
+    def nombre_lugar(self, indice):
+        return None if indice == self.FUERA else self.lugares[indice]
+
+    #técnicas habilitadas para un actor en un estado
+    def habilitados(self, actor, estado):
+        return self.tabla[actor][estado]
+
+    #estado resultante de disparar un movimiento (exito=True usa la versión _exitoso)
+    def siguiente(self, movimiento, exito):
+        pos_A, pos_O = self.mov_dest_exito[movimiento] if exito else self.mov_dest_fallo[movimiento]
+        return self.estado(pos_A, pos_O)
+
+    #marcado snakes equivalente a un estado compilado
+    def marcado(self, estado):
+        pos_A, pos_O = self.posiciones(estado)
+        tokens = {}
+        for token, pos in (("A", pos_A), ("O", pos_O)):
+            if pos != self.FUERA:
+                tokens.setdefault(self.lugares[pos], []).append(token)
+        return Marking({lugar: MultiSet(valores) for lugar, valores in tokens.items()})
+
+
+#recorre los arcos de una transición y obtiene lugar de entrada y salida de cada token
+def _arcos_transicion(t):
+    entrada = {}
+    salida = {}
+    for place, label in t.input():
+        for token in _tokens_arco(label):
+            entrada[token] = place.name
+    for place, label in t.output():
+        for token in _tokens_arco(label):
+            salida[token] = place.name
+    return entrada, salida
+
+
+#COMPILACIÓN---------------------------------------------------------------------------------------------------------------------
+#BJJ_Create_Net genera todas las transiciones consumiendo ambos tokens, por lo que cada transición _exitoso
+#corresponde a un único estado de origen y a un único movimiento de la tabla
+def compilar_red(net):
+    lugares = sorted(p.name for p in net.place())
+    indice = {nombre: i for i, nombre in enumerate(lugares)}
+    FUERA = len(lugares)
+    n = len(lugares) + 1
+
+    arcos = {t.name: _arcos_transicion(t) for t in net.transition()}
+
+    #posiciones de salida de una transición, el token que entra y no sale queda FUERA
+    def destinos(salida):
+        return tuple(indice[salida[token]] if token in salida else FUERA for token in ("A", "O"))
+
+    movimientos = []
+    tabla = {"A": [[] for _ in range(n * n)], "O": [[] for _ in range(n * n)]}
+
+    for nombre in sorted(arcos):
+        if "exitoso" not in nombre:
+            continue
+        entrada, salida = arcos[nombre]
+        if set(entrada) != {"A", "O"}:
+            raise ValueError(f"La transición {nombre} no consume ambos tokens, no se puede compilar.")
+
+        actor = "O" if "_inv" in nombre else "A"
+        nombre_fallido = nombre.replace("_exitoso", "_fallido")
+        if nombre_fallido in arcos:
+            dest_fallo = destinos(arcos[nombre_fallido][1])
+        else:
+            #sin versión fallida la técnica falla sin mover posiciones
+            nombre_fallido = None
+            dest_fallo = (indice[entrada["A"]], indice[entrada["O"]])
+
+        movimientos.append({
+            "actor": actor,
+            "exitoso": nombre,
+            "fallido": nombre_fallido,
+            "dest_exito": destinos(salida),
+            "dest_fallo": dest_fallo
+        })
+        tabla[actor][indice[entrada["A"]] * n + indice[entrada["O"]]].append(len(movimientos) - 1)
+
+    tabla = {actor: [tuple(movs) for movs in estados] for actor, estados in tabla.items()}
+    return RedCompilada(lugares, movimientos, tabla)
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+#BJJ_Estadisticas - Estadísticas en línea y combinables para las métricas generales de un caso
+"""
+Momentos acumula n, media y M2 (suma de cuadrados de las desviaciones) con el método de Welford y combina dos
+acumulados con la fórmula de Chan et al., así la media y la desviación estándar de millones de combates se obtienen
+sin guardar los valores, y los parciales de varios workers o de ejecuciones separadas se juntan con el mismo resultado
+que si se hubieran acumulado juntos (salvo el redondeo de punto flotante).
+
+SketchCuantiles es un sketch KLL (Karnin, Lang y Liberty): el nivel h guarda ítems de peso 2^h y cuando un nivel supera
+su capacidad se ordena y la mitad de sus ítems (los pares o los impares, al azar) sube al nivel siguiente. Con k ítems
+en el nivel más alto y capacidades que decrecen en 2/3 hacia abajo usa O(k) memoria para cualquier cantidad de valores
+y dos sketches se combinan juntando sus niveles. Mientras no se compacta (n <= k) los cuantiles son exactos; después el
+error de rango normalizado es a lo más error_rango(k) con ~99% de confianza (1,3% para un cuantil y 1,7% para todos a
+la vez con k = 200, constantes empíricas de Apache DataSketches para KLL): el cuantil q entregado tiene rango real
+entre q - error y q + error. La moneda de cada compactación sale de la semilla del sketch (entero, SeedSequence o
+Generator de numpy), que entrega quien lo crea.
+
+MetricasCombates lleva un Momentos y un SketchCuantiles por métrica de combate y los contadores de victorias, y entrega
+el mismo diccionario que metricas_general.csv de Resultados_analisis.py y la tabla de percentiles. Se alimenta por
+combate (agregar), por tabla de resúmenes por archivo (agregar_resumen) o por lote de MotorLote.simular
+(agregar_lote), y se guarda como JSON para combinar ejecuciones. Sus sketches comparten un generador sembrado con la
+semilla del agregado, así cada métrica compacta con sus propias monedas. intervalo da el intervalo de confianza de una
+probabilidad sobre el total de combates (Wilson) o de la media de una métrica (normal, con la varianza de Welford).
+"""
+import json
+import sys
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from BJJ_Lote import GANA_A, GANA_O
+
+#métricas por combate que se resumen con media, desviación estándar y cuantiles
+METRICAS = ["tiempo_combate", "puntaje_A", "puntaje_O", "mantencion_A", "mantencion_O", "efectividad_A",
+            "efectividad_O"]
+CONTADORES = ["victorias_sum_A", "victorias_sum_O", "victorias_puntos_A", "victorias_puntos_O"]
+
+#probabilidades sobre el total de combates (como resumen() de BJJ_Experimentos): contadores del numerador. frac_sumision
+#es la fracción de todos los combates; prob_sumision de metricas() es el % de las victorias que fueron por sumisión
+PROPORCIONES = {
+    "prob_victoria_A": ["victorias_sum_A", "victorias_puntos_A"],
+    "prob_victoria_O": ["victorias_sum_O", "victorias_puntos_O"],
+    "frac_sumision_A": ["victorias_sum_A"],
+    "frac_sumision_O": ["victorias_sum_O"]
+}
+
+K_SKETCH = 200
+PERCENTILES = [1, 5, 10, 25, 50, 75, 90, 95, 99]
+
+
+#error de rango normalizado de KLL con ~99% de confianza: para un cuantil o, con todos=True, para todos a la vez
+def error_rango(k=K_SKETCH, todos=False):
+    return 2.446 / k ** 0.9433 if todos else 2.296 / k ** 0.9723
+
+
+#z del intervalo bilateral con el nivel de confianza dado
+def valor_z(confianza=0.95):
+    return NormalDist().inv_cdf(0.5 + confianza / 2)
+
+
+#intervalo de Wilson de la proporción exitos / n: (estimación, inferior, superior)
+def intervalo_wilson(exitos, n, z):
+    p = exitos / n
+    denominador = 1 + z * z / n
+    centro = (p + z * z / (2 * n)) / denominador
+    semiancho = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominador
+    return p, float(centro - semiancho), float(centro + semiancho)
+
+
+class Momentos:
+    """Cantidad, media y M2 de una serie de valores (Welford), combinables entre acumulados (Chan)."""
+
+    def __init__(self, n=0, media=0.0, m2=0.0):
+        self.n = n
+        self.media = media
+        self.m2 = m2
+
+    def agregar(self, x):
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (x - self.media)
+
+    #un arreglo completo: sus momentos se calculan con numpy y se combinan como un parcial
+    def agregar_arreglo(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        if valores.size == 0:
+            return
+        media = float(valores.mean())
+        self.combinar(Momentos(int(valores.size), media, float(((valores - media) ** 2).sum())))
+
+    def combinar(self, otro):
+        if otro.n == 0:
+            return self
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        self.media += delta * otro.n / n
+        self.m2 += otro.m2 + delta * delta * self.n * otro.n / n
+        self.n = n
+        return self
+
+    def varianza(self, ddof=0):
+        return self.m2 / (self.n - ddof) if self.n > ddof else float("nan")
+
+    def desviacion(self, ddof=0):
+        return float(np.sqrt(self.varianza(ddof)))
+
+    def a_dict(self):
+        return {"n": self.n, "media": self.media, "m2": self.m2}
+
+
+class SketchCuantiles:
+    """Sketch KLL de cuantiles con memoria acotada, combinable entre workers y ejecuciones."""
+
+    #semilla: entero, SeedSequence o Generator (un Generator se usa tal cual, sin copiarlo)
+    def __init__(self, k=K_SKETCH, semilla=0):
+        self.k = k
+        self.n = 0
+        self.minimo = float("inf")
+        self.maximo = float("-inf")
+        self.niveles = [np.empty(0)]
+        self._rng = np.random.default_rng(semilla)
+
+    #capacidad del nivel h: k en el más alto y 2/3 de la del nivel de arriba hacia abajo (al menos 2)
+    def _capacidad(self, h):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.niveles) - h - 1))))
+
+    def agregar(self, x):
+        return self.agregar_arreglo([x])
+
+    def agregar_arreglo(self, valores):
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        if valores.size == 0:
+            return self
+        self.n += valores.size
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+        self.niveles[0] = np.concatenate([self.niveles[0], valores])
+        self._compactar()
+        return self
+
+    def combinar(self, otro):
+        if otro.n == 0:
+            return self
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append(np.empty(0))
+        for h, nivel in enumerate(otro.niveles):
+            self.niveles[h] = np.concatenate([self.niveles[h], nivel])
+        self.n += otro.n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self._compactar()
+        return self
+
+    def _compactar(self):
+        h = 0
+        while h < len(self.niveles):
+            if len(self.niveles[h]) <= self._capacidad(h):
+                h += 1
+                continue
+            if h + 1 == len(self.niveles):
+                #un nivel nuevo achica las capacidades de los de abajo: se revisan desde el primero
+                self.niveles.append(np.empty(0))
+                h = 0
+                continue
+            nivel = np.sort(self.niveles[h])
+            pares = len(nivel) - len(nivel) % 2     #con cantidad impar el mayor se queda en el nivel
+            self.niveles[h + 1] = np.concatenate([self.niveles[h + 1], nivel[self._rng.integers(2):pares:2]])
+            self.niveles[h] = nivel[pares:]
+            h += 1
+
+    @property
+    def exacto(self):
+        return len(self.niveles) == 1
+
+    #ítems retenidos ordenados con su peso
+    def _items(self):
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(nivel), 2 ** h, dtype=np.int64) for h, nivel in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind="stable")
+        return valores[orden], pesos[orden]
+
+    def cuantiles(self, qs):
+        """Cuantiles qs (entre 0 y 1): interpolación lineal como np.percentile si el sketch es exacto."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.exacto:
+            return np.percentile(self.niveles[0], qs * 100)
+        valores, pesos = self._items()
+        i = np.searchsorted(np.cumsum(pesos), qs * self.n, side="left")
+        resultado = valores[np.minimum(i, len(valores) - 1)]
+        return np.where(qs <= 0, self.minimo, np.where(qs >= 1, self.maximo, resultado))
+
+    def boxplot(self, whis=1.5):
+        """
+        Estadísticas para Axes.bxp con el criterio de plt.boxplot: cuartiles, bigotes en el valor más extremo dentro de
+        whis * IQR y valores atípicos fuera de los bigotes. Si el sketch no es exacto, los bigotes y los atípicos salen
+        de los ítems retenidos (más el mínimo y el máximo reales), así que los atípicos son una muestra.
+        """
+        q1, mediana, q3 = self.cuantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        if self.exacto:
+            valores = self.niveles[0]
+        else:
+            valores = np.concatenate([self._items()[0], [self.minimo, self.maximo]])
+        bajos = valores[valores >= q1 - whis * iqr]
+        altos = valores[valores <= q3 + whis * iqr]
+        whislo = q1 if bajos.size == 0 or bajos.min() > q1 else bajos.min()
+        whishi = q3 if altos.size == 0 or altos.max() < q3 else altos.max()
+        return {
+            "med": mediana, "q1": q1, "q3": q3, "whislo": whislo, "whishi": whishi,
+            "fliers": valores[(valores < whislo) | (valores > whishi)]
+        }
+
+    def a_dict(self):
+        return {"k": self.k, "n": self.n, "minimo": self.minimo, "maximo": self.maximo,
+                "niveles": [nivel.tolist() for nivel in self.niveles]}
+
+    @classmethod
+    def desde_dict(cls, datos, semilla=0):
+        sketch = cls(datos["k"], semilla)
+        sketch.n = datos["n"]
+        sketch.minimo = datos["minimo"]
+        sketch.maximo = datos["maximo"]
+        sketch.niveles = [np.asarray(nivel, dtype=np.float64) for nivel in datos["niveles"]]
+        return sketch
+
+
+class MetricasCombates:
+    """
+    Agregado en línea de las métricas generales: Momentos y SketchCuantiles por métrica de combate y contadores de
+    victorias.
+    """
+
+    def __init__(self, k=K_SKETCH, semilla=0):
+        #un solo generador para las monedas de todos los sketches (cada métrica saca sorteos distintos)
+        self._rng = np.random.default_rng(semilla)
+        self.momentos = {metrica: Momentos() for metrica in METRICAS}
+        self.cuantiles = {metrica: SketchCuantiles(k, self._rng) for metrica in METRICAS}
+        self.contadores = {contador: 0 for contador in CONTADORES}
+
+    #un combate: fila con las columnas METRICAS y el actor que ganó por sumisión ("A", "O" o None)
+    def agregar(self, fila, ganador_sumision=None):
+        for metrica, momentos in self.momentos.items():
+            momentos.agregar(float(fila[metrica]))
+            self.cuantiles[metrica].agregar(float(fila[metrica]))
+        if ganador_sumision in ("A", "O"):
+            self.contadores[f"victorias_sum_{ganador_sumision}"] += 1
+        elif fila["puntaje_A"] > fila["puntaje_O"]:
+            self.contadores["victorias_puntos_A"] += 1
+        elif fila["puntaje_O"] > fila["puntaje_A"]:
+            self.contadores["victorias_puntos_O"] += 1
+        return self
+
+    #tabla de resúmenes por archivo (columnas METRICAS) con el ganador por sumisión de cada fila (NaN si no hubo)
+    def agregar_resumen(self, resumen, ganador_sumision):
+        self._agregar_valores(resumen)
+        ganador_sumision = np.asarray(ganador_sumision, dtype=object)
+        por_puntos = ~np.isin(ganador_sumision, ["A", "O"])
+        puntaje_A = np.asarray(resumen["puntaje_A"])
+        puntaje_O = np.asarray(resumen["puntaje_O"])
+        self._contar(ganador_sumision == "A", ganador_sumision == "O", por_puntos & (puntaje_A > puntaje_O),
+                     por_puntos & (puntaje_O > puntaje_A))
+        return self
+
+    #resultado de MotorLote.simular (con los acumulados por actor: acciones, exitos y mantencion)
+    def agregar_lote(self, resultado):
+        ganador = resultado["ganador"]
+        sumision = resultado["sumision"]
+        valores = {
+            "tiempo_combate": resultado["tiempo"],
+            "puntaje_A": resultado["puntaje_A"],
+            "puntaje_O": resultado["puntaje_O"]
+        }
+        for actor in ("A", "O"):
+            acciones = resultado[f"acciones_{actor}"]
+            hubo = acciones > 0
+            divisor = np.maximum(acciones, 1)
+            valores[f"mantencion_{actor}"] = np.where(hubo, resultado[f"mantencion_{actor}"] / divisor, 0)
+            valores[f"efectividad_{actor}"] = np.where(hubo, resultado[f"exitos_{actor}"] / divisor, 0) * 100
+        self._agregar_valores(valores)
+        self._contar(sumision & (ganador == GANA_A), sumision & (ganador == GANA_O), ~sumision & (ganador == GANA_A),
+                     ~sumision & (ganador == GANA_O))
+        return self
+
+    #los NaN (métricas que el combate no registró, p. ej. mantención de un combate del almacén sin eventos) no se
+    #agregan
+    def _agregar_valores(self, valores):
+        for metrica, momentos in self.momentos.items():
+            arreglo = np.asarray(valores[metrica], dtype=np.float64)
+            arreglo = arreglo[~np.isnan(arreglo)]
+            momentos.agregar_arreglo(arreglo)
+            self.cuantiles[metrica].agregar_arreglo(arreglo)
+
+    def _contar(self, sum_A, sum_O, puntos_A, puntos_O):
+        for contador, marcas in zip(CONTADORES, (sum_A, sum_O, puntos_A, puntos_O)):
+            self.contadores[contador] += int(np.count_nonzero(marcas))
+
+    def combinar(self, otro):
+        for metrica, momentos in self.momentos.items():
+            momentos.combinar(otro.momentos[metrica])
+            self.cuantiles[metrica].combinar(otro.cuantiles[metrica])
+        for contador in CONTADORES:
+            self.contadores[contador] += otro.contadores[contador]
+        return self
+
+    @property
+    def combates(self):
+        return self.momentos["tiempo_combate"].n
+
+    def metricas(self):
+        """Mismo diccionario (y orden de claves) que metricas_general.csv."""
+        c = self.contadores
+        victorias_A = c["victorias_sum_A"] + c["victorias_puntos_A"]
+        victorias_O = c["victorias_sum_O"] + c["victorias_puntos_O"]
+        total_victorias = victorias_A + victorias_O
+        m = self.momentos
+
+        def coef_var(momentos):
+            return momentos.desviacion() / momentos.media if momentos.media > 0 else 0
+
+        return {
+            "tiempo_promedio": m["tiempo_combate"].media,
+            "std_tiempo_combates": m["tiempo_combate"].desviacion(),
+            "victorias_A": victorias_A,
+            "victorias_O": victorias_O,
+            "victorias_sum_A": c["victorias_sum_A"],
+            "victorias_sum_O": c["victorias_sum_O"],
+            "victorias_puntos_A": c["victorias_puntos_A"],
+            "victorias_puntos_O": c["victorias_puntos_O"],
+            "prob_victoria_A_pct": (victorias_A / total_victorias * 100) if total_victorias > 0 else 0,
+            "prob_victoria_O_pct": (victorias_O / total_victorias * 100) if total_victorias > 0 else 0,
+            "prob_sumision_A": (c["victorias_sum_A"] / victorias_A * 100) if victorias_A > 0 else 0,
+            "prob_sumision_O": (c["victorias_sum_O"] / victorias_O * 100) if victorias_O > 0 else 0,
+            "puntaje_A_prom": m["puntaje_A"].media,
+            "puntaje_O_prom": m["puntaje_O"].media,
+            "std_puntaje_A_combates": m["puntaje_A"].desviacion(),
+            "std_puntaje_O_combates": m["puntaje_O"].desviacion(),
+            "mantencion_A_prom": m["mantencion_A"].media,
+            "mantencion_O_prom": m["mantencion_O"].media,
+            "coef_var_mant_A": coef_var(m["mantencion_A"]),
+            "coef_var_mant_O": coef_var(m["mantencion_O"]),
+            "efectividad_A_prom": m["efectividad_A"].media,
+            "efectividad_O_prom": m["efectividad_O"].media
+        }
+
+    def intervalo(self, nombre, confianza=0.95):
+        """
+        (estimación, inferior, superior) de una probabilidad de PROPORCIONES (Wilson) o de la media de una métrica de
+        METRICAS (normal con la desviación muestral). Sin combates suficientes el intervalo es infinito.
+        """
+        n = self.combates
+        z = valor_z(confianza)
+        if nombre in PROPORCIONES:
+            if n == 0:
+                return float("nan"), float("-inf"), float("inf")
+            return intervalo_wilson(sum(self.contadores[c] for c in PROPORCIONES[nombre]), n, z)
+        momentos = self.momentos[nombre]
+        if n < 2:
+            return momentos.media if n else float("nan"), float("-inf"), float("inf")
+        semiancho = z * float(np.sqrt(momentos.varianza(ddof=1) / n))
+        return momentos.media, momentos.media - semiancho, momentos.media + semiancho
+
+    #percentiles de cada métrica desde los sketches (una fila por métrica, columnas p1 ... p99)
+    def tabla_percentiles(self, percentiles=PERCENTILES):
+        qs = np.asarray(percentiles, dtype=np.float64) / 100
+        filas = []
+        for metrica, sketch in self.cuantiles.items():
+            fila = {"metrica": metrica, "combates": sketch.n, "exacto": sketch.exacto,
+                    "error_rango": 0.0 if sketch.exacto else error_rango(sketch.k)}
+            fila.update({f"p{p:g}": valor for p, valor in zip(percentiles, sketch.cuantiles(qs))})
+            filas.append(fila)
+        return pd.DataFrame(filas)
+
+    def a_dict(self):
+        return {"momentos": {metrica: m.a_dict() for metrica, m in self.momentos.items()},
+                "cuantiles": {metrica: s.a_dict() for metrica, s in self.cuantiles.items()},
+                "contadores": dict(self.contadores)}
+
+    @classmethod
+    def desde_dict(cls, datos, semilla=0):
+        agregado = cls(semilla=semilla)
+        for metrica, valores in datos["momentos"].items():
+            agregado.momentos[metrica] = Momentos(**valores)
+        for metrica, valores in datos["cuantiles"].items():
+            agregado.cuantiles[metrica] = SketchCuantiles.desde_dict(valores, agregado._rng)
+        agregado.contadores.update(datos["contadores"])
+        return agregado
+
+    def guardar(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.a_dict(), f, indent=2)
+
+
+def cargar_metricas(ruta, semilla=0):
+    with open(ruta, "r", encoding="utf-8") as f:
+        return MetricasCombates.desde_dict(json.load(f), semilla)
+
+
+#combina varios agregados guardados (workers o ejecuciones separadas) en uno solo
+def combinar_archivos(rutas, semilla=0):
+    agregado = MetricasCombates(semilla=semilla)
+    for ruta in rutas:
+        agregado.combinar(cargar_metricas(ruta))
+    return agregado
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Estadisticas.py parcial_1.json parcial_2.json ... [--salida total.json]
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    salida = None
+    if "--salida" in argumentos:
+        i = argumentos.index("--salida")
+        salida = argumentos[i + 1]
+        argumentos = argumentos[:i] + argumentos[i + 2:]
+
+    total = combinar_archivos(argumentos)
+    print(f"combates: {total.combates}")
+    for clave, valor in total.metricas().items():
+        print(f"{clave}: {valor}")
+    print(total.tabla_percentiles().to_string(index=False))
+    if salida is not None:
+        total.guardar(salida)
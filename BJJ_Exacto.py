@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+#BJJ_Exacto - Probabilidades exactas de cada forma de victoria por programación dinámica sobre la red compilada
+"""
+El combate de BJJ_Motor es un proceso de Markov finito sobre (posA, posO, energíaA, energíaO, tiempo, diferencia de
+puntaje). Este módulo construye sus transiciones a partir de la red compilada y de los perfiles de los luchadores y
+calcula la probabilidad exacta de cada desenlace (sumisión de A / O, puntos de A / O, empate) en el horizonte de
+MAX_TIEMPO segundos.
+
+La energía nunca sube, así que los nodos (posición, energíaA, energíaO) se resuelven de mayor a menor energía total:
+cuando se procesa un nodo ya recibió todo su aporte. Cada nodo guarda un bloque denso de probabilidad por (tiempo,
+diferencia de puntaje). Una transición es un avance base (el tiempo de ejecución) más un núcleo de (Δt, Δdif, prob)
+con la mantención y los puntos: el origen solo anota su bloque en las llegadas del destino, y al procesar el destino
+cada (Δt, Δdif) del núcleo se suma con daxpy sobre el bloque plano, donde el desplazamiento es un corrimiento del
+inicio. La masa que pasa los max_tiempo segundos se decide por puntos y los bordes de cada bloque con masa acumulada
+bajo la tolerancia se recortan antes de propagarlo. Las transiciones sin gasto de energía (costo 1 que redondea a 0,
+o la sumisión no mantenida que dispara su versión fallida) quedan dentro del mismo grupo de energía y se cierran por
+diferencias; la que vuelve a la misma posición se resuelve en forma cerrada. Los desenlaces de cada técnica se
+memorizan por (luchador, movimiento, energía).
+
+Es inducción hacia adelante desde el estado inicial, que da los mismos valores que la inducción hacia atrás para ese
+estado y solo recorre los nodos alcanzables. En Caso1 y Caso3 son ~85-90 mil nodos y el horizonte completo tarda
+~45 s; con max_tiempo = 180 son ~25 mil nodos y ~8 s.
+
+Las probabilidades se obtienen en forma cerrada:
+- elección de técnica: uniforme entre las habilitadas del repertorio;
+- iniciativa: P(A actúa) = P((bA + uA)·cA > (bO + uO)·cO) con uA, uO ~ U(-0.25, 0.25), por integración exacta;
+- mantención: distribución de round/floor de U(0.8·tp, 1.2·tp) por largo de intervalos.
+"""
+import heapq
+import math
+import sys
+
+import numpy as np
+from scipy.linalg.blas import daxpy
+
+from BJJ_Catalogo import info_tecnica
+from BJJ_Motor import MAX_TIEMPO
+from BJJ_Perfil import PerfilLuchador, factor_energia_exito, factor_energia_iniciativa
+
+#desenlaces
+SUMISION_A = "sumision_A"
+SUMISION_O = "sumision_O"
+PUNTOS_A = "puntos_A"
+PUNTOS_O = "puntos_O"
+EMPATE = "empate"
+DESENLACES = [SUMISION_A, SUMISION_O, PUNTOS_A, PUNTOS_O, EMPATE]
+#núcleo de una transición sin mantención: el avance base, sin puntos
+NUCLEO_FIJO = ((0, 0, 1.0),)
+
+
+#primitiva de clip(u, 0, 1)
+def _G(u):
+    if u <= 0:
+        return 0.0
+    if u <= 1:
+        return u * u / 2
+    return u - 0.5
+
+
+#_G sobre arreglos
+def _G_vector(u):
+    return np.where(u <= 0, 0.0, np.where(u <= 1, u * u / 2, u - 0.5))
+
+
+#P(X > Y) con X ~ U[a1, b1] e Y ~ U[a2, b2] independientes (intervalos de largo 0 son constantes)
+def prob_mayor_uniformes(a1, b1, a2, b2):
+    w1 = b1 - a1
+    w2 = b2 - a2
+    if w1 <= 0 and w2 <= 0:
+        return 1.0 if a1 > a2 else 0.0
+    if w1 <= 0:
+        return min(1.0, max(0.0, (a1 - a2) / w2))
+    if w2 <= 0:
+        return min(1.0, max(0.0, (b1 - a2) / w1))
+    return w2 / w1 * (_G((b1 - a2) / w2) - _G((a1 - a2) / w2))
+
+
+#intervalo de la iniciativa (base + U(-0.25, 0.25)) * factor
+def _intervalo_iniciativa(base, factor):
+    extremos = ((base - 0.25) * factor, (base + 0.25) * factor)
+    return min(extremos), max(extremos)
+
+
+#distribución de (mantención, mantenida) para un tiempo de posición tp
+def distribucion_mantencion(tp):
+    if tp <= 0:
+        return [(0, True, 1.0)]
+    bajo = tp * 0.8
+    alto = tp * 1.2
+    largo = alto - bajo
+    salida = []
+    #no mantenida: floor(rp) con rp en [0.8 tp, tp)
+    for k in range(math.floor(bajo), math.ceil(tp)):
+        p = (min(k + 1, tp) - max(k, bajo)) / largo
+        if p > 0:
+            salida.append((k, False, p))
+    #mantenida: round(rp) con rp en [tp, 1.2 tp]
+    for k in range(math.floor(tp), math.ceil(alto) + 1):
+        p = (min(k + 0.5, alto) - max(k - 0.5, tp)) / largo
+        if p > 0:
+            salida.append((k, True, p))
+    return salida
+
+
+class ModeloExacto:
+    """Cadena de Markov del combate A vs O sobre la red compilada."""
+
+    def __init__(self, red, catalogo, A, O, max_tiempo=MAX_TIEMPO):
+        self.red = red
+        self.max_tiempo = max_tiempo
+        self.perfiles = {"A": PerfilLuchador(A, catalogo), "O": PerfilLuchador(O, catalogo)}
+        self.energia_inicial = {"A": A.get("energy", 100), "O": O.get("energy", 100)}
+
+        self.fila = [catalogo.indice_tecnica(nombre) if catalogo is not None else -1 for nombre in red.mov_exitoso]
+        self.info = [info_tecnica(nombre, catalogo) for nombre in red.mov_exitoso]
+        self.mantencion = [distribucion_mantencion(d["tiempo_posicion"]) for d in self.info]
+
+        self.habilitados = {}
+        for actor, luchador in (("A", A), ("O", O)):
+            repertorio = {r.strip() for r in luchador["repertorio"]}
+            self.habilitados[actor] = [
+                [m for m in movs if red.mov_id_tecnica[m] in repertorio] for movs in red.tabla[actor]
+            ]
+        self._cache = {}
+        self.nucleos = []
+        self._indices_nucleo = {}
+        self._extension_nucleo = []
+
+    #desenlaces de ejecutar el movimiento m: lista de (prob, salida) con salida = desenlace (str) o
+    #(estado, gasto de energía, avance de tiempo base, núcleo) para el actor; el núcleo ((Δt, Δdif, prob), ...) reparte
+    #la mantención y los puntos (con el signo del actor) sobre el avance base
+    def _ejecutar(self, actor, m, energia):
+        perfil = self.perfiles[actor]
+        fila = self.fila[m]
+        info = self.info[m]
+        costo = perfil.costo_stamina(fila)
+        P = min(1.0, max(0.0, perfil.prob_base[fila] * factor_energia_exito(energia)))
+        tiempo_ejec = info["tiempo_ejecucion_s"]
+        mantencion = self.mantencion[m]
+        dest_exito = self.red.siguiente(m, True)
+        dest_fallo = self.red.siguiente(m, False)
+        gana = SUMISION_A if actor == "A" else SUMISION_O
+        puntaje = info["puntaje"] if actor == "A" else -info["puntaje"]
+        salida = []
+
+        #regla general de fallo (también para una sumisión que falla ambos sorteos)
+        def fallo(prob):
+            if self.red.mov_fallido[m] is not None:
+                nucleo = tuple((aj, 0, p) for aj, _, p in mantencion)
+                salida.append((prob, (dest_fallo, int(costo * 0.7), tiempo_ejec, nucleo)))
+            else:
+                salida.append((prob, (dest_fallo, int(costo * 0.5), 1, NUCLEO_FIJO)))
+
+        if info["categoria"] == "sumisión":
+            p_mantenida = sum(p for _, mantenida, p in mantencion if mantenida)
+            #primer sorteo exitoso: termina si se mantiene, si no dispara la versión fallida sin costo
+            salida.append((P * p_mantenida, gana))
+            if p_mantenida < 1:
+                salida.append((P * (1 - p_mantenida), (dest_fallo, 0, 0, NUCLEO_FIJO)))
+            #segundo sorteo (regla general): cualquier éxito de sumisión termina el combate
+            salida.append(((1 - P) * P, gana))
+            fallo((1 - P) * (1 - P))
+        else:
+            nucleo = tuple((aj, puntaje if mantenida else 0, p) for aj, mantenida, p in mantencion)
+            salida.append((P, (dest_exito, costo, tiempo_ejec, nucleo)))
+            fallo(1 - P)
+        return salida
+
+    #desenlaces de ejecutar m con la energía dada, memorizados por (actor, movimiento, energía)
+    def _ejecucion(self, actor, m, energia):
+        clave = (actor, m, energia)
+        if clave not in self._cache:
+            self._cache[clave] = self._ejecutar(actor, m, energia)
+        return self._cache[clave]
+
+    #P(A actúa) para cada par (técnica de A, técnica de O) habilitado, como matriz
+    def _prob_iniciativa(self, hab_A, hab_O, eA, eO):
+        cA = factor_energia_iniciativa(eA) * self.perfiles["A"].factor_posicion
+        cO = factor_energia_iniciativa(eO) * self.perfiles["O"].factor_posicion
+        bA = self.perfiles["A"].iniciativa_base[[self.fila[m] for m in hab_A]]
+        bO = self.perfiles["O"].iniciativa_base[[self.fila[m] for m in hab_O]]
+        if cA <= 0 or cO <= 0:
+            #energía tan negativa que el factor se anula o invierte: intervalos degenerados, caso escalar
+            return np.array([
+                [prob_mayor_uniformes(*_intervalo_iniciativa(a, cA), *_intervalo_iniciativa(o, cO)) for o in bO]
+                for a in bA
+            ])
+        a1 = ((bA - 0.25) * cA)[:, None]
+        a2 = ((bO - 0.25) * cO)[None, :]
+        w1 = 0.5 * cA
+        w2 = 0.5 * cO
+        b1 = a1 + w1
+        return w2 / w1 * (_G_vector((b1 - a2) / w2) - _G_vector((a1 - a2) / w2))
+
+    #probabilidad de que cada técnica habilitada sea la que se ejecuta (elección uniforme de cada luchador y sorteo de
+    #iniciativa entre las dos elegidas), como arreglos alineados con habilitados["A"][estado] y ["O"][estado]
+    def pesos(self, estado, eA, eO):
+        hab_A = self.habilitados["A"][estado]
+        hab_O = self.habilitados["O"][estado]
+        if not hab_O:
+            peso_A = np.full(len(hab_A), 1.0 / len(hab_A))
+            peso_O = np.zeros(0)
+        elif not hab_A:
+            peso_A = np.zeros(0)
+            peso_O = np.full(len(hab_O), 1.0 / len(hab_O))
+        else:
+            p_A = self._prob_iniciativa(hab_A, hab_O, eA, eO)
+            p_par = 1.0 / (len(hab_A) * len(hab_O))
+            peso_A = p_A.sum(axis=1) * p_par
+            peso_O = (1 - p_A).sum(axis=0) * p_par
+        return peso_A, peso_O
+
+    #transiciones desde (estado, energía A, energía O): lista de (prob, salida) con salida = desenlace (str),
+    #"sin_tecnicas" o (estado, ΔeA, ΔeO, Δt base, núcleo ((Δt, Δdif, prob), ...))
+    def transiciones(self, estado, eA, eO):
+        hab_A = self.habilitados["A"][estado]
+        hab_O = self.habilitados["O"][estado]
+        if not hab_A and not hab_O:
+            return [(1.0, "sin_tecnicas")]
+        peso_A, peso_O = self.pesos(estado, eA, eO)
+
+        acumulado = {}
+        for actor, movs, pesos, energia in (("A", hab_A, peso_A, eA), ("O", hab_O, peso_O, eO)):
+            for m, peso in zip(movs, pesos.tolist()):
+                if peso <= 0:
+                    continue
+                for p, salida in self._ejecucion(actor, m, energia):
+                    if not isinstance(salida, str):
+                        nuevo, gasto, avance, nucleo = salida
+                        if actor == "A":
+                            salida = (nuevo, -gasto, 0, avance, nucleo)
+                        else:
+                            salida = (nuevo, 0, -gasto, avance, nucleo)
+                    acumulado[salida] = acumulado.get(salida, 0.0) + peso * p
+        return [(p, salida) for salida, p in acumulado.items() if p > 0]
+
+    #índice del núcleo en self.nucleos (cada núcleo distinto se guarda una vez, con su extensión (Δt mínimo, máximo,
+    #Δdif mínimo, máximo))
+    def _indice_nucleo(self, nucleo):
+        indice = self._indices_nucleo.get(nucleo)
+        if indice is None:
+            indice = self._indices_nucleo[nucleo] = len(self.nucleos)
+            self.nucleos.append(nucleo)
+            self._extension_nucleo.append((min(aj for aj, _, _ in nucleo), max(aj for aj, _, _ in nucleo),
+                                           min(dd for _, dd, _ in nucleo), max(dd for _, dd, _ in nucleo)))
+        return indice
+
+    #transiciones de un nodo separadas para resolver: (probabilidad de sumisión de A, de O, de quedarse sin técnicas,
+    #transiciones sin gasto de energía [(estado, índice del núcleo, Δt base, prob)] y con gasto
+    #[((estado, eA, eO), índice del núcleo, Δt base, prob)]). Un lazo al mismo estado sin avance ni puntos (la versión
+    #fallida de una sumisión no mantenida que vuelve a la misma posición) no mueve la masa: se saca y el resto de las
+    #salidas se divide por 1 - p, como si se repitiera hasta salir
+    def _salidas(self, estado, eA, eO):
+        terminal = {SUMISION_A: 0.0, SUMISION_O: 0.0, "sin_tecnicas": 0.0}
+        mismas, arcos = [], []
+        lazo = 0.0
+        for p, salida in self.transiciones(estado, eA, eO):
+            if isinstance(salida, str):
+                terminal[salida] += p
+                continue
+            nuevo, dA, dO, paso, nucleo = salida
+            if dA == 0 and dO == 0 and nuevo == estado and paso == 0 and nucleo == NUCLEO_FIJO:
+                lazo += p
+            elif dA == 0 and dO == 0:
+                mismas.append((nuevo, self._indice_nucleo(nucleo), paso, p))
+            else:
+                arcos.append(((nuevo, eA + dA, eO + dO), self._indice_nucleo(nucleo), paso, p))
+        if lazo:
+            escala = 1.0 / (1.0 - lazo)
+            terminal = {k: p * escala for k, p in terminal.items()}
+            mismas = [(nuevo, nucleo, paso, p * escala) for nuevo, nucleo, paso, p in mismas]
+            arcos = [(clave, nucleo, paso, p * escala) for clave, nucleo, paso, p in arcos]
+        return terminal[SUMISION_A], terminal[SUMISION_O], terminal["sin_tecnicas"], mismas, arcos
+
+    def resolver(self, tolerancia=1e-15):
+        """
+        Calcula la probabilidad de cada desenlace desde el estado inicial. Retorna además "estados" (nodos
+        (posición, energíaA, energíaO) resueltos) y "masa_descartada" (masa bajo la tolerancia que no se propagó:
+        bordes de bloques y ciclos sin gasto de energía; del orden de la tolerancia por nodo).
+        """
+        T = self.max_tiempo
+        desenlace = {d: 0.0 for d in DESENLACES}
+        descartada = 0.0
+
+        #masa de un bloque repartida según el signo de la diferencia de puntaje
+        def por_puntos(d0, columnas):
+            cero = -d0
+            n = len(columnas)
+            desenlace[PUNTOS_O] += float(columnas[:max(0, min(n, cero))].sum())
+            if 0 <= cero < n:
+                desenlace[EMPATE] += float(columnas[cero])
+            desenlace[PUNTOS_A] += float(columnas[max(0, cero + 1):].sum())
+
+        #bloque de un nodo a partir de lo que llegó: cada llegada (t, d, bloque de origen, prob, núcleo) se copia una
+        #vez al ancho del destino (con ceros a la derecha) y cada (Δt, Δdif, prob) del núcleo es un daxpy sobre el
+        #bloque plano, donde el desplazamiento es solo un corrimiento del inicio. Lo que queda después del horizonte
+        #se decide por puntos
+        def repartir(llegado):
+            t_ini, t_fin, d_ini, d_fin = T, 0, math.inf, -math.inf
+            for t, d, arr, _, i in llegado:
+                a_min, a_max, d_min, d_max = extension[i]
+                t_ini = min(t_ini, t + a_min)
+                t_fin = max(t_fin, t + a_max + arr.shape[0])
+                d_ini = min(d_ini, d + d_min)
+                d_fin = max(d_fin, d + d_max + arr.shape[1])
+            filas, ancho = t_fin - t_ini, d_fin - d_ini
+            #una fila de más para que el último daxpy (que arrastra los ceros del relleno) no se salga del bloque
+            plano = np.zeros((filas + 1) * ancho)
+            for t, d, arr, p, i in llegado:
+                nt, nd = arr.shape
+                if nd == ancho and arr.flags.c_contiguous:
+                    relleno = arr.ravel()
+                else:
+                    relleno = np.zeros((nt, ancho))
+                    relleno[:, :nd] = arr
+                    relleno = relleno.ravel()
+                for aj, dd, q in self.nucleos[i]:
+                    inicio = (t + aj - t_ini) * ancho + d + dd - d_ini
+                    daxpy(relleno, plano[inicio:inicio + relleno.size], a=p * q)
+            bloque = plano[:filas * ancho].reshape(filas, ancho)
+            quedan = max(0, min(filas, T - t_ini))
+            if quedan < filas:
+                por_puntos(d_ini, bloque[quedan:].sum(axis=0))
+            return [t_ini, d_ini, bloque[:quedan]]
+
+        #recorta las filas y columnas de los bordes del bloque cuya masa acumulada no pasa la tolerancia
+        def recortar(bloque):
+            t0, d0, arr = bloque
+            filas = arr.sum(axis=1)
+            columnas = arr.sum(axis=0)
+            t_ini = int(np.searchsorted(np.cumsum(filas), tolerancia, side="right"))
+            t_fin = len(filas) - int(np.searchsorted(np.cumsum(filas[::-1]), tolerancia, side="right"))
+            d_ini = int(np.searchsorted(np.cumsum(columnas), tolerancia, side="right"))
+            d_fin = len(columnas) - int(np.searchsorted(np.cumsum(columnas[::-1]), tolerancia, side="right"))
+            if (t_ini, d_ini, t_fin, d_fin) == (0, 0) + arr.shape:
+                return 0.0
+            recortado = arr[t_ini:max(t_ini, t_fin), d_ini:max(d_ini, d_fin)]
+            bloque[0], bloque[1], bloque[2] = t0 + t_ini, d0 + d_ini, recortado
+            return float(filas.sum() - recortado.sum())
+
+        #llegadas[(estado, eA, eO)] = [(t0 + Δt base, d0, bloque de origen, prob, índice del núcleo)]: lo que entra al
+        #nodo por cada transición, sin copiar el bloque de origen hasta repartirlo con el núcleo
+        eA0, eO0 = self.energia_inicial["A"], self.energia_inicial["O"]
+        fijo = self._indice_nucleo(NUCLEO_FIJO)
+        extension = self._extension_nucleo
+        llegadas = {(self.red.estado_inicial, eA0, eO0): [(0, 0, np.ones((1, 1)), 1.0, fijo)]}
+        grupos = {(eA0, eO0): {self.red.estado_inicial}}
+        orden = [(-(eA0 + eO0), eA0, eO0)]
+        resueltos = 0
+
+        #la energía nunca sube: se resuelven los grupos de igual (eA, eO) de mayor a menor eA + eO, así todo el
+        #aporte de grupos anteriores ya llegó cuando se procesa uno
+        while orden:
+            _, eA, eO = heapq.heappop(orden)
+            estados = grupos.pop((eA, eO))
+            salidas = {s: self._salidas(s, eA, eO) for s in estados}
+
+            #cierre dentro del grupo: transiciones sin gasto de energía (avanzan tiempo, o ninguno en sumisiones
+            #no mantenidas) se propagan por diferencias hasta que la masa sale del horizonte o baja de la tolerancia;
+            #las diferencias de cada nodo se juntan en su bloque total al final
+            partes = {}
+            delta = {s: repartir(llegadas.pop((s, eA, eO))) for s in estados}
+            while delta:
+                siguiente = {}
+                for s, bloque in delta.items():
+                    if bloque[2].shape[0] == 0:
+                        continue
+                    partes.setdefault(s, []).append(bloque)
+                    for nuevo, nucleo, avance, p in salidas[s][3]:
+                        if nuevo not in salidas:
+                            salidas[nuevo] = self._salidas(nuevo, eA, eO)
+                        siguiente.setdefault(nuevo, []).append((bloque[0] + avance, bloque[1], bloque[2], p, nucleo))
+                delta = {}
+                for s, llegado in siguiente.items():
+                    bloque = repartir(llegado)
+                    masa = float(bloque[2].sum())
+                    if masa > tolerancia:
+                        delta[s] = bloque
+                    else:
+                        descartada += masa
+
+            for s, diferencias in partes.items():
+                if len(diferencias) == 1:
+                    bloque = diferencias[0]
+                else:
+                    bloque = repartir([(t0, d0, arr, 1.0, fijo) for t0, d0, arr in diferencias])
+                descartada += recortar(bloque)
+                if bloque[2].size == 0:
+                    continue
+                resueltos += 1
+                sumision_A, sumision_O, sin_tecnicas, _, arcos = salidas[s]
+                t0, d0, arr = bloque
+                if sumision_A or sumision_O:
+                    masa = float(arr.sum())
+                    desenlace[SUMISION_A] += masa * sumision_A
+                    desenlace[SUMISION_O] += masa * sumision_O
+                if sin_tecnicas:
+                    por_puntos(d0, arr.sum(axis=0) * sin_tecnicas)
+                for clave, nucleo, avance, p in arcos:
+                    llegado = llegadas.get(clave)
+                    if llegado is None:
+                        llegado = llegadas[clave] = []
+                        grupo = clave[1:]
+                        if grupo not in grupos:
+                            grupos[grupo] = set()
+                            heapq.heappush(orden, (-(grupo[0] + grupo[1]),) + grupo)
+                        grupos[grupo].add(clave[0])
+                    llegado.append((t0 + avance, d0, arr, p, nucleo))
+
+        desenlace["estados"] = resueltos
+        desenlace["masa_descartada"] = descartada
+        return desenlace
+
+
+def resolver_caso(red, catalogo, A, O, max_tiempo=MAX_TIEMPO, tolerancia=1e-15):
+    return ModeloExacto(red, catalogo, A, O, max_tiempo=max_tiempo).resolver(tolerancia=tolerancia)
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Exacto.py Experimentos/Inputs/Caso1.json [max_tiempo]
+if __name__ == "__main__":
+    from BJJ_Catalogo import cargar_catalogo
+    from BJJ_Experimentos import cargar_caso, cargar_red
+
+    caso = sys.argv[1] if len(sys.argv) > 1 else "Experimentos/Inputs/Caso1.json"
+    max_tiempo = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_TIEMPO
+    A, O = cargar_caso(caso)
+    resultado = resolver_caso(cargar_red(), cargar_catalogo("Input/Grafo_Explicito.csv"), A, O, max_tiempo=max_tiempo)
+    for clave, valor in resultado.items():
+        print(f"{clave}: {valor}")
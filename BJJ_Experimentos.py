@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+#BJJ_Experimentos - Ejecución de experimentos Monte Carlo con el motor por lotes repartido en varios procesos
+"""
+run_experiment reparte los combates de un caso (Experimentos/Inputs/Caso*.json) en bloques de TAMANO_BLOQUE combates.
+Cada bloque recibe su propio flujo aleatorio, obtenido con SeedSequence(semilla).spawn(), y los resultados se
+concatenan en el orden de los bloques. Como el flujo depende del bloque y no del proceso que lo ejecuta, el resultado
+es idéntico bit a bit para una misma semilla maestra, sin importar la cantidad de workers.
+
+Cada worker recibe la red compilada y el catálogo una sola vez (en el inicializador del pool) y arma su MotorLote.
+Con un almacén (BJJ_Almacen) o una base SQLite (BJJ_BaseDatos), cada worker guarda sus propios bloques.
+
+Cada bloque devuelve también su agregado de métricas generales (BJJ_Estadisticas.MetricasCombates), que el proceso
+principal combina a medida que terminan los bloques, siempre en el orden de los bloques. Con conservar_combates=False
+los workers no devuelven los arreglos por combate y solo queda el agregado (momentos, contadores y sketches de
+cuantiles), que con un almacén se guarda junto a él como estadisticas_<hash_config>_<semilla>.json.
+
+run_sequential no fija la cantidad de combates: simula rondas de bloques (uno por worker) y se detiene cuando el
+semiancho del intervalo de confianza de cada métrica objetivo (probabilidades de victoria y de sumisión, puntaje
+medio) queda bajo su objetivo, o al llegar a max_combates. El bloque i usa el mismo flujo que en run_experiment, así
+que N combates secuenciales son los mismos N primeros de run_experiment con la misma semilla y tamaño de bloque.
+Detenerse mirando los intervalos deja la cobertura real algo bajo la nominal; min_combates evita cortar con los
+primeros bloques, cuando las estimaciones todavía son inestables.
+"""
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from BJJ_Almacen import Almacen, hash_configuracion, ids_bloque
+from BJJ_Catalogo import cargar_catalogo
+from BJJ_Estadisticas import MetricasCombates
+from BJJ_Lote import GANA_A, GANA_O, SIN_GANADOR, MotorLote
+from BJJ_Motor import MAX_TIEMPO
+
+TAMANO_BLOQUE = 10_000
+
+#ejecución secuencial: bloques más chicos para que los enfrentamientos fáciles se detengan antes
+TAMANO_BLOQUE_SECUENCIAL = 2_000
+MAX_COMBATES_SECUENCIAL = 1_000_000
+#semiancho objetivo de cada métrica (probabilidades como fracción del total de combates, puntaje en puntos)
+OBJETIVOS = {
+    "prob_victoria_A": 0.01,
+    "prob_victoria_O": 0.01,
+    "frac_sumision_A": 0.01,
+    "frac_sumision_O": 0.01,
+    "puntaje_A": 0.25,
+    "puntaje_O": 0.25
+}
+
+#motor del proceso actual (se arma una vez por worker), si se guardan los resultados su almacén / base SQLite y si se
+#devuelven los arreglos por combate
+_MOTOR = None
+_DESTINOS = None
+_CONSERVAR = True
+
+
+#carga el caso de estudio con los luchadores A y O
+def cargar_caso(caso_json):
+    with open(caso_json, "r", encoding="utf-8") as f:
+        luchadores = json.load(f)
+    # Validar que existan las claves esperadas para los luchadores
+    if "A" not in luchadores or "O" not in luchadores:
+        raise KeyError("El archivo JSON no contiene las claves 'A' y 'O' de luchadores necesarias.")
+    return luchadores["A"], luchadores["O"]
+
+
+#nombre corto del caso para las bases de resultados (p. ej. "Caso1" para Experimentos/Inputs/Caso1.json)
+def nombre_caso(caso_json):
+    return os.path.splitext(os.path.basename(caso_json))[0]
+
+
+#red compilada de BJJ_CPN (importar BJJ_CPN construye la red snakes)
+def cargar_red():
+    from BJJ_CPN import net
+    from BJJ_Compilar import compilar_red
+    return compilar_red(net)
+
+
+def _iniciar_worker(red, catalogo, A, O, max_tiempo, destinos=None, conservar_combates=True):
+    global _MOTOR, _DESTINOS, _CONSERVAR
+    _MOTOR = MotorLote(red, catalogo, A, O, max_tiempo=max_tiempo)
+    _CONSERVAR = conservar_combates
+    _DESTINOS = None
+    if destinos is not None:
+        _DESTINOS = dict(destinos, red=red, hash_config=hash_configuracion(A, O, max_tiempo))
+        if destinos.get("almacen") is not None:
+            _DESTINOS["almacen"] = Almacen(destinos["almacen"], red)
+        if destinos.get("base_datos") is not None:
+            from BJJ_BaseDatos import BaseResultados
+            _DESTINOS["base_datos"] = BaseResultados(destinos["base_datos"])
+
+
+#cada worker guarda sus bloques directamente (almacén y/o SQLite); los eventos no vuelven al proceso principal
+def _simular_bloque(args):
+    indice, semilla_bloque, n = args
+    d = _DESTINOS
+    if d is None:
+        resultado = _MOTOR.simular(n, np.random.default_rng(semilla_bloque))
+    else:
+        resultado = _MOTOR.simular(n, np.random.default_rng(semilla_bloque), registrar_eventos=d["guardar_eventos"])
+        ids = ids_bloque(d["hash_config"], d["semilla"], indice, n)
+        if d.get("almacen") is not None:
+            d["almacen"].agregar_lote(resultado, d["semilla"], indice, d["hash_config"])
+        if d.get("base_datos") is not None:
+            d["base_datos"].agregar_lote(resultado, d["red"], d["caso"], d["semilla"], indice, d["hash_config"], ids)
+        resultado["match_id"] = ids
+        resultado.pop("eventos", None)
+    #las monedas de los sketches salen de una hija de la semilla del bloque, no del flujo de sus combates
+    estadisticas = MetricasCombates(semilla=semilla_bloque.spawn(1)[0]).agregar_lote(resultado)
+    if not _CONSERVAR:
+        return {"estadisticas": estadisticas}
+    resultado["estadisticas"] = estadisticas
+    return resultado
+
+
+#semillas y tamaños de cada bloque, fijos para una semilla maestra y un total de combates
+def bloques(n_combates, semilla, tamano_bloque=TAMANO_BLOQUE):
+    n_bloques = -(-n_combates // tamano_bloque)
+    semillas = np.random.SeedSequence(semilla).spawn(n_bloques)
+    tamanos = [min(tamano_bloque, n_combates - i * tamano_bloque) for i in range(n_bloques)]
+    return list(zip(semillas, tamanos))
+
+
+#pool de procesos (o el proceso actual con workers=1) como función que simula una lista de tareas (indice, semilla,
+#n) y entrega sus resultados en orden
+@contextmanager
+def _ejecutor(red, catalogo, A, O, workers, max_tiempo, destinos, conservar_combates):
+    if workers <= 1:
+        _iniciar_worker(red, catalogo, A, O, max_tiempo, destinos, conservar_combates)
+        yield lambda tareas: map(_simular_bloque, tareas)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_iniciar_worker,
+            initargs=(red, catalogo, A, O, max_tiempo, destinos, conservar_combates)
+        ) as pool:
+            yield lambda tareas: pool.map(_simular_bloque, tareas)
+
+
+#combina los agregados de los bloques a medida que llegan (en orden) y guarda los arreglos por combate que traigan
+def _recibir(bloques_simulados, estadisticas, parciales):
+    for parcial in bloques_simulados:
+        estadisticas.combinar(parcial.pop("estadisticas"))
+        if parcial:
+            parciales.append(parcial)
+
+
+#arreglos por combate concatenados en el orden de los bloques, con el agregado en "estadisticas"
+def _concatenar(parciales, estadisticas):
+    resultado = {}
+    if parciales:
+        resultado = {clave: np.concatenate([p[clave] for p in parciales]) for clave in parciales[0]}
+    resultado["estadisticas"] = estadisticas
+    return resultado
+
+
+#ejecuta los bloques en un pool de procesos (o en el proceso actual con workers=1) y concatena los resultados, con el
+#agregado de métricas de todos los bloques en "estadisticas" (semilla: la maestra, para los sketches del agregado).
+#destinos = {"almacen", "base_datos", "semilla", "caso", "guardar_eventos"} guarda cada bloque desde su worker
+def ejecutar_bloques(lista_bloques, red, catalogo, A, O, workers=1, max_tiempo=MAX_TIEMPO, destinos=None,
+                     conservar_combates=True, semilla=0):
+    tareas = [(i, semilla_bloque, n) for i, (semilla_bloque, n) in enumerate(lista_bloques)]
+    estadisticas = MetricasCombates(semilla=semilla)
+    parciales = []
+    with _ejecutor(red, catalogo, A, O, workers, max_tiempo, destinos, conservar_combates) as simular:
+        _recibir(simular(tareas), estadisticas, parciales)
+    return _concatenar(parciales, estadisticas)
+
+
+#destinos de guardado de los workers (None si no se guarda nada)
+def _destinos(case_json, semilla, almacen, base_datos, guardar_eventos):
+    if almacen is None and base_datos is None:
+        return None
+    return {
+        "almacen": almacen,
+        "base_datos": base_datos,
+        "semilla": semilla,
+        "caso": nombre_caso(case_json),
+        "guardar_eventos": guardar_eventos
+    }
+
+
+#agregado de la ejecución junto al almacén del caso
+def _guardar_estadisticas(resultado, almacen, A, O, max_tiempo, semilla):
+    hash_config = hash_configuracion(A, O, max_tiempo)
+    resultado["estadisticas"].guardar(os.path.join(almacen, f"estadisticas_{hash_config:016x}_{semilla}.json"))
+
+
+def run_experiment(case_json, n_matches, workers=1, semilla=0, red=None, catalogo=None,
+                   tamano_bloque=TAMANO_BLOQUE, max_tiempo=MAX_TIEMPO, almacen=None, guardar_eventos=False,
+                   base_datos=None, conservar_combates=True):
+    """
+    Simula n_matches combates del caso case_json repartidos en workers procesos. Retorna los arreglos por combate de
+    MotorLote.simular (en el mismo orden para cualquier cantidad de workers) más la semilla y el caso usados.
+
+    Con almacen (carpeta del caso, BJJ_Almacen) y/o base_datos (archivo SQLite, BJJ_BaseDatos) cada worker guarda
+    sus bloques, con los eventos si guardar_eventos=True, y el resultado trae además el "match_id" de cada combate.
+
+    "estadisticas" trae el agregado de métricas generales (BJJ_Estadisticas.MetricasCombates); con
+    conservar_combates=False es lo único que se retorna, sin los arreglos por combate.
+    """
+    A, O = cargar_caso(case_json)
+    red = red if red is not None else cargar_red()
+    catalogo = catalogo if catalogo is not None else cargar_catalogo("Input/Grafo_Explicito.csv")
+
+    destinos = _destinos(case_json, semilla, almacen, base_datos, guardar_eventos)
+    resultado = ejecutar_bloques(
+        bloques(n_matches, semilla, tamano_bloque), red, catalogo, A, O, workers=workers, max_tiempo=max_tiempo,
+        destinos=destinos, conservar_combates=conservar_combates, semilla=semilla
+    )
+    resultado["semilla"] = semilla
+    resultado["caso"] = case_json
+    if almacen is not None:
+        _guardar_estadisticas(resultado, almacen, A, O, max_tiempo, semilla)
+    return resultado
+
+
+def run_sequential(case_json, objetivos=None, confianza=0.95, workers=1, semilla=0, red=None, catalogo=None,
+                   tamano_bloque=TAMANO_BLOQUE_SECUENCIAL, min_combates=TAMANO_BLOQUE_SECUENCIAL,
+                   max_combates=MAX_COMBATES_SECUENCIAL, max_tiempo=MAX_TIEMPO, almacen=None, guardar_eventos=False,
+                   base_datos=None, conservar_combates=True, verbose=False):
+    """
+    Simula el caso por rondas de workers bloques hasta que el semiancho del intervalo de confianza de cada métrica de
+    objetivos ({métrica: semiancho}, por defecto OBJETIVOS; probabilidades de BJJ_Estadisticas.PROPORCIONES o medias
+    de METRICAS) queda bajo su objetivo, con al menos min_combates y a lo más max_combates.
+
+    Retorna lo mismo que run_experiment más "intervalos" ({métrica: (estimación, inferior, superior)}), "convergido"
+    (False si se detuvo por max_combates) y "rondas".
+    """
+    objetivos = dict(OBJETIVOS if objetivos is None else objetivos)
+    A, O = cargar_caso(case_json)
+    red = red if red is not None else cargar_red()
+    catalogo = catalogo if catalogo is not None else cargar_catalogo("Input/Grafo_Explicito.csv")
+    destinos = _destinos(case_json, semilla, almacen, base_datos, guardar_eventos)
+
+    raiz = np.random.SeedSequence(semilla)
+    estadisticas = MetricasCombates(semilla=semilla)
+    parciales = []
+    n = 0
+    rondas = 0
+    convergido = False
+    intervalos = {}
+    with _ejecutor(red, catalogo, A, O, workers, max_tiempo, destinos, conservar_combates) as simular:
+        while n < max_combates:
+            #una ronda: un bloque por worker (spawn sigue la numeración de bloques(), el último se recorta)
+            tamanos = []
+            while len(tamanos) < max(workers, 1) and n + sum(tamanos) < max_combates:
+                tamanos.append(min(tamano_bloque, max_combates - n - sum(tamanos)))
+            primero = raiz.n_children_spawned
+            tareas = [(primero + j, semilla_bloque, t)
+                      for j, (semilla_bloque, t) in enumerate(zip(raiz.spawn(len(tamanos)), tamanos))]
+            _recibir(simular(tareas), estadisticas, parciales)
+            n += sum(tamanos)
+            rondas += 1
+
+            intervalos = {metrica: estadisticas.intervalo(metrica, confianza) for metrica in objetivos}
+            semianchos = {metrica: (sup - inf) / 2 for metrica, (_, inf, sup) in intervalos.items()}
+            if verbose:
+                print(f"Ronda {rondas}: {n} combates, semianchos " +
+                      ", ".join(f"{metrica}={s:.4f}" for metrica, s in semianchos.items()))
+            if n >= min_combates and all(semianchos[m] <= objetivo for m, objetivo in objetivos.items()):
+                convergido = True
+                break
+
+    resultado = _concatenar(parciales, estadisticas)
+    resultado["semilla"] = semilla
+    resultado["caso"] = case_json
+    resultado["intervalos"] = intervalos
+    resultado["convergido"] = convergido
+    resultado["rondas"] = rondas
+    if almacen is not None:
+        _guardar_estadisticas(resultado, almacen, A, O, max_tiempo, semilla)
+    return resultado
+
+
+#resumen de victorias de un resultado de run_experiment (con conservar_combates=False, desde el agregado)
+def resumen(resultado):
+    if "ganador" not in resultado:
+        return _resumen_estadisticas(resultado["estadisticas"])
+    ganador = resultado["ganador"]
+    sumision = resultado["sumision"]
+    n = len(ganador)
+    return {
+        "combates": n,
+        "prob_victoria_A": float(np.mean(ganador == GANA_A)) if n else 0.0,
+        "prob_victoria_O": float(np.mean(ganador == GANA_O)) if n else 0.0,
+        "prob_empate": float(np.mean(ganador == SIN_GANADOR)) if n else 0.0,
+        "frac_sumision_A": float(np.mean(sumision & (ganador == GANA_A))) if n else 0.0,
+        "frac_sumision_O": float(np.mean(sumision & (ganador == GANA_O))) if n else 0.0,
+        "tiempo_promedio": float(np.mean(resultado["tiempo"])) if n else 0.0
+    }
+
+
+#mismo resumen desde los contadores y momentos de un MetricasCombates
+def _resumen_estadisticas(estadisticas):
+    c = estadisticas.contadores
+    n = estadisticas.combates
+    victorias_A = c["victorias_sum_A"] + c["victorias_puntos_A"]
+    victorias_O = c["victorias_sum_O"] + c["victorias_puntos_O"]
+    return {
+        "combates": n,
+        "prob_victoria_A": victorias_A / n if n else 0.0,
+        "prob_victoria_O": victorias_O / n if n else 0.0,
+        "prob_empate": (n - victorias_A - victorias_O) / n if n else 0.0,
+        "frac_sumision_A": c["victorias_sum_A"] / n if n else 0.0,
+        "frac_sumision_O": c["victorias_sum_O"] / n if n else 0.0,
+        "tiempo_promedio": estadisticas.momentos["tiempo_combate"].media if n else 0.0
+    }
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Experimentos.py Experimentos/Inputs/Caso1.json 100000 4 [semilla] [carpeta del almacén] [base SQLite]
+#     (con "auto" en vez de la cantidad de combates se simula hasta alcanzar OBJETIVOS)
+if __name__ == "__main__":
+    caso = sys.argv[1] if len(sys.argv) > 1 else "Experimentos/Inputs/Caso1.json"
+    n = sys.argv[2] if len(sys.argv) > 2 else "100000"
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    semilla = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    almacen = sys.argv[5] if len(sys.argv) > 5 and sys.argv[5] != "-" else None
+    base_datos = sys.argv[6] if len(sys.argv) > 6 else None
+
+    if n == "auto":
+        resultado = run_sequential(caso, workers=workers, semilla=semilla, almacen=almacen, guardar_eventos=True,
+                                   base_datos=base_datos, verbose=True)
+        for metrica, (estimacion, inferior, superior) in resultado["intervalos"].items():
+            print(f"{metrica}: {estimacion:.4f} [{inferior:.4f}, {superior:.4f}]")
+    else:
+        resultado = run_experiment(caso, int(n), workers=workers, semilla=semilla, almacen=almacen,
+                                   guardar_eventos=True, base_datos=base_datos)
+    for clave, valor in resumen(resultado).items():
+        print(f"{clave}: {valor}")
+    print(resultado["estadisticas"].tabla_percentiles().to_string(index=False))
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+#BJJ_Liga - Liga todos contra todos sobre un plantel de luchadores con ranking Bradley-Terry / Elo
+"""
+Un plantel es un JSON con luchadores con nombre, cada uno con el formato de los luchadores de los casos:
+
+    {"Nombre 1": {"fueAt": 3, "fueDef": 3, "velAt": 4, "velDef": 3, "energy": 100, "repertorio": ["T01", ...]}, ...}
+
+Input/Luchadores.json y los Caso*.json ya son planteles de dos luchadores ("A" y "O"); plantel_desde_casos junta los
+luchadores de varios casos con nombres "Caso1.A", "Caso1.O", ...
+
+jugar_liga simula n_matches combates por cada par ordenado (i, j) con i != j, i en el rol A y j en el rol O, así cada
+par se enfrenta en ambos roles. Cada worker compila un solo MotorLote con el plantel completo en ambos roles (perfiles y
+habilitados por luchador sobre la red compilada compartida) y simula un lote de emparejamientos por llamada, con el
+índice de luchador de cada combate, así el costo por emparejamiento es el de sus combates y no el de armar un motor.
+Los lotes de emparejamientos tienen un tamaño fijo y semillas derivadas de la semilla maestra, por lo que la liga es
+reproducible sin importar la cantidad de workers.
+
+Resultados: matrices (luchador, oponente) de victorias y combates sumando ambos roles, la matriz de probabilidad de
+victoria y un ranking con la fuerza de Bradley-Terry (máxima verosimilitud por el algoritmo MM de Hunter, los empates
+cuentan medio punto) y su equivalente en escala Elo (1500 de media, 400 puntos por un factor 10 en las odds).
+"""
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from BJJ_Catalogo import cargar_catalogo
+from BJJ_Experimentos import cargar_caso, cargar_red, nombre_caso
+from BJJ_Lote import GANA_A, GANA_O, MotorLote
+from BJJ_Motor import MAX_TIEMPO
+
+ATRIBUTOS_LUCHADOR = ["fueAt", "fueDef", "velAt", "velDef", "energy", "repertorio"]
+#emparejamientos por llamada a MotorLote.simular (lote de tamano_tarea * n_matches combates)
+TAMANO_TAREA = 256
+ELO_MEDIO = 1500
+ESCALA_ELO = 400
+
+#motor con el plantel completo en ambos roles del proceso actual (se arma una vez por worker)
+_MOTOR = None
+
+
+#valida un luchador del plantel (mismas claves que los luchadores de los casos)
+def _validar_luchador(nombre, luchador):
+    faltantes = [a for a in ATRIBUTOS_LUCHADOR if a not in luchador]
+    if faltantes:
+        raise KeyError(f"El luchador '{nombre}' del plantel no tiene {', '.join(faltantes)}")
+    return luchador
+
+
+#carga un plantel {nombre: luchador} desde un JSON
+def cargar_plantel(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        plantel = json.load(f)
+    return {nombre: _validar_luchador(nombre, luchador) for nombre, luchador in plantel.items()}
+
+
+def guardar_plantel(plantel, ruta):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(plantel, f, indent=4, ensure_ascii=False)
+
+
+#plantel con los luchadores A y O de cada caso ("Caso1.A", "Caso1.O", ...)
+def plantel_desde_casos(rutas):
+    plantel = {}
+    for ruta in rutas:
+        A, O = cargar_caso(ruta)
+        plantel[f"{nombre_caso(ruta)}.A"] = A
+        plantel[f"{nombre_caso(ruta)}.O"] = O
+    return plantel
+
+
+#plantel de n luchadores al azar (atributos uniformes en [minimo, maximo] y repertorio de entre tam_repertorio
+#técnicas del catálogo), para probar la liga a escala
+def plantel_aleatorio(n, catalogo, semilla=0, minimo=1, maximo=5, tam_repertorio=(10, 40)):
+    rng = np.random.default_rng(semilla)
+    ids = sorted(catalogo.indice)
+    plantel = {}
+    for i in range(n):
+        atributos = rng.integers(minimo, maximo + 1, size=4)
+        tam = int(rng.integers(tam_repertorio[0], min(tam_repertorio[1], len(ids)) + 1))
+        plantel[f"L{i + 1:03d}"] = {
+            "fueAt": int(atributos[0]),
+            "fueDef": int(atributos[1]),
+            "velAt": int(atributos[2]),
+            "velDef": int(atributos[3]),
+            "energy": 100,
+            "repertorio": sorted(rng.choice(ids, size=tam, replace=False).tolist())
+        }
+    return plantel
+
+
+#todos los pares ordenados (i, j), i != j: (índices en el rol A, índices en el rol O)
+def emparejamientos(n_luchadores):
+    i, j = np.nonzero(~np.eye(n_luchadores, dtype=bool))
+    return i.astype(np.int64), j.astype(np.int64)
+
+
+def _iniciar_worker(red, catalogo, luchadores, max_tiempo):
+    global _MOTOR
+    _MOTOR = MotorLote(red, catalogo, luchadores, luchadores, max_tiempo=max_tiempo)
+
+
+#simula un lote de emparejamientos con n combates cada uno; retorna por emparejamiento (victorias A, victorias O,
+#sumisiones A, sumisiones O)
+def _simular_tarea(args):
+    indice_A, indice_O, n, semilla = args
+    luchador_A = np.repeat(indice_A, n)
+    luchador_O = np.repeat(indice_O, n)
+    resultado = _MOTOR.simular(len(luchador_A), np.random.default_rng(semilla),
+                               luchador_A=luchador_A, luchador_O=luchador_O)
+    ganador = resultado["ganador"].reshape(-1, n)
+    sumision = resultado["sumision"].reshape(-1, n)
+    return np.stack([
+        (ganador == GANA_A).sum(axis=1),
+        (ganador == GANA_O).sum(axis=1),
+        ((ganador == GANA_A) & sumision).sum(axis=1),
+        ((ganador == GANA_O) & sumision).sum(axis=1)
+    ])
+
+
+def bradley_terry(victorias, combates, previa=0.5, tolerancia=1e-10, max_iteraciones=10_000):
+    """
+    Fuerzas de Bradley-Terry (media geométrica 1) por máxima verosimilitud con el algoritmo MM. victorias[i, j] son
+    los puntos de i contra j (empates como medio punto) y combates[i, j] los combates entre ambos. previa agrega un
+    empate ficticio de ese peso entre cada par, para que un luchador sin victorias no quede con fuerza 0.
+    """
+    n = len(combates)
+    fuera_diagonal = ~np.eye(n, dtype=bool)
+    w = victorias.sum(axis=1) + previa * (n - 1) / 2
+    N = combates + previa * fuera_diagonal
+    p = np.ones(n)
+    for _ in range(max_iteraciones):
+        denominador = (N / (p[:, None] + p[None, :])).sum(axis=1)
+        nuevo = w / denominador
+        nuevo /= np.exp(np.mean(np.log(nuevo)))
+        if np.max(np.abs(np.log(nuevo) - np.log(p))) < tolerancia:
+            return nuevo
+        p = nuevo
+    return p
+
+
+#fuerzas de Bradley-Terry en escala Elo: P(i gana a j) = 1 / (1 + 10^((elo_j - elo_i) / 400))
+def elo_desde_bradley_terry(fuerzas):
+    return ELO_MEDIO + ESCALA_ELO * np.log10(fuerzas)
+
+
+def jugar_liga(plantel, n_matches=100, workers=1, semilla=0, red=None, catalogo=None, tamano_tarea=TAMANO_TAREA,
+               max_tiempo=MAX_TIEMPO, verbose=False):
+    """
+    Liga todos contra todos del plantel ({nombre: luchador} o ruta a un JSON de plantel) con n_matches combates por
+    par ordenado. Retorna un diccionario con los nombres, las matrices (luchador, oponente) de victorias, sumisiones,
+    combates y probabilidad de victoria (ambos roles sumados), la matriz victorias_A (rol A contra rol O) y el ranking.
+    """
+    plantel = cargar_plantel(plantel) if isinstance(plantel, str) else plantel
+    nombres = list(plantel)
+    luchadores = [plantel[nombre] for nombre in nombres]
+    n = len(luchadores)
+    if n < 2:
+        raise ValueError("La liga necesita al menos dos luchadores")
+    red = red if red is not None else cargar_red()
+    catalogo = catalogo if catalogo is not None else cargar_catalogo("Input/Grafo_Explicito.csv")
+
+    indice_A, indice_O = emparejamientos(n)
+    cortes = range(0, len(indice_A), tamano_tarea)
+    semillas = np.random.SeedSequence(semilla).spawn(len(cortes))
+    tareas = [(indice_A[c:c + tamano_tarea], indice_O[c:c + tamano_tarea], n_matches, s)
+              for c, s in zip(cortes, semillas)]
+    if verbose:
+        print(f"Liga: {n} luchadores, {len(indice_A)} emparejamientos, {len(indice_A) * n_matches} combates")
+
+    conteos = []
+    if workers <= 1:
+        _iniciar_worker(red, catalogo, luchadores, max_tiempo)
+        resultados = map(_simular_tarea, tareas)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                                   initargs=(red, catalogo, luchadores, max_tiempo))
+        resultados = pool.map(_simular_tarea, tareas)
+    try:
+        for i, conteo in enumerate(resultados, 1):
+            conteos.append(conteo)
+            if verbose and i % 50 == 0:
+                print(f"  {i}/{len(tareas)} lotes de emparejamientos")
+    finally:
+        if workers > 1:
+            pool.shutdown(cancel_futures=True)
+    gana_A, gana_O, sum_A, sum_O = np.concatenate(conteos, axis=1)
+
+    #matrices por rol (fila en el rol A, columna en el rol O) y sumando ambos roles (fila contra columna)
+    victorias_A = np.zeros((n, n), dtype=np.int64)
+    victorias_O = np.zeros((n, n), dtype=np.int64)
+    sumisiones_A = np.zeros((n, n), dtype=np.int64)
+    sumisiones_O = np.zeros((n, n), dtype=np.int64)
+    victorias_A[indice_A, indice_O] = gana_A
+    victorias_O[indice_A, indice_O] = gana_O
+    sumisiones_A[indice_A, indice_O] = sum_A
+    sumisiones_O[indice_A, indice_O] = sum_O
+    victorias = victorias_A + victorias_O.T
+    sumisiones = sumisiones_A + sumisiones_O.T
+    combates = np.where(np.eye(n, dtype=bool), 0, 2 * n_matches)
+    empates = combates - victorias - victorias.T
+    with np.errstate(invalid="ignore"):
+        probabilidad = np.where(combates > 0, victorias / np.maximum(combates, 1), np.nan)
+
+    fuerzas = bradley_terry(victorias + empates / 2, combates)
+    elo = elo_desde_bradley_terry(fuerzas)
+    ranking = pd.DataFrame({
+        "luchador": nombres,
+        "elo": elo,
+        "fuerza_bt": fuerzas,
+        "victorias": victorias.sum(axis=1),
+        "sumisiones": sumisiones.sum(axis=1),
+        "empates": empates.sum(axis=1),
+        "combates": combates.sum(axis=1),
+        "prob_victoria": victorias.sum(axis=1) / combates.sum(axis=1),
+        "prob_victoria_A": victorias_A.sum(axis=1) / (n_matches * (n - 1)),
+        "prob_victoria_O": victorias_O.T.sum(axis=1) / (n_matches * (n - 1))
+    }).sort_values("elo", ascending=False, ignore_index=True)
+    ranking.insert(0, "puesto", np.arange(1, n + 1))
+
+    return {
+        "nombres": nombres,
+        "victorias": victorias,
+        "sumisiones": sumisiones,
+        "combates": combates,
+        "probabilidad": probabilidad,
+        "victorias_A": victorias_A,
+        "ranking": ranking
+    }
+
+
+#escribe ranking.csv y las matrices de probabilidad de victoria y de victorias en rol A (con nombres) en carpeta
+def guardar_liga(liga, carpeta):
+    os.makedirs(carpeta, exist_ok=True)
+    liga["ranking"].to_csv(os.path.join(carpeta, "ranking.csv"), index=False)
+    pd.DataFrame(liga["probabilidad"], index=liga["nombres"], columns=liga["nombres"]).to_csv(
+        os.path.join(carpeta, "probabilidad_victoria.csv"))
+    pd.DataFrame(liga["victorias_A"], index=liga["nombres"], columns=liga["nombres"]).to_csv(
+        os.path.join(carpeta, "victorias_rol_A.csv"))
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Liga.py plantel.json 100 4 [semilla] [carpeta]
+#     python BJJ_Liga.py Experimentos/Inputs/Caso1.json,Experimentos/Inputs/Caso2.json 100 4 [semilla] [carpeta]
+#     python BJJ_Liga.py --aleatorio 300 100 4 [semilla] [carpeta]
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    if argumentos and argumentos[0] == "--aleatorio":
+        fuente = int(argumentos[1])
+        argumentos = argumentos[2:]
+    else:
+        fuente = argumentos[0] if argumentos else "Input/Luchadores.json"
+        argumentos = argumentos[1:]
+    n = int(argumentos[0]) if len(argumentos) > 0 else 100
+    workers = int(argumentos[1]) if len(argumentos) > 1 else 1
+    semilla = int(argumentos[2]) if len(argumentos) > 2 else 0
+    carpeta = argumentos[3] if len(argumentos) > 3 else None
+
+    if isinstance(fuente, int):
+        plantel = plantel_aleatorio(fuente, cargar_catalogo("Input/Grafo_Explicito.csv"), semilla)
+    elif "," in fuente:
+        plantel = plantel_desde_casos(fuente.split(","))
+    else:
+        plantel = cargar_plantel(fuente)
+
+    liga = jugar_liga(plantel, n, workers, semilla, verbose=True)
+    print(liga["ranking"].head(20).to_string(index=False))
+    if carpeta:
+        guardar_liga(liga, carpeta)
+        print(f"Ranking y matrices guardados en {carpeta}")
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#BJJ_LogBinario - Registro binario de combates con enteros de ancho fijo y lector memory-mapped
+"""
+Un archivo .bjjlog tiene un encabezado y luego un evento por registro de ancho fijo (REGISTRO, 18 bytes):
+
+    combate, tiempo, tecnica, mantencion, puntaje_A, puntaje_O, actor, resultado, pos_A, pos_O
+
+Los nombres de técnica y de lugar se guardan como códigos contra la red compilada: la técnica es m para el nombre
+_exitoso del movimiento m y n_movimientos + m para su versión _fallido; los lugares usan RedCompilada.lugares y FUERA
+para un token fuera de la red (celda vacía en el CSV). actor es 0 = A / 1 = O y resultado 0 = fallo / 1 = exito.
+
+El encabezado es MAGICO, el largo del JSON (uint32) y un JSON con las tablas de nombres, rellenado hasta múltiplo de
+64 bytes, así el archivo se decodifica sin la red que lo escribió. leer_log abre los registros con np.memmap, sin
+copiar ni parsear texto, y a_dataframe los decodifica al mismo formato de los registro_bjj_*.csv.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from BJJ_Registro import CAMPOS_EVENTO, Sumidero
+
+MAGICO = b"BJJLOG1\0"
+ALINEACION = 64
+
+REGISTRO = np.dtype([
+    ("combate", "<u4"),
+    ("tiempo", "<i2"),
+    ("tecnica", "<i2"),
+    ("mantencion", "<i2"),
+    ("puntaje_A", "<i2"),
+    ("puntaje_O", "<i2"),
+    ("actor", "u1"),
+    ("resultado", "u1"),
+    ("pos_A", "u1"),
+    ("pos_O", "u1")
+])
+
+ACTORES = ["A", "O"]
+RESULTADOS = ["fallo", "exito"]
+
+
+#tablas de nombres de una red compilada: técnicas (_exitoso y luego _fallido por movimiento) y lugares
+def diccionario_red(red):
+    n = len(red.mov_exitoso)
+    tecnicas = list(red.mov_exitoso) + [f if f is not None else "" for f in red.mov_fallido]
+    return {"tecnicas": tecnicas, "lugares": list(red.lugares), "n_movimientos": n}
+
+
+def encabezado(diccionario):
+    cuerpo = json.dumps(diccionario, ensure_ascii=False).encode("utf-8")
+    largo = len(MAGICO) + 4 + len(cuerpo)
+    relleno = -largo % ALINEACION
+    return MAGICO + struct.pack("<I", len(cuerpo)) + cuerpo + b" " * relleno
+
+
+class Codificador:
+    """Codifica eventos (dicts del Simulador o pasos de MotorLote) como registros contra la red compilada."""
+
+    def __init__(self, red):
+        self.red = red
+        self.diccionario = diccionario_red(red)
+        self.n_movimientos = self.diccionario["n_movimientos"]
+        #nombre -> código; un nombre _fallido nunca coincide con uno _exitoso
+        self._codigo_tecnica = {nombre: i for i, nombre in enumerate(self.diccionario["tecnicas"]) if nombre}
+        self._codigo_lugar = dict(red.indice_lugar)
+        self._codigo_lugar[None] = red.FUERA
+        self._codigo_lugar[""] = red.FUERA
+
+    #lista de eventos con las claves de CAMPOS_EVENTO; ids es el valor de la columna id_combate de cada uno
+    def eventos(self, eventos, ids, dtype=REGISTRO, id_combate="combate"):
+        registros = np.empty(len(eventos), dtype=dtype)
+        registros[id_combate] = ids
+        registros["tiempo"] = [e["tiempo"] for e in eventos]
+        registros["tecnica"] = [self._codigo_tecnica[e["tecnica"]] for e in eventos]
+        registros["mantencion"] = [e["mantencion"] for e in eventos]
+        registros["puntaje_A"] = [e["puntaje_A"] for e in eventos]
+        registros["puntaje_O"] = [e["puntaje_O"] for e in eventos]
+        registros["actor"] = [ACTORES.index(e["actor"]) for e in eventos]
+        registros["resultado"] = [RESULTADOS.index(e["resultado"]) for e in eventos]
+        registros["pos_A"] = [self._codigo_lugar[e["pos_A"]] for e in eventos]
+        registros["pos_O"] = [self._codigo_lugar[e["pos_O"]] for e in eventos]
+        return registros
+
+    #un paso de MotorLote (arreglos por combate activo), sin pasar por textos
+    def paso(self, evento, ids, dtype=REGISTRO, id_combate="combate"):
+        m = evento["movimiento"]
+        pos_A, pos_O = self.red.posiciones(evento["estado"])
+        registros = np.empty(len(m), dtype=dtype)
+        registros[id_combate] = ids
+        registros["tiempo"] = evento["tiempo"]
+        registros["tecnica"] = np.where(evento["nombre_fallido"], self.n_movimientos + m, m)
+        registros["mantencion"] = evento["mantencion"]
+        registros["puntaje_A"] = evento["puntaje_A"]
+        registros["puntaje_O"] = evento["puntaje_O"]
+        registros["actor"] = evento["actor"]
+        registros["resultado"] = evento["resultado"]
+        registros["pos_A"] = pos_A
+        registros["pos_O"] = pos_O
+        return registros
+
+
+class SumideroBinario(Sumidero):
+    """Sumidero de BJJ_Registro que codifica los eventos contra la red compilada y los escribe como REGISTRO."""
+
+    def __init__(self, ruta, red, **kwargs):
+        super().__init__(ruta, ["combate"] + CAMPOS_EVENTO, **kwargs)
+        self.red = red
+        self.codificador = Codificador(red)
+        self.diccionario = self.codificador.diccionario
+        self._archivo = open(ruta, "wb")
+        self._archivo.write(encabezado(self.diccionario))
+
+    def _escribir_buffer(self, eventos):
+        registros = self.codificador.eventos(eventos, [e.get("combate", 0) for e in eventos])
+        self._archivo.write(registros.tobytes())
+        self._archivo.flush()
+
+    #escribe los eventos de MotorLote.simular(..., registrar_eventos=True) ya codificados, sin pasar por textos
+    def escribir_lote(self, resultado, primer_combate=0):
+        for evento in resultado["eventos"]:
+            self.escribir_paso(evento, primer_combate)
+        self._archivo.flush()
+
+    #escribe un paso del lote (un diccionario de arreglos de "eventos"); MotorLote.simular(..., sumidero=...) lo usa
+    #para escribir cada paso al generarlo
+    def escribir_paso(self, evento, primer_combate=0):
+        self.vaciar()
+        registros = self.codificador.paso(evento, evento["combate"] + primer_combate)
+        self._archivo.write(registros.tobytes())
+        self.eventos_escritos += len(registros)
+
+    def _cerrar_archivo(self):
+        self._archivo.close()
+
+
+#lee el encabezado de un archivo con formato .bjjlog: (diccionario, byte donde empiezan los registros)
+def leer_encabezado(ruta):
+    with open(ruta, "rb") as f:
+        if f.read(len(MAGICO)) != MAGICO:
+            raise ValueError(f"{ruta} no es un registro binario BJJ")
+        (largo,) = struct.unpack("<I", f.read(4))
+        diccionario = json.loads(f.read(largo).decode("utf-8"))
+    inicio = len(MAGICO) + 4 + largo
+    return diccionario, inicio + (-inicio % ALINEACION)
+
+
+#registros de ancho fijo desde el byte inicio como np.memmap (un registro final incompleto se ignora)
+def mapear_registros(ruta, dtype, inicio):
+    n = (os.path.getsize(ruta) - inicio) // dtype.itemsize
+    if n <= 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(ruta, dtype=dtype, mode="r", offset=inicio, shape=(n,))
+
+
+#abre un .bjjlog: (registros como np.memmap de REGISTRO, diccionario de nombres del encabezado)
+def leer_log(ruta):
+    diccionario, inicio = leer_encabezado(ruta)
+    return mapear_registros(ruta, REGISTRO, inicio), diccionario
+
+
+#decodifica un .bjjlog a un DataFrame con las columnas de los registro_bjj_*.csv más "combate"
+def a_dataframe(ruta):
+    registros, diccionario = leer_log(ruta)
+    return decodificar(registros, diccionario, "combate")
+
+
+#DataFrame de registros codificados: la columna id (combate o match_id) y luego las de los registro_bjj_*.csv
+def decodificar(registros, diccionario, id_combate="combate"):
+    tecnicas = np.array(diccionario["tecnicas"], dtype=object)
+    lugares = np.array(diccionario["lugares"] + [None], dtype=object)
+    return pd.DataFrame({
+        id_combate: np.asarray(registros[id_combate]),
+        "tiempo": registros["tiempo"].astype(np.int64),
+        "actor": np.array(ACTORES, dtype=object)[registros["actor"]],
+        "tecnica": tecnicas[registros["tecnica"]],
+        "resultado": np.array(RESULTADOS, dtype=object)[registros["resultado"]],
+        "mantencion": registros["mantencion"].astype(np.int64),
+        "pos_A": lugares[registros["pos_A"]],
+        "pos_O": lugares[registros["pos_O"]],
+        "puntaje_A": registros["puntaje_A"].astype(np.int64),
+        "puntaje_O": registros["puntaje_O"].astype(np.int64)
+    })
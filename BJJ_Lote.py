@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+#BJJ_Lote - Motor por lotes: simula miles de combates a la vez con arreglos NumPy
+"""
+MotorLote mantiene N combates como arreglos (estado compilado (posA, posO), energía, puntaje, tiempo y fin) y los
+avanza todos un paso a la vez, con las mismas reglas estocásticas que Simulador.ejecutar_tecnica:
+
+- cada actor elige al azar una técnica habilitada de su repertorio y actúa el de mayor iniciativa;
+- sumisión: si tiene éxito y se mantiene más que el tiempo de posición termina el combate, si no se mantiene se
+  dispara la versión fallida sin costo de tiempo ni energía; si no tiene éxito pasa a la regla general;
+- regla general: éxito resta el costo de stamina y suma puntaje si se mantuvo la posición, fallo resta el 70% del
+  costo (50% y 1 segundo si la técnica no tiene versión fallida).
+
+Cada paso consume una matriz de uniformes de forma (N, SORTEOS) con una columna fija por sorteo, aunque el combate ya
+haya terminado. Así el combate i en el paso k usa siempre los mismos números para la misma semilla, sin importar la
+configuración de los luchadores (necesario para números aleatorios comunes).
+"""
+import numpy as np
+
+from BJJ_Catalogo import info_tecnica
+from BJJ_Motor import MAX_TIEMPO
+from BJJ_Perfil import PerfilLuchador
+
+#columnas de la matriz de sorteos de cada paso
+U_ELECCION_A = 0
+U_ELECCION_O = 1
+U_RUIDO_A = 2
+U_RUIDO_O = 3
+U_POSICION = 4
+U_EXITO = 5
+U_EXITO_GENERAL = 6     #segundo sorteo de éxito de una sumisión que no tuvo éxito en el primero
+SORTEOS = 7
+
+#códigos de ganador
+SIN_GANADOR = 0
+GANA_A = 1
+GANA_O = 2
+
+#códigos de resultado de un evento
+FALLO = 0
+EXITO = 1
+
+
+class MotorLote:
+    """
+    Tablas del combate A vs O sobre la red compilada, listas para simular lotes de combates. A y O pueden ser listas
+    de luchadores (planteles): las tablas se compilan una vez por luchador y simular recibe qué luchador de cada lista
+    pelea cada combate, así un lote puede mezclar muchos emparejamientos.
+    """
+
+    def __init__(self, red, catalogo, A, O, max_tiempo=MAX_TIEMPO):
+        self.red = red
+        self.catalogo = catalogo
+        self.max_tiempo = max_tiempo
+        planteles = {"A": A if isinstance(A, list) else [A], "O": O if isinstance(O, list) else [O]}
+        self.perfiles = {actor: [PerfilLuchador(d, catalogo) for d in plantel] for actor, plantel in planteles.items()}
+        self.n_luchadores = {actor: len(plantel) for actor, plantel in planteles.items()}
+
+        n_mov = len(red.mov_exitoso)
+        filas = np.array(
+            [catalogo.indice_tecnica(nombre) if catalogo is not None else -1 for nombre in red.mov_exitoso],
+            dtype=np.int64
+        )
+        info = [info_tecnica(nombre, catalogo) for nombre in red.mov_exitoso]
+
+        #datos por movimiento (el perfil usado es el del actor que ejecuta el movimiento)
+        self.tiempo_posicion = np.array([d["tiempo_posicion"] for d in info], dtype=np.float64)
+        self.tiempo_ejecucion = np.array([d["tiempo_ejecucion_s"] for d in info], dtype=np.int64)
+        self.puntaje = np.array([d["puntaje"] for d in info], dtype=np.int64)
+        self.es_sumision = np.array([d["categoria"] == "sumisión" for d in info], dtype=bool)
+        self.tiene_fallido = np.array([nombre is not None for nombre in red.mov_fallido], dtype=bool)
+        self.dest_exito = np.array([red.estado(*d) for d in red.mov_dest_exito], dtype=np.int64)
+        self.dest_fallo = np.array([red.estado(*d) for d in red.mov_dest_fallo], dtype=np.int64)
+
+        #datos por (luchador, movimiento): una fila por luchador de A y luego una por luchador de O
+        perfiles = self.perfiles["A"] + self.perfiles["O"]
+        self.prob_base = np.array([p.prob_base[filas] for p in perfiles])
+        self.costo = np.array([p.costo[filas] for p in perfiles])
+        self.iniciativa_base = np.array([p.iniciativa_base[filas] for p in perfiles])
+
+        #habilitados por luchador y estado, filtrados por repertorio: matriz [luchador, estado, k] rellenada con -1 y
+        #cantidad por luchador y estado
+        self.habilitados = {}
+        self.n_habilitados = {}
+        for actor, plantel in planteles.items():
+            por_luchador = []
+            for luchador in plantel:
+                repertorio = {r.strip() for r in luchador["repertorio"]}
+                por_luchador.append([
+                    [m for m in movs if red.mov_id_tecnica[m] in repertorio]
+                    for movs in red.tabla[actor]
+                ])
+            k = max(1, max(len(movs) for por_estado in por_luchador for movs in por_estado))
+            tabla = np.full((len(plantel), len(red.tabla[actor]), k), -1, dtype=np.int64)
+            for i, por_estado in enumerate(por_luchador):
+                for estado, movs in enumerate(por_estado):
+                    tabla[i, estado, :len(movs)] = movs
+            self.habilitados[actor] = tabla
+            self.n_habilitados[actor] = np.array(
+                [[len(movs) for movs in por_estado] for por_estado in por_luchador], dtype=np.int64
+            )
+
+        self.energia_inicial = {actor: np.array([p.energia_inicial for p in self.perfiles[actor]], dtype=np.int64)
+                                for actor in ("A", "O")}
+        self.factor_posicion = {actor: np.array([p.factor_posicion for p in self.perfiles[actor]])
+                                for actor in ("A", "O")}
+        self.n_movimientos = n_mov
+
+    #elige un movimiento habilitado por combate con el uniforme u (-1 si no hay); luchador es el índice en el plantel
+    #del actor (escalar o uno por combate)
+    def _elegir(self, actor, luchador, estado, u):
+        n = self.n_habilitados[actor][luchador, estado]
+        k = np.minimum((u * n).astype(np.int64), np.maximum(n - 1, 0))
+        return np.where(n > 0, self.habilitados[actor][luchador, estado, k], -1), n > 0
+
+    #iniciativa vectorizada: (base + ruido) * factor de energía * factor de posición, -1 si no hay técnica; fila es la
+    #fila del luchador en las tablas por (luchador, movimiento)
+    def _iniciativa(self, actor, luchador, fila, movimiento, hay, energia, u):
+        ruido = -0.25 + 0.5 * u
+        base = self.iniciativa_base[fila, np.where(hay, movimiento, 0)]
+        iniciativa = (base + ruido) * (0.95 + (energia / 100) * 0.10) * self.factor_posicion[actor][luchador]
+        return np.where(hay, iniciativa, -1.0)
+
+    #SIMULACIÓN POR LOTES-----------------------------------------------------------------------------------------------------
+    def simular(self, n, rng, sorteos=None, registrar_eventos=False, luchador_A=None, luchador_O=None, sumidero=None,
+                primer_combate=0):
+        """
+        Simula n combates desde De_Pie. rng es un numpy.random.Generator; si se entrega sorteos(paso) se usa esa
+        función para obtener la matriz (n, SORTEOS) de uniformes de cada paso en lugar de rng. Con planteles,
+        luchador_A y luchador_O son arreglos de largo n con el índice en cada plantel del luchador de cada combate
+        (por defecto el primero).
+
+        Retorna un diccionario de arreglos por combate (tiempo, puntaje_A/O, energia_A/O, ganador, sumision,
+        movimiento_sumision, pasos y, por actor, acciones_A/O, exitos_A/O y mantencion_A/O sumada) y, con
+        registrar_eventos=True, la lista "eventos" con un diccionario de arreglos por paso (combate, tiempo, actor,
+        movimiento, resultado, nombre_fallido, mantencion, estado, puntaje_A/O). Esa lista guarda todos los eventos del
+        lote hasta el final (del orden de n * pasos filas): para lotes grandes conviene entregar un sumidero de
+        BJJ_Registro, al que los eventos de cada paso se escriben apenas se generan (con la columna "combate" desde
+        primer_combate) sin acumularlos.
+        """
+        luchador_A = np.asarray(luchador_A, dtype=np.int64) if luchador_A is not None else None
+        luchador_O = np.asarray(luchador_O, dtype=np.int64) if luchador_O is not None else None
+        n_A = self.n_luchadores["A"]
+
+        #índices en los planteles de los combates idx (escalares sin planteles)
+        def luchadores(idx):
+            lA = luchador_A[idx] if luchador_A is not None else 0
+            lO = luchador_O[idx] if luchador_O is not None else 0
+            return lA, lO
+
+        estado = np.full(n, self.red.estado_inicial, dtype=np.int64)
+        lA, lO = luchadores(slice(None))
+        energia_A = np.full(n, self.energia_inicial["A"][lA], dtype=np.int64)
+        energia_O = np.full(n, self.energia_inicial["O"][lO], dtype=np.int64)
+        puntaje_A = np.zeros(n, dtype=np.int64)
+        puntaje_O = np.zeros(n, dtype=np.int64)
+        tiempo = np.zeros(n, dtype=np.int64)
+        pasos = np.zeros(n, dtype=np.int64)
+        ganador = np.zeros(n, dtype=np.int8)
+        sumision = np.zeros(n, dtype=bool)
+        movimiento_sumision = np.full(n, -1, dtype=np.int64)
+        #acumulados por actor: éxitos y mantención de A en los 32 bits altos y de O en los bajos
+        acciones_A = np.zeros(n, dtype=np.int64)
+        exitos = np.zeros(n, dtype=np.int64)
+        mantencion_total = np.zeros(n, dtype=np.int64)
+        activo = np.ones(n, dtype=bool)
+        eventos = []
+
+        paso = 0
+        while True:
+            activo &= tiempo < self.max_tiempo
+            idx = np.flatnonzero(activo)
+            if idx.size == 0:
+                break
+
+            U = sorteos(paso) if sorteos is not None else rng.random((n, SORTEOS))
+            paso += 1
+            U = U[idx]
+            s = estado[idx]
+            lA, lO = luchadores(idx)
+
+            #técnicas habilitadas (ya filtradas por repertorio) y elección al azar
+            t_A, hay_A = self._elegir("A", lA, s, U[:, U_ELECCION_A])
+            t_O, hay_O = self._elegir("O", lO, s, U[:, U_ELECCION_O])
+
+            #sin técnicas para disparar se finaliza el combate
+            sin_tecnicas = ~hay_A & ~hay_O
+            if sin_tecnicas.any():
+                activo[idx[sin_tecnicas]] = False
+                seguir = ~sin_tecnicas
+                idx, s, U = idx[seguir], s[seguir], U[seguir]
+                t_A, hay_A, t_O, hay_O = t_A[seguir], hay_A[seguir], t_O[seguir], hay_O[seguir]
+                if idx.size == 0:
+                    continue
+                lA, lO = luchadores(idx)
+
+            eA = energia_A[idx]
+            eO = energia_O[idx]
+
+            #iniciativa, actúa A solo si supera a O y tiene técnica
+            ini_A = self._iniciativa("A", lA, lA, t_A, hay_A, eA, U[:, U_RUIDO_A])
+            ini_O = self._iniciativa("O", lO, n_A + lO, t_O, hay_O, eO, U[:, U_RUIDO_O])
+            actua_A = ((ini_A > ini_O) & hay_A) | ~hay_O
+            m = np.where(actua_A, t_A, t_O)
+            energia = np.where(actua_A, eA, eO)
+            #fila del luchador que actúa en las tablas por (luchador, movimiento)
+            fila = np.where(actua_A, lA, n_A + lO)
+
+            #tiempo de mantención: uniforme +-20% del tiempo en posición, redondeado si se mantuvo y truncado si no
+            tp = self.tiempo_posicion[m]
+            random_posicion = tp * 0.8 + (tp * 1.2 - tp * 0.8) * U[:, U_POSICION]
+            mantenida = random_posicion >= tp
+            mantencion = np.where(mantenida, np.round(random_posicion), np.floor(random_posicion)).astype(np.int64)
+
+            #probabilidad de éxito con el factor de energía (0.1 si la energía es negativa)
+            P = self.prob_base[fila, m] * np.where(energia < 0, 0.1, energia / 100)
+            es_sumision = self.es_sumision[m]
+            sumision_exito = es_sumision & (U[:, U_EXITO] < P)
+            #la regla general usa el primer sorteo, salvo en sumisiones que ya lo consumieron
+            exito_general = ~sumision_exito & (np.where(es_sumision, U[:, U_EXITO_GENERAL], U[:, U_EXITO]) < P)
+
+            sumision_mantenida = sumision_exito & mantenida
+            sumision_soltada = sumision_exito & ~mantenida
+            fallo = ~sumision_exito & ~exito_general
+            fallo_con_transicion = fallo & self.tiene_fallido[m]
+            fallo_sin_transicion = fallo & ~self.tiene_fallido[m]
+            exito = sumision_mantenida | exito_general
+
+            costo = self.costo[fila, m]
+            gasto = np.where(exito, costo, 0)
+            gasto = np.where(fallo_con_transicion, (costo * 0.7).astype(np.int64), gasto)
+            gasto = np.where(fallo_sin_transicion, (costo * 0.5).astype(np.int64), gasto)
+
+            avance = np.where(exito | fallo_con_transicion, self.tiempo_ejecucion[m] + mantencion, 0)
+            avance = np.where(fallo_sin_transicion, 1, avance)
+
+            nuevo_estado = np.where(exito, self.dest_exito[m], s)
+            nuevo_estado = np.where(sumision_soltada | fallo_con_transicion, self.dest_fallo[m], nuevo_estado)
+
+            puntos = np.where(exito_general & mantenida, self.puntaje[m], 0)
+
+            #aplicar cambios
+            estado[idx] = nuevo_estado
+            tiempo[idx] += avance
+            pasos[idx] += 1
+            energia_A[idx] = eA - np.where(actua_A, gasto, 0)
+            energia_O[idx] = eO - np.where(actua_A, 0, gasto)
+            puntaje_A[idx] += np.where(actua_A, puntos, 0)
+            puntaje_O[idx] += np.where(actua_A, 0, puntos)
+            desplazamiento = np.where(actua_A, 32, 0)
+            acciones_A[idx] += actua_A
+            exitos[idx] += exito.astype(np.int64) << desplazamiento
+            mantencion_total[idx] += mantencion << desplazamiento
+
+            #detección de sumisión: cualquier éxito de una técnica de sumisión termina el combate
+            termina = exito & es_sumision
+            if termina.any():
+                fin = idx[termina]
+                activo[fin] = False
+                sumision[fin] = True
+                movimiento_sumision[fin] = m[termina]
+                ganador[fin] = np.where(actua_A[termina], GANA_A, GANA_O)
+
+            if registrar_eventos or sumidero is not None:
+                evento = {
+                    "combate": idx,
+                    "tiempo": tiempo[idx],
+                    "actor": np.where(actua_A, 0, 1).astype(np.int8),
+                    "movimiento": m,
+                    "resultado": np.where(exito, EXITO, FALLO).astype(np.int8),
+                    "nombre_fallido": fallo_con_transicion,
+                    "mantencion": mantencion,
+                    "estado": nuevo_estado,
+                    "puntaje_A": puntaje_A[idx],
+                    "puntaje_O": puntaje_O[idx]
+                }
+                if registrar_eventos:
+                    eventos.append(evento)
+                if sumidero is not None:
+                    self.escribir_paso(evento, sumidero, primer_combate)
+
+        #victoria por puntos (o empate) si no hubo sumisión
+        por_puntos = ~sumision
+        ganador[por_puntos & (puntaje_A > puntaje_O)] = GANA_A
+        ganador[por_puntos & (puntaje_O > puntaje_A)] = GANA_O
+
+        resultado = {
+            "tiempo": tiempo,
+            "puntaje_A": puntaje_A,
+            "puntaje_O": puntaje_O,
+            "energia_A": energia_A,
+            "energia_O": energia_O,
+            "ganador": ganador,
+            "sumision": sumision,
+            "movimiento_sumision": movimiento_sumision,
+            "pasos": pasos,
+            "acciones_A": acciones_A,
+            "acciones_O": pasos - acciones_A,
+            "exitos_A": exitos >> 32,
+            "exitos_O": exitos & 0xFFFFFFFF,
+            "mantencion_A": mantencion_total >> 32,
+            "mantencion_O": mantencion_total & 0xFFFFFFFF
+        }
+        if registrar_eventos:
+            resultado["eventos"] = eventos
+        return resultado
+
+    #convierte los eventos de un combate del lote al formato de registro de Simulador.combate()
+    def registro_combate(self, resultado, i):
+        registro = []
+        for evento in resultado["eventos"]:
+            j = np.flatnonzero(evento["combate"] == i)
+            if j.size == 0:
+                continue
+            j = j[0]
+            m = int(evento["movimiento"][j])
+            pos_A, pos_O = self.red.posiciones(int(evento["estado"][j]))
+            registro.append({
+                "tiempo": int(evento["tiempo"][j]),
+                "actor": "A" if evento["actor"][j] == 0 else "O",
+                "tecnica": self.red.mov_fallido[m] if evento["nombre_fallido"][j] else self.red.mov_exitoso[m],
+                "resultado": "exito" if evento["resultado"][j] == EXITO else "fallo",
+                "pos_A": self.red.nombre_lugar(pos_A),
+                "pos_O": self.red.nombre_lugar(pos_O),
+                "mantencion": int(evento["mantencion"][j]),
+                "puntaje_A": int(evento["puntaje_A"][j]),
+                "puntaje_O": int(evento["puntaje_O"][j])
+            })
+        return registro
+
+    #escribe los eventos de un resultado con registrar_eventos=True en un sumidero de BJJ_Registro, paso a paso
+    #(combates intercalados, identificados por la columna "combate" desde primer_combate). El resultado ya tiene los
+    #eventos de todo el lote en memoria: para no acumularlos, simular(..., sumidero=...) escribe cada paso al generarlo
+    def escribir_eventos(self, resultado, sumidero, primer_combate=0):
+        for evento in resultado["eventos"]:
+            self.escribir_paso(evento, sumidero, primer_combate)
+
+    #escribe los eventos de un paso del lote (un diccionario de arreglos de "eventos") en un sumidero; el binario de
+    #BJJ_LogBinario los codifica directo desde los arreglos
+    def escribir_paso(self, evento, sumidero, primer_combate=0):
+        if hasattr(sumidero, "escribir_paso"):
+            sumidero.escribir_paso(evento, primer_combate)
+            return
+        for j in range(len(evento["combate"])):
+            m = int(evento["movimiento"][j])
+            pos_A, pos_O = self.red.posiciones(int(evento["estado"][j]))
+            sumidero.escribir({
+                "combate": primer_combate + int(evento["combate"][j]),
+                "tiempo": int(evento["tiempo"][j]),
+                "actor": "A" if evento["actor"][j] == 0 else "O",
+                "tecnica": self.red.mov_fallido[m] if evento["nombre_fallido"][j] else self.red.mov_exitoso[m],
+                "resultado": "exito" if evento["resultado"][j] == EXITO else "fallo",
+                "pos_A": self.red.nombre_lugar(pos_A),
+                "pos_O": self.red.nombre_lugar(pos_O),
+                "mantencion": int(evento["mantencion"][j]),
+                "puntaje_A": int(evento["puntaje_A"][j]),
+                "puntaje_O": int(evento["puntaje_O"][j])
+            })
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+#BJJ_Motor - Motor de combate reutilizable sobre la CPN de BJJ_CPN
+"""
+Contiene las reglas de combate (iniciativa, stamina, probabilidad de éxito y ejecución de técnicas) y la clase
+Simulador, que encapsula el ciclo principal de BJJ_Simulation.py. El Simulador guarda el marcado inicial de la red
+(ambos tokens en De_Pie) y una copia de los luchadores, de modo que un mismo proceso puede ejecutar muchos combates
+seguidos llamando a combate(), sin volver a cargar el catálogo de técnicas ni el modelo CPN.
+"""
+import copy
+import math
+import random
+
+from BJJ_Catalogo import info_tecnica
+from BJJ_Compilar import compilar_red
+from BJJ_Perfil import (compilar_perfiles, costo_stamina, factor_energia_exito, factor_energia_iniciativa,
+                        factor_posicion, iniciativa_base, probabilidad_base)
+
+MAX_TIEMPO = 6 * 60 #maximo de pasos de simulacion = 6 minutos si lo tomamos como segundo
+
+#FUNCIONES ESCENCIALES---------------------------------------------------------------------------------------------------------------------------
+#clase (ofensiva / defensiva / neutral) precalculada en el catálogo, neutral si la técnica no está en el grafo
+def _clase_tecnica(nombre_tecnica, catalogo):
+    return info_tecnica(nombre_tecnica, catalogo)["clase"]
+
+
+#obtiene la posición actual de los tokens.
+def obtener_posiciones(net):
+    posiciones = {"A": None, "O": None}
+
+    for p_name, place in net._place.items():
+        tokens = list(place.tokens)
+        for token in tokens:
+            token_str = str(token).strip().replace("'", "")
+            if token_str in posiciones:
+                posiciones[token_str] = p_name
+
+    return posiciones
+
+
+#calcular iniciativa funciona en base a los atributos de un luchador, combina velocidad y fuerza (promedio), considerando la energía
+#se usa luego para ver que luchador hace su ataque primero
+def calcular_iniciativa(datos, nombre_tecnica, catalogo, rng=random):
+    clase = _clase_tecnica(nombre_tecnica, catalogo)
+    # --- Ruido más fuerte para romper ciclos ---
+    ruido = rng.uniform(-0.25, 0.25)
+    iniciativa = iniciativa_base(datos, clase) + ruido
+    # Factores externos
+    iniciativa *= factor_energia_iniciativa(datos.get("energy", 100))
+    iniciativa *= factor_posicion(datos)
+    return iniciativa
+
+
+#permite modificar el gasto de energia de un luchador en base a sus atributos y categoría de técnica a ejecutar
+def mod_stamina(actor, nombre_tecnica, catalogo):
+    datos_tecnica = info_tecnica(nombre_tecnica, catalogo)
+    costo_base = datos_tecnica.get("costo_stamina", 5)  # valor por defecto
+    return costo_stamina(actor, datos_tecnica["clase"], costo_base)
+
+
+#probabilidad de exito toma atributos de luchador y categoria y define si una técnica es exitosa o fallida, retorna bool.
+def prob_exito(actor, nombre_tecnica, catalogo, rng=random):
+    clase = _clase_tecnica(nombre_tecnica, catalogo)
+    P = probabilidad_base(actor, clase) * factor_energia_exito(actor.get("energy", 0))
+    n = rng.random()
+    return n < P
+
+
+#SIMULADOR---------------------------------------------------------------------------------------------------------------------
+class Simulador:
+    """
+    Motor de combate reutilizable. Recibe la red (net de BJJ_CPN), los diccionarios de ambos luchadores y el catálogo de
+    técnicas; cada llamada a combate() reinicia marcado, energía y puntajes antes de simular.
+
+    Con usar_tabla=True (por defecto) las técnicas habilitadas y los disparos se resuelven con la tabla de
+    BJJ_Compilar y el marcado snakes solo se actualiza al llamar a sincronizar_marcado(). Con usar_tabla=False se
+    usa la red snakes directamente (modes() y fire() en cada paso), como referencia.
+
+    En ambos modos las posiciones (posA, posO) se mantienen como estado y se actualizan con los arcos de salida de la
+    transición disparada. Con depurar=True además se disparan las transiciones en snakes y se compara el estado con el
+    marcado real (y las técnicas habilitadas con modes()), lanzando RuntimeError ante cualquier desincronización.
+    """
+
+    def __init__(self, net, A, O, catalogo, max_tiempo=MAX_TIEMPO, semilla=None, verbose=False,
+                 usar_tabla=True, red=None, depurar=False):
+        self.net = net
+        self.catalogo = catalogo
+        self.max_tiempo = max_tiempo
+        self.verbose = verbose
+        self.usar_tabla = usar_tabla
+        self.depurar = depurar
+        self.rng = random.Random(semilla)
+        self.red = red if red is not None else compilar_red(net)
+
+        #copias de la configuración inicial, los combates trabajan sobre copias de estas
+        self._A_inicial = copy.deepcopy(A)
+        self._O_inicial = copy.deepcopy(O)
+        #marcado inicial de BJJ_CPN (ambos tokens en De_Pie), independiente del estado en que otro motor dejó la red
+        self._marcado_inicial = self.red.marcado(self.red.estado_inicial)
+
+        #repertorio normalizado y cache de movimientos habilitados por (actor, estado) filtrados por repertorio
+        self._repertorio = {
+            "A": {r.strip() for r in A["repertorio"]},
+            "O": {r.strip() for r in O["repertorio"]}
+        }
+        self._cache_habilitados = {}
+        self._cache_posiciones = {}
+
+        #perfiles compilados de ambos luchadores y datos del catálogo por movimiento de la red compilada
+        self.perfiles = compilar_perfiles(self._A_inicial, self._O_inicial, catalogo)
+        self._fila_mov = [catalogo.indice_tecnica(nombre) if catalogo is not None else -1 for nombre in self.red.mov_exitoso]
+        self._info_mov = [info_tecnica(nombre, catalogo) for nombre in self.red.mov_exitoso]
+
+        self.A = None
+        self.O = None
+        self.estado = None
+        self.reiniciar()
+
+    #restaura marcado inicial, energía y puntaje de ambos luchadores
+    def reiniciar(self):
+        self.net.set_marking(self._marcado_inicial)
+        self.estado = self.red.estado_inicial
+        self._marcado_sincronizado = True
+        self.A = copy.deepcopy(self._A_inicial)
+        self.O = copy.deepcopy(self._O_inicial)
+        #adición de puntaje (no proviene de archivo de entrada)
+        self.A["puntaje"] = 0
+        self.O["puntaje"] = 0
+
+    #lleva el estado compilado al marcado de la red snakes (solo necesario en modo tabla)
+    def sincronizar_marcado(self):
+        if not self._marcado_sincronizado:
+            self.net.set_marking(self.red.marcado(self.estado))
+            self._marcado_sincronizado = True
+        return self.net
+
+    def _log(self, *args):
+        if self.verbose:
+            print(*args)
+
+    #verifica las transiciones habilitadas dependiendo de donde se encuentren los tokens en la CPN.
+    #retorna índices de movimiento de la red compilada, ya filtrados por el repertorio del actor
+    def transiciones_habilitadas(self, actor):
+        if not self.usar_tabla:
+            return self._habilitadas_snakes(actor)
+
+        clave = (actor, self.estado)
+        habilitadas = self._cache_habilitados.get(clave)
+        if habilitadas is None:
+            habilitadas = self._filtrar_por_repertorio(actor, self.red.habilitados(actor, self.estado))
+            self._cache_habilitados[clave] = habilitadas
+
+        if self.depurar:
+            habilitadas_red = self._habilitadas_snakes(actor)
+            if habilitadas_red != habilitadas:
+                raise RuntimeError(
+                    f"Desincronización de técnicas habilitadas para {actor} en {self.posiciones()}: "
+                    f"tabla {[self.red.mov_exitoso[m] for m in habilitadas]}, "
+                    f"red {[self.red.mov_exitoso[m] for m in habilitadas_red]}"
+                )
+        return habilitadas
+
+    #verifica elementos de lista de movimientos habilitados con el repertorio en base al ID de técnica
+    def _filtrar_por_repertorio(self, actor, movimientos):
+        repertorio = self._repertorio[actor]
+        return [m for m in movimientos if self.red.mov_id_tecnica[m] in repertorio]
+
+    #versión original: recorre todas las transiciones de la red y consulta modes() en cada una
+    def _habilitadas_snakes(self, actor):
+        habilitadas = []
+
+        for t in self.net.transition():
+            nombre = t.name
+
+            # Solo aceptar transiciones 'exitoso'
+            if "exitoso" not in nombre:
+                continue
+
+            # ==== FILTRO POR ACTOR ====
+            if actor == "A" and ("_inv" in nombre):
+                continue  # A no puede ejecutar transiciones de O
+
+            if actor == "O" and ("_inv" not in nombre):
+                continue  # O no puede ejecutar transiciones de A
+
+            # ==== CHEQUEO DE HABILITACIÓN REAL ====
+            try:
+                modos = list(t.modes())
+                if modos:
+                    habilitadas.append(self.red.indice_movimiento[nombre])
+            except Exception:
+                pass
+        #mismo orden que la tabla compilada, para que ambos modos consuman el rng igual
+        return self._filtrar_por_repertorio(actor, sorted(habilitadas))
+
+    #dispara la versión exitosa o fallida de un movimiento; el nuevo estado sale de los arcos de salida compilados
+    def _disparar(self, movimiento, exito):
+        self.estado = self.red.siguiente(movimiento, exito)
+        if self.usar_tabla and not self.depurar:
+            self._marcado_sincronizado = False
+            return
+
+        nombre = self.red.mov_exitoso[movimiento] if exito else self.red.mov_fallido[movimiento]
+        self.net.transition(nombre).fire(frozenset())
+        if self.depurar:
+            self._verificar_marcado(nombre)
+
+    #compara las posiciones del estado con las que se obtienen recorriendo el marcado snakes
+    def _verificar_marcado(self, nombre):
+        posiciones_red = obtener_posiciones(self.net)
+        if posiciones_red != self.posiciones():
+            raise RuntimeError(
+                f"Desincronización tras disparar {nombre}: estado {self.posiciones()}, marcado {posiciones_red}"
+            )
+
+    #posiciones actuales de los tokens (nombre de lugar o None si el token salió de la red), en O(1)
+    def posiciones(self):
+        posiciones = self._cache_posiciones.get(self.estado)
+        if posiciones is None:
+            pos_A, pos_O = self.red.posiciones(self.estado)
+            posiciones = {"A": self.red.nombre_lugar(pos_A), "O": self.red.nombre_lugar(pos_O)}
+            self._cache_posiciones[self.estado] = posiciones
+        return posiciones
+
+    #ejecución de técnica selecionada y retorna el resultado de exito o fallo
+    def ejecutar_tecnica(self, actor, movimiento, tiempo_simulacion):
+        rng = self.rng
+        actor_dict = self.A if actor == "A" else self.O
+        perfil = self.perfiles[actor]
+        nombre = self.red.mov_exitoso[movimiento]  # ej: "T26_exitoso"
+        fila = self._fila_mov[movimiento]
+
+        # Obtener datos desde el catálogo y costo desde el perfil compilado del luchador
+        datos = self._info_mov[movimiento]
+        tiempo_posicion = datos["tiempo_posicion"]
+        categoria = datos["categoria"]
+        costo_stamina = perfil.costo_stamina(fila)
+        tiempo_ejec = datos["tiempo_ejecucion_s"]
+        puntaje = datos["puntaje"]
+
+        #genera un numero randomico entre el 20%+- del tiempo en posición, para despues comparar y poder asignar el puntaje
+        random_posicion = rng.uniform((tiempo_posicion*0.8),(tiempo_posicion*1.2))
+
+        #truncamos si es menor redondeamos si es mayor (para manejar numeros enteros)
+        if random_posicion >= tiempo_posicion:
+            random_ajustado = round(random_posicion)
+        else:
+            random_ajustado = math.floor(random_posicion)
+
+        #REVISION DE SUMISION, SOLO SE EJECUTA LA SUMISION EXITOSA SI LA TECNICA LOGRA SER MANTENIDA MAS QUE EL TIEMPO PROMEDIO DEFINIDO EN EL GRAFO
+        #(la categoría del grafo viene normalizada a minúsculas)
+        if categoria == "sumisión" and rng.random() < perfil.prob_exito(fila, actor_dict["energy"]):
+            if random_posicion >= tiempo_posicion:
+                self._disparar(movimiento, True)            #dispara transición
+                actor_dict["energy"] -= costo_stamina       #resta stamina
+                tiempo_simulacion += tiempo_ejec            #suma tiempo ejecucion
+                tiempo_simulacion += random_ajustado
+                return "exito", nombre, tiempo_simulacion, random_ajustado       #suma tiempo de mantencion de tecnica
+            else:
+                self._disparar(movimiento, False)           #dispara la version fallida de la sumisión
+                return "fallo", nombre, tiempo_simulacion, random_ajustado
+
+        #EJECUCION DE TECNICA QUE NO ES DE SUMISION
+        if rng.random() < perfil.prob_exito(fila, actor_dict["energy"]):  # ÉXITO
+            self._disparar(movimiento, True)
+            #siempre resta energia y suma el tiempo de ejecución
+            actor_dict["energy"] -= costo_stamina                   #resta energia
+            tiempo_simulacion += tiempo_ejec                        #suma tiempo de ejecución
+            #asigna puntaje solo si matuvo la posición mas que el tiempo promedio definido
+            if random_posicion >= tiempo_posicion:
+                actor_dict["puntaje"] += puntaje
+            tiempo_simulacion += random_ajustado                    #suma tiempo que mantuvo la posicion
+            return "exito", nombre, tiempo_simulacion, random_ajustado
+
+        # FALLO
+        nombre_fallida = self.red.mov_fallido[movimiento]
+        if nombre_fallida is not None:
+            self._disparar(movimiento, False)
+
+            actor_dict["energy"] -= int(costo_stamina * 0.7)            #reduce la energia, pero solo un 70% del costo
+            tiempo_simulacion += tiempo_ejec                            #suma tiempo de ejecución
+            tiempo_simulacion += random_ajustado                        #suma tiempo que mantuvo la posición
+            return "fallo", nombre_fallida, tiempo_simulacion, random_ajustado
+
+        # Si no existe transición fallida, fallar sin mover posiciones
+        actor_dict["energy"] -= int(costo_stamina * 0.5)
+        tiempo_simulacion += 1
+        return "fallo", nombre, tiempo_simulacion, random_ajustado
+
+    #iniciativa de un actor para el movimiento elegido (ruido uniforme +-0.25 sobre la base del perfil)
+    def _iniciativa(self, actor, movimiento):
+        actor_dict = self.A if actor == "A" else self.O
+        ruido = self.rng.uniform(-0.25, 0.25)
+        return self.perfiles[actor].iniciativa(self._fila_mov[movimiento], actor_dict["energy"], ruido)
+
+    #SIMULACIÓN PRINCIPAL-------------------------------------------------------------------------------------------
+    #ejecuta un combate completo desde el marcado inicial y retorna un diccionario con el log y el resultado.
+    #con un sumidero (BJJ_Registro) cada evento se escribe en él en vez de acumularse en "registro", que queda vacío;
+    #id_combate se agrega a los eventos como columna "combate" cuando un mismo sumidero recibe varios combates
+    def combate(self, sumidero=None, id_combate=None):
+        self.reiniciar()
+        A = self.A
+        O = self.O
+        rng = self.rng
+
+        tiempo = 0 #tiempo de simulación
+        registro = [] #log
+        ganador = None
+        tecnica_sumision = None
+
+        while tiempo < self.max_tiempo: #mientras no se supere el máximo de pasos
+            #transiciones habilitadas con filtro de repertorio
+            habilitadas_A = self.transiciones_habilitadas("A")
+            habilitadas_O = self.transiciones_habilitadas("O")
+
+            #verificación si existen técnicas para disparar, si no existen se finaliza la simulación.
+            if not habilitadas_A and not habilitadas_O:
+                self._log("No quedan transiciones habilitadas. Fin de la simulación.")
+                break
+
+            # Ambos intentan actuar simultaneamente, se selecciona una técnica de las habilitadas, pero no se ejecuta aún
+            tecnica_A = rng.choice(habilitadas_A) if habilitadas_A else None
+            tecnica_O = rng.choice(habilitadas_O) if habilitadas_O else None
+
+            # Calcular iniciativa, para ver cual de los actores efectúa la técnica, si no hay tecnica iniciativa = -1
+            iniciativa_A = self._iniciativa("A", tecnica_A) if tecnica_A is not None else -1
+            iniciativa_O = self._iniciativa("O", tecnica_O) if tecnica_O is not None else -1
+            self._log(f"iniciativa A: {iniciativa_A}, Iniciativa O: {iniciativa_O}")
+            #decisión de quien actúa primero, el que lo haga será quien finalmente ejecute la técnica, el segundo no ejecutará su técnica
+            #esto debido a que si alguien ejecuta su técnica, fallida o exitosa, cambia la posición del oponente y la propia
+            if (iniciativa_A > iniciativa_O and tecnica_A is not None) or tecnica_O is None:
+                actor = "A"
+                tecnica = tecnica_A
+            else:
+                actor = "O"
+                tecnica = tecnica_O
+
+            # Ejecutar técnica del actor con mayor iniciativa
+            resultado, tecnica_final, tiempo, mantencion = self.ejecutar_tecnica(actor, tecnica, tiempo)
+
+            # Obtener posiciones actuales (estado incremental, sin recorrer la red)
+            posiciones = self.posiciones()
+            #debug para verificar tokens en consola
+            if None in posiciones.values():
+                self._log("Tokens no encontrados en todos los lugares. Posiciones actuales:", posiciones)
+
+            # Registrar evento
+            evento = {
+                "tiempo": tiempo,
+                "actor": actor,
+                "tecnica": tecnica_final,
+                "resultado": resultado,
+                "pos_A": posiciones["A"],
+                "pos_O": posiciones["O"],
+                "mantencion": mantencion,
+                "puntaje_A": A["puntaje"],
+                "puntaje_O": O["puntaje"]
+            }
+            if sumidero is None:
+                registro.append(evento)
+            else:
+                if id_combate is not None:
+                    evento["combate"] = id_combate
+                sumidero.escribir(evento)
+
+            #Detección de Sumisión---------------------------------
+            tipo = info_tecnica(tecnica_final, self.catalogo)["categoria"]
+            if tipo.lower() == "sumisión" and resultado == "exito":
+                self._log(f"Sumisión detectada: {tecnica_final}. Combate terminado.")
+                self._log(f"Ganador: {actor}")
+                self._log(f"Ténica de sumisión: {tecnica_final}")
+                ganador = actor
+                tecnica_sumision = tecnica_final
+                break
+
+        #victoria por puntos (o empate) si no hubo sumisión
+        if ganador is None:
+            if A["puntaje"] > O["puntaje"]:
+                ganador = "A"
+            elif O["puntaje"] > A["puntaje"]:
+                ganador = "O"
+
+        return {
+            "registro": registro,
+            "tiempo": tiempo,
+            "ganador": ganador,
+            "sumision": tecnica_sumision,
+            "puntaje_A": A["puntaje"],
+            "puntaje_O": O["puntaje"]
+        }
+
+    #ejecuta n combates seguidos reutilizando la red ya cargada (con sumidero, los eventos van numerados por combate)
+    def simular(self, n, sumidero=None):
+        if sumidero is None:
+            return [self.combate() for _ in range(n)]
+        return [self.combate(sumidero, id_combate=i) for i in range(n)]
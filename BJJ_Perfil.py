@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#BJJ_Perfil - Perfil compilado de un luchador: tablas de probabilidad, costo e iniciativa por técnica
+"""
+La iniciativa, el costo de stamina y la probabilidad de éxito dependen solo del luchador y de la clase de la técnica,
+salvo por la energía. PerfilLuchador precalcula para cada fila del catálogo:
+
+    iniciativa = (iniciativa_base[fila] + ruido) * factor_energia_iniciativa(energía) * factor_posicion
+    P(éxito)   = prob_base[fila] * factor_energia_exito(energía)
+    costo      = costo[fila]
+
+Los arreglos tienen una fila extra al final para técnicas que no están en el catálogo, así el índice -1 que entrega
+Catalogo.indice_tecnica cae en ella.
+"""
+import numpy as np
+
+from BJJ_Catalogo import DEFENSIVA, NEUTRAL, OFENSIVA
+
+
+#promedio de atributos según la clase de la técnica
+def atributo_clase(datos, clase):
+    if clase == OFENSIVA:
+        return (datos.get("velAt", 0) + datos.get("fueAt", 0)) / 2
+    elif clase == DEFENSIVA:
+        return (datos.get("velDef", 0) + datos.get("fueDef", 0)) / 2
+    return (
+        datos.get("velAt", 0) + datos.get("fueAt", 0) +
+        datos.get("velDef", 0) + datos.get("fueDef", 0)
+    ) / 4
+
+
+#parte de la iniciativa que no depende de energía ni ruido: base comprimida + ajuste por categoría
+def iniciativa_base(datos, clase):
+    X = atributo_clase(datos, clase)
+    U = 3
+    delta = X - U
+    k = 0.08  # más suave
+    ajuste_categoria = delta * k
+    return (X / 5) * 0.30 + ajuste_categoria
+
+
+#energía con impacto MUY bajo en la iniciativa, rango 0.95–1.05
+def factor_energia_iniciativa(energy):
+    energia = energy / 100
+    return 0.95 + energia * 0.10
+
+
+#posición suavizada
+def factor_posicion(datos):
+    pos = datos.get("posicion", "neutral")
+    if pos == "dominante":
+        return 1.03
+    elif pos == "inferior":
+        return 0.97
+    return 1.0
+
+
+#probabilidad de éxito con energía completa (T * 0.8)
+def probabilidad_base(datos, clase):
+    if clase == OFENSIVA:
+        T = (datos.get("velAt", 0) + datos.get("fueAt", 0)) / 10
+    elif clase == DEFENSIVA:
+        T = (datos.get("velDef", 0) + datos.get("fueDef", 0)) / 10
+    else:
+        T = (datos.get("velAt", 0) + datos.get("fueAt", 0) +
+             datos.get("velDef", 0) + datos.get("fueDef", 0)) / 20
+    return T * 0.8
+
+
+#factor de energía de la probabilidad de éxito
+def factor_energia_exito(energy):
+    E = energy / 100
+    #si por abc motivo la energia bajara extremadamente bajo cero, lo toma como 0.1
+    if E < 0:
+        E = 0.1
+    return E
+
+
+#costo de stamina ajustado por atributos, siempre al menos 1
+def costo_stamina(datos, clase, costo_base):
+    X = atributo_clase(datos, clase)
+    #umbral
+    U = 3
+    delta = X - U
+    #ajuste
+    k = 1.3
+    if delta > 0:
+        A = -int((delta*k).__ceil__())
+    elif delta < 0:
+        A = int((delta*k).__ceil__())
+    else:
+        A = 0
+    return max(1, costo_base + A)
+
+
+class PerfilLuchador:
+    """Tablas por técnica de un luchador, compiladas una vez por configuración de combate."""
+
+    def __init__(self, datos, catalogo):
+        self.datos = datos
+        self.energia_inicial = datos.get("energy", 100)
+        self.factor_posicion = factor_posicion(datos)
+
+        n = len(catalogo) if catalogo is not None else 0
+        clases = list(catalogo.clase) + [NEUTRAL] if catalogo is not None else [NEUTRAL]
+        costos_base = list(catalogo.costo_stamina) + [0] if catalogo is not None else [0]
+
+        self.iniciativa_base = np.array([iniciativa_base(datos, c) for c in clases], dtype=np.float64)
+        self.prob_base = np.array([probabilidad_base(datos, c) for c in clases], dtype=np.float64)
+        self.costo = np.array([costo_stamina(datos, c, int(b)) for c, b in zip(clases, costos_base)], dtype=np.int64)
+
+        #técnicas del repertorio (la fila extra de desconocidas nunca está en el repertorio)
+        repertorio = {r.strip() for r in datos.get("repertorio", [])}
+        self.en_repertorio = np.zeros(n + 1, dtype=bool)
+        for id_tecnica in repertorio:
+            if catalogo is not None and id_tecnica in catalogo.indice:
+                self.en_repertorio[catalogo.indice[id_tecnica]] = True
+
+        #copias en listas para el motor escalar (indexar listas es más rápido que indexar numpy elemento a elemento)
+        self._iniciativa_base = self.iniciativa_base.tolist()
+        self._prob_base = self.prob_base.tolist()
+        self._costo = self.costo.tolist()
+
+    def iniciativa(self, fila, energy, ruido):
+        return (self._iniciativa_base[fila] + ruido) * factor_energia_iniciativa(energy) * self.factor_posicion
+
+    def prob_exito(self, fila, energy):
+        return self._prob_base[fila] * factor_energia_exito(energy)
+
+    def costo_stamina(self, fila):
+        return self._costo[fila]
+
+
+#perfiles de ambos luchadores de un combate
+def compilar_perfiles(A, O, catalogo):
+    return {"A": PerfilLuchador(A, catalogo), "O": PerfilLuchador(O, catalogo)}
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+#BJJ_Presupuesto - Reparto óptimo de un presupuesto de entrenamiento entre los atributos de un luchador
+"""
+optimizar_presupuesto reparte un presupuesto fijo (por defecto la suma actual) entre fueAt, fueDef, velAt y velDef de
+un luchador, cada atributo entre minimo y maximo, para maximizar su probabilidad de victoria (o de sumisión) contra el
+oponente del caso. Es una optimización bayesiana:
+
+    1. diseño inicial de n_inicial repartos al azar (uniformes sobre los repartos factibles)
+    2. se ajusta un proceso gaussiano (kernel RBF con una escala por atributo, hiperparámetros por máxima verosimilitud
+       marginal) a las probabilidades simuladas, con el ruido binomial de cada punto en la diagonal
+    3. se proponen los siguientes repartos maximizando la mejora esperada sobre muestras de repartos factibles; con
+       varios workers se propone un lote por ronda ("kriging believer": cada propuesta se agrega con su media predicha
+       antes de elegir la siguiente) y el lote se simula en paralelo
+    4. se repite hasta max_evaluaciones o hasta que la mejor mejora esperada queda bajo tolerancia
+
+Todos los repartos se simulan con la misma semilla (números aleatorios comunes), así la superficie que ve el modelo es
+suave y el ruido entre puntos vecinos es mucho menor que el binomial. El mejor reparto es el de mayor media
+posterior entre los evaluados y se confirma al final con n_confirmacion combates de una semilla independiente, junto
+con el reparto original del caso como referencia.
+"""
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize
+from scipy.stats import norm
+
+from BJJ_Barrido import aplicar_punto
+from BJJ_Catalogo import cargar_catalogo
+from BJJ_Estadisticas import PROPORCIONES, MetricasCombates, valor_z
+from BJJ_Experimentos import bloques, cargar_caso, cargar_red
+from BJJ_Lote import MotorLote
+from BJJ_Motor import MAX_TIEMPO
+from BJJ_Repertorio import metrica_objetivo
+
+ATRIBUTOS_PRESUPUESTO = ["fueAt", "fueDef", "velAt", "velDef"]
+ATRIBUTO_MIN = 1.0
+ATRIBUTO_MAX = 5.0
+TAMANO_BLOQUE_PRESUPUESTO = 2_000
+N_CONFIRMACION = 20_000
+#repartos factibles al azar sobre los que se maximiza la mejora esperada en cada propuesta
+N_MUESTRAS_ADQUISICION = 4_000
+#rondas de Dirichlet con rechazo antes de abandonar el muestreo de repartos
+MAX_INTENTOS_MUESTREO = 100
+
+#red, catálogo, luchadores y horizonte del proceso actual (se cargan una vez por worker)
+_CONTEXTO = None
+
+
+class ProcesoGaussiano:
+    """
+    Regresión con proceso gaussiano de media constante y kernel RBF con una escala por dimensión. Las entradas se
+    esperan en [0, 1]; ruido es la varianza de cada observación (en las unidades de y).
+    """
+
+    def __init__(self, escalas=None, varianza=1.0):
+        self.escalas = escalas
+        self.varianza = varianza
+
+    def _kernel(self, X1, X2):
+        d = (X1[:, None, :] - X2[None, :, :]) / self.escalas
+        return self.varianza * np.exp(-0.5 * np.sum(d * d, axis=2))
+
+    #menos log-verosimilitud marginal de (log escalas, log varianza) con los datos normalizados
+    def _nll(self, theta, X, y, ruido):
+        self.escalas, self.varianza = np.exp(theta[:-1]), float(np.exp(theta[-1]))
+        K = self._kernel(X, X) + np.diag(ruido + 1e-8)
+        try:
+            factor = cho_factor(K, lower=True)
+        except np.linalg.LinAlgError:
+            return 1e10
+        alfa = cho_solve(factor, y)
+        return 0.5 * y @ alfa + np.sum(np.log(np.diag(factor[0])))
+
+    def ajustar(self, X, y, ruido, optimizar=True, reinicios=3, semilla=0):
+        """Ajusta el modelo a (X, y); con optimizar=True elige escalas y varianza por máxima verosimilitud."""
+        self.X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.media = float(y.mean())
+        self.escala_y = float(y.std()) or 1.0
+        yn = (y - self.media) / self.escala_y
+        ruido_n = np.asarray(ruido, dtype=np.float64) / self.escala_y ** 2
+
+        if optimizar or self.escalas is None:
+            d = self.X.shape[1]
+            limites = [(np.log(0.05), np.log(10.0))] * d + [(np.log(0.01), np.log(100.0))]
+            rng = np.random.default_rng(semilla)
+            iniciales = [np.zeros(d + 1)] + [
+                np.concatenate([rng.uniform(np.log(0.1), np.log(2.0), d), [rng.uniform(-1, 1)]])
+                for _ in range(reinicios - 1)
+            ]
+            mejor = min((minimize(self._nll, x0, args=(self.X, yn, ruido_n), method="L-BFGS-B", bounds=limites)
+                         for x0 in iniciales), key=lambda r: r.fun)
+            self.escalas, self.varianza = np.exp(mejor.x[:-1]), float(np.exp(mejor.x[-1]))
+
+        K = self._kernel(self.X, self.X) + np.diag(ruido_n + 1e-8)
+        self._factor = cho_factor(K, lower=True)
+        self._alfa = cho_solve(self._factor, yn)
+        return self
+
+    def predecir(self, X):
+        """(media, desviación) posterior de f en los puntos X, en las unidades de y."""
+        X = np.asarray(X, dtype=np.float64)
+        k = self._kernel(X, self.X)
+        media = k @ self._alfa
+        v = cho_solve(self._factor, k.T)
+        varianza = np.maximum(self.varianza - np.sum(k * v.T, axis=1), 1e-12)
+        return self.media + self.escala_y * media, self.escala_y * np.sqrt(varianza)
+
+
+#mejora esperada (maximización) sobre el mejor valor actual, con un margen xi de exploración
+def mejora_esperada(media, desviacion, mejor, xi=0.0):
+    mejora = media - mejor - xi
+    z = mejora / desviacion
+    return mejora * norm.cdf(z) + desviacion * norm.pdf(z)
+
+
+#n repartos al azar de presupuesto entre los atributos, cada uno en [minimo, maximo], uniformes sobre los factibles.
+#Con el presupuesto sobre la mitad del rango se muestrea el complemento maximo - x (suma k * maximo - presupuesto),
+#así el reparto libre nunca supera la mitad de la capacidad y la tasa de aceptación de Dirichlet con rechazo queda
+#acotada (al menos 1/2 con cuatro atributos) aunque el presupuesto esté pegado al máximo
+def repartos_factibles(n, presupuesto, minimo, maximo, rng, max_intentos=MAX_INTENTOS_MUESTREO):
+    k = len(ATRIBUTOS_PRESUPUESTO)
+    libre = presupuesto - k * minimo
+    if libre < 0 or presupuesto > k * maximo:
+        raise ValueError(f"Presupuesto {presupuesto} fuera de [{k * minimo}, {k * maximo}] para {k} atributos")
+    capacidad = maximo - minimo
+    complemento = presupuesto > k * (minimo + maximo) / 2
+    if complemento:
+        libre = k * maximo - presupuesto
+    #un único reparto factible (todos en el mínimo o todos en el máximo)
+    if libre <= 0 or capacidad <= 0:
+        return np.full((n, k), presupuesto / k)
+
+    puntos = []
+    aceptados = 0
+    for _ in range(max_intentos):
+        Y = libre * rng.dirichlet(np.ones(k), size=2 * n)
+        Y = Y[np.all(Y <= capacidad + 1e-12, axis=1)]
+        puntos.append(Y)
+        aceptados += len(Y)
+        if aceptados >= n:
+            Y = np.concatenate(puntos)[:n]
+            return maximo - Y if complemento else minimo + Y
+    raise RuntimeError(f"No se obtuvieron {n} repartos factibles de presupuesto {presupuesto} en {max_intentos} "
+                       f"intentos de muestreo")
+
+
+def _iniciar_worker(red, catalogo, A, O, max_tiempo):
+    global _CONTEXTO
+    _CONTEXTO = (red, catalogo, A, O, max_tiempo)
+
+
+#simula un reparto (mismos bloques y semillas para todos) y retorna sus probabilidades con su semiancho al 95%
+def _evaluar_reparto(args):
+    punto, n, semilla, tamano_bloque = args
+    red, catalogo, A, O, max_tiempo = _CONTEXTO
+    A, O = aplicar_punto(A, O, punto)
+    motor = MotorLote(red, catalogo, A, O, max_tiempo=max_tiempo)
+    agregado = MetricasCombates(semilla=semilla)
+    for semilla_bloque, n_bloque in bloques(n, semilla, tamano_bloque):
+        agregado.agregar_lote(motor.simular(n_bloque, np.random.default_rng(semilla_bloque)))
+    valores = {}
+    for metrica in PROPORCIONES:
+        estimacion, inferior, superior = agregado.intervalo(metrica)
+        valores[metrica] = (estimacion, (superior - inferior) / 2)
+    return valores
+
+
+#pool de evaluación (o evaluación en el proceso actual con workers <= 1): entrega una función map
+@contextmanager
+def _evaluador(red, catalogo, A, O, workers, max_tiempo):
+    if workers <= 1:
+        _iniciar_worker(red, catalogo, A, O, max_tiempo)
+        yield lambda tareas: list(map(_evaluar_reparto, tareas))
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                             initargs=(red, catalogo, A, O, max_tiempo)) as pool:
+        yield lambda tareas: list(pool.map(_evaluar_reparto, tareas))
+
+
+def optimizar_presupuesto(case_json, luchador="A", objetivo="victoria", presupuesto=None, minimo=ATRIBUTO_MIN,
+                          maximo=ATRIBUTO_MAX, n_matches=2_000, workers=1, semilla=0, n_inicial=10,
+                          max_evaluaciones=40, tamano_lote=None, tolerancia=1e-4, n_confirmacion=N_CONFIRMACION,
+                          red=None, catalogo=None, tamano_bloque=TAMANO_BLOQUE_PRESUPUESTO, max_tiempo=MAX_TIEMPO,
+                          verbose=False):
+    """
+    Busca el reparto de presupuesto (por defecto la suma actual de los cuatro atributos del luchador) entre
+    ATRIBUTOS_PRESUPUESTO que maximiza metrica_objetivo(luchador, objetivo), con n_matches combates por reparto
+    evaluado. tamano_lote es la cantidad de repartos propuestos por ronda (por defecto workers).
+
+    Retorna un diccionario con el mejor reparto, su valor simulado y predicho, la confirmación con n_confirmacion
+    combates de otra semilla (y la del reparto original), si convergió y la tabla de evaluaciones.
+    """
+    metrica = metrica_objetivo(luchador, objetivo)
+    A, O = cargar_caso(case_json)
+    red = red if red is not None else cargar_red()
+    catalogo = catalogo if catalogo is not None else cargar_catalogo("Input/Grafo_Explicito.csv")
+    datos = A if luchador == "A" else O
+    original = np.array([float(datos[a]) for a in ATRIBUTOS_PRESUPUESTO])
+    presupuesto = float(original.sum()) if presupuesto is None else float(presupuesto)
+    tamano_lote = tamano_lote or max(1, workers)
+    rng = np.random.default_rng(semilla)
+    z = valor_z(0.95)
+
+    def punto(x):
+        return {f"{luchador}.{a}": float(v) for a, v in zip(ATRIBUTOS_PRESUPUESTO, x)}
+
+    def normalizar(X):
+        return (np.asarray(X) - minimo) / (maximo - minimo)
+
+    X, y, ruido, evaluaciones = [], [], [], []
+    modelo = ProcesoGaussiano()
+    convergido = False
+
+    with _evaluador(red, catalogo, A, O, workers, max_tiempo) as mapear:
+
+        def evaluar(repartos, ronda):
+            resultados = mapear([(punto(x), n_matches, semilla, tamano_bloque) for x in repartos])
+            for x, valores in zip(repartos, resultados):
+                estimacion, semiancho = valores[metrica]
+                X.append(np.asarray(x))
+                y.append(estimacion)
+                #varianza binomial de la estimación (acotada para no anular la diagonal cuando p es 0 o 1)
+                ruido.append(max((semiancho / z) ** 2, 0.25 / n_matches ** 2))
+                evaluaciones.append({"ronda": ronda, **dict(zip(ATRIBUTOS_PRESUPUESTO, map(float, x))),
+                                     metrica: estimacion, "semiancho": semiancho})
+
+        evaluar(repartos_factibles(min(n_inicial, max_evaluaciones), presupuesto, minimo, maximo, rng), 0)
+        ronda = 0
+        while len(X) < max_evaluaciones:
+            ronda += 1
+            modelo.ajustar(normalizar(X), y, ruido, semilla=semilla + ronda)
+            muestras = repartos_factibles(N_MUESTRAS_ADQUISICION, presupuesto, minimo, maximo, rng)
+            mejor_actual = float(np.max(modelo.predecir(normalizar(X))[0]))
+
+            #lote por kriging believer: cada propuesta entra al modelo con su media predicha
+            propuestos = []
+            X_lote, y_lote, ruido_lote = list(X), list(y), list(ruido)
+            creyente = modelo
+            for _ in range(min(tamano_lote, max_evaluaciones - len(X))):
+                media, desviacion = creyente.predecir(normalizar(muestras))
+                ei = mejora_esperada(media, desviacion, mejor_actual)
+                i = int(np.argmax(ei))
+                if not propuestos and ei[i] < tolerancia:
+                    convergido = True
+                    break
+                propuestos.append(muestras[i])
+                X_lote.append(muestras[i])
+                y_lote.append(float(media[i]))
+                ruido_lote.append(ruido[-1])
+                muestras = np.delete(muestras, i, axis=0)
+                creyente = ProcesoGaussiano(modelo.escalas, modelo.varianza).ajustar(
+                    normalizar(X_lote), y_lote, ruido_lote, optimizar=False)
+            if convergido:
+                break
+            evaluar(propuestos, ronda)
+            if verbose:
+                print(f"Ronda {ronda}: {len(X)} repartos evaluados, mejor {metrica} simulado = {max(y):.4f}")
+
+        #mejor reparto: mayor media posterior entre los evaluados
+        modelo.ajustar(normalizar(X), y, ruido, semilla=semilla)
+        media, desviacion = modelo.predecir(normalizar(X))
+        i = int(np.argmax(media))
+        mejor = X[i]
+
+        confirmacion = {}
+        if n_confirmacion:
+            encontrado, referencia = mapear([(punto(x), n_confirmacion, semilla + 1, tamano_bloque)
+                                             for x in (mejor, original)])
+            confirmacion = {"encontrado": encontrado[metrica], "original": referencia[metrica]}
+
+    if verbose:
+        print(f"{len(X)} repartos evaluados ({len(X) * n_matches} combates), "
+              f"{'convergió' if convergido else 'sin converger'}")
+    return {
+        "metrica": metrica,
+        "presupuesto": presupuesto,
+        "reparto": dict(zip(ATRIBUTOS_PRESUPUESTO, map(float, mejor))),
+        "valor": y[i],
+        "prediccion": (float(media[i]), float(desviacion[i])),
+        "confirmacion": confirmacion,
+        "convergido": convergido,
+        "evaluaciones": evaluaciones
+    }
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Presupuesto.py Experimentos/Inputs/Caso1.json A victoria 2000 4 [semilla] [presupuesto] [max_evaluaciones]
+if __name__ == "__main__":
+    caso = sys.argv[1] if len(sys.argv) > 1 else "Experimentos/Inputs/Caso1.json"
+    luchador = sys.argv[2] if len(sys.argv) > 2 else "A"
+    objetivo = sys.argv[3] if len(sys.argv) > 3 else "victoria"
+    n = int(sys.argv[4]) if len(sys.argv) > 4 else 2_000
+    workers = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+    semilla = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+    presupuesto = float(sys.argv[7]) if len(sys.argv) > 7 else None
+    max_evaluaciones = int(sys.argv[8]) if len(sys.argv) > 8 else 40
+
+    resultado = optimizar_presupuesto(caso, luchador, objetivo, presupuesto, n_matches=n, workers=workers,
+                                      semilla=semilla, max_evaluaciones=max_evaluaciones, verbose=True)
+    reparto = ", ".join(f"{a}={v:.2f}" for a, v in resultado["reparto"].items())
+    print(f"Reparto de {luchador} (presupuesto {resultado['presupuesto']:g}): {reparto}")
+    for nombre, (estimacion, semiancho) in resultado["confirmacion"].items():
+        print(f"  {nombre}: {resultado['metrica']} = {estimacion:.4f} ± {semiancho:.4f}")
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#BJJ_Registro - Sumideros de eventos con buffer acotado (CSV, CSV comprimido y binario columnar)
+"""
+El motor entrega cada evento del combate a un sumidero en vez de acumular el registro completo en memoria. Todos los
+sumideros guardan los eventos en un buffer de a lo más tamano_buffer filas y lo vacían al archivo cuando se llena o
+cuando pasan intervalo_s segundos desde el último vaciado, así la memoria queda acotada sin importar cuántos combates
+se escriban y un corte a mitad de la ejecución solo pierde el último buffer.
+
+    SumideroCSV        mismo formato que los registro_bjj_*.csv (gzip si la ruta termina en .gz)
+    SumideroColumnar   bloques de columnas numpy (np.save seguidos en un mismo archivo), se lee con leer_columnar
+
+Si no se entregan las columnas (campos=None) se eligen con el primer evento: CAMPOS_LOTE si trae "combate" (varios
+combates en un archivo, como los de MotorLote.escribir_eventos) y CAMPOS_EVENTO si no, así la columna combate no se
+pierde. abrir_sumidero elige el sumidero según la extensión de la ruta (incluido el binario de BJJ_LogBinario).
+"""
+import csv
+import gzip
+import time
+
+import numpy as np
+
+#columnas del registro de un combate (las de los registro_bjj_*.csv)
+CAMPOS_EVENTO = ["tiempo", "actor", "tecnica", "resultado", "mantencion", "pos_A", "pos_O", "puntaje_A", "puntaje_O"]
+#columnas cuando un mismo archivo recibe varios combates
+CAMPOS_LOTE = ["combate"] + CAMPOS_EVENTO
+
+TAMANO_BUFFER = 4096
+INTERVALO_S = 5.0
+
+
+class Sumidero:
+    """Base de los sumideros: buffer acotado, vaciado periódico y uso como context manager."""
+
+    def __init__(self, ruta, campos=None, tamano_buffer=TAMANO_BUFFER, intervalo_s=INTERVALO_S):
+        self.ruta = ruta
+        self.campos = list(campos) if campos is not None else None
+        self.tamano_buffer = tamano_buffer
+        self.intervalo_s = intervalo_s
+        self.eventos_escritos = 0
+        self._buffer = []
+        self._ultimo_vaciado = time.monotonic()
+        self._cerrado = False
+
+    def escribir(self, evento):
+        if self.campos is None:
+            self.campos = CAMPOS_LOTE if "combate" in evento else CAMPOS_EVENTO
+        self._buffer.append(evento)
+        if len(self._buffer) >= self.tamano_buffer or time.monotonic() - self._ultimo_vaciado >= self.intervalo_s:
+            self.vaciar()
+
+    def escribir_muchos(self, eventos):
+        for evento in eventos:
+            self.escribir(evento)
+
+    #escribe el buffer al archivo y lo deja vacío
+    def vaciar(self):
+        if self._buffer:
+            self._escribir_buffer(self._buffer)
+            self.eventos_escritos += len(self._buffer)
+            self._buffer = []
+        self._ultimo_vaciado = time.monotonic()
+
+    def cerrar(self):
+        if self._cerrado:
+            return
+        if self.campos is None:
+            self.campos = CAMPOS_EVENTO
+        self.vaciar()
+        self._cerrar_archivo()
+        self._cerrado = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _escribir_buffer(self, eventos):
+        raise NotImplementedError
+
+    def _cerrar_archivo(self):
+        pass
+
+
+class SumideroCSV(Sumidero):
+    """
+    CSV con encabezado; comprimido con gzip si comprimir=True o si la ruta termina en .gz. El encabezado se escribe
+    en el primer vaciado, cuando ya se conocen las columnas.
+    """
+
+    def __init__(self, ruta, campos=None, comprimir=None, **kwargs):
+        super().__init__(ruta, campos, **kwargs)
+        comprimir = ruta.endswith(".gz") if comprimir is None else comprimir
+        if comprimir:
+            self._archivo = gzip.open(ruta, "wt", newline="", encoding="utf-8")
+        else:
+            self._archivo = open(ruta, "w", newline="", encoding="utf-8")
+        self._writer = None
+
+    def _escribir_buffer(self, eventos):
+        self._encabezado()
+        self._writer.writerows(eventos)
+        self._archivo.flush()
+
+    def _cerrar_archivo(self):
+        self._encabezado()
+        self._archivo.close()
+
+    def _encabezado(self):
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._archivo, fieldnames=self.campos, extrasaction="ignore")
+            self._writer.writeheader()
+
+
+class SumideroColumnar(Sumidero):
+    """
+    El archivo parte con los nombres de las columnas y cada vaciado agrega un bloque: la cantidad de filas y luego
+    una columna numpy por campo, con np.save.
+    """
+
+    def __init__(self, ruta, campos=None, **kwargs):
+        super().__init__(ruta, campos, **kwargs)
+        self._archivo = open(ruta, "wb")
+        self._con_encabezado = False
+
+    def _escribir_buffer(self, eventos):
+        self._encabezado()
+        np.save(self._archivo, np.array([len(eventos)], dtype=np.int64))
+        for campo in self.campos:
+            #numéricos como int64, textos como unicode de ancho fijo del bloque (None queda vacío, como en el CSV)
+            columna = np.array([e.get(campo) for e in eventos])
+            if columna.dtype == object:
+                columna = np.array(["" if v is None else str(v) for v in columna])
+            np.save(self._archivo, columna, allow_pickle=False)
+        self._archivo.flush()
+
+    def _cerrar_archivo(self):
+        self._encabezado()
+        self._archivo.close()
+
+    def _encabezado(self):
+        if not self._con_encabezado:
+            np.save(self._archivo, np.array(self.campos), allow_pickle=False)
+            self._con_encabezado = True
+
+
+#lee un archivo de SumideroColumnar como diccionario de columnas concatenadas (las columnas salen del encabezado)
+def leer_columnar(ruta):
+    with open(ruta, "rb") as f:
+        try:
+            campos = np.load(f, allow_pickle=False).tolist()
+        except (EOFError, ValueError):
+            #archivo vacío o cortado antes del encabezado
+            return {}
+        bloques = {campo: [] for campo in campos}
+        while True:
+            try:
+                np.load(f)
+                bloque = [np.load(f, allow_pickle=False) for _ in campos]
+            except (EOFError, ValueError):
+                #fin del archivo (o último bloque cortado a medio escribir, que se descarta)
+                break
+            for campo, columna in zip(campos, bloque):
+                bloques[campo].append(columna)
+    return {campo: np.concatenate(columnas) if columnas else np.array([]) for campo, columnas in bloques.items()}
+
+
+#sumidero según la extensión: .csv / .csv.gz -> SumideroCSV, .col -> SumideroColumnar,
+#.bjjlog -> BJJ_LogBinario.SumideroBinario (necesita la red compilada, siempre con columna combate)
+def abrir_sumidero(ruta, campos=None, red=None, **kwargs):
+    if ruta.endswith(".bjjlog"):
+        from BJJ_LogBinario import SumideroBinario
+        if red is None:
+            raise ValueError("El registro binario necesita la red compilada (red=...)")
+        return SumideroBinario(ruta, red, **kwargs)
+    if ruta.endswith(".col"):
+        return SumideroColumnar(ruta, campos, **kwargs)
+    if ruta.endswith(".csv") or ruta.endswith(".csv.gz"):
+        return SumideroCSV(ruta, campos, **kwargs)
+    raise ValueError(f"Extensión de registro no soportada: {ruta}")
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+#BJJ_Repertorio - Optimización del repertorio de un luchador contra un oponente fijo
+"""
+optimizar_repertorio busca, entre las técnicas de Input/Grafo_Explicito.csv que el luchador puede ejecutar en la red,
+el subconjunto de a lo más max_tamano técnicas que maximiza su probabilidad de victoria (o de sumisión) contra el
+oponente del caso, que no cambia. La búsqueda tiene dos fases:
+
+    voraz      desde el repertorio inicial (vacío por defecto) agrega en cada ronda la técnica que más mejora el
+               objetivo, hasta llegar a max_tamano o hasta que ninguna agregada mejore
+    local      vecindario de intercambios (saca una técnica y pone otra), eliminaciones y, si hay cupo, agregados;
+               se mueve al mejor vecino mientras mejore el objetivo (ascenso por la máxima pendiente)
+
+Cada ronda evalúa su vecindario completo en un pool de procesos; un candidato se evalúa con n_matches combates de
+MotorLote y todos usan la misma semilla (números aleatorios comunes), así la comparación entre subconjuntos vecinos no
+depende del ruido de muestreo de cada uno. Las evaluaciones se guardan por subconjunto en un cache JSON (opcional en
+disco) y un subconjunto ya evaluado no se vuelve a simular, ni en esta búsqueda ni en la siguiente con el mismo caso.
+
+El valor del mejor subconjunto durante la búsqueda está sesgado hacia arriba (es el máximo de muchas estimaciones con
+los mismos sorteos), por eso al final se confirma con n_confirmacion combates de una semilla independiente, junto con
+el repertorio original del caso como referencia.
+"""
+import copy
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from BJJ_Catalogo import cargar_catalogo
+from BJJ_Estadisticas import PROPORCIONES, MetricasCombates
+from BJJ_Experimentos import bloques, cargar_caso, cargar_red
+from BJJ_Lote import MotorLote
+from BJJ_Motor import MAX_TIEMPO
+
+OBJETIVOS_REPERTORIO = ["victoria", "sumision"]
+TAMANO_BLOQUE_REPERTORIO = 2_000
+N_CONFIRMACION = 20_000
+
+#red, catálogo, luchadores y horizonte del proceso actual (se cargan una vez por worker)
+_CONTEXTO = None
+
+
+#métrica de BJJ_Estadisticas.PROPORCIONES que maximiza la búsqueda (prob_victoria_A, frac_sumision_A, ...)
+def metrica_objetivo(luchador, objetivo):
+    if luchador not in ("A", "O"):
+        raise ValueError(f"Luchador inválido: {luchador} (se espera A u O)")
+    if objetivo not in OBJETIVOS_REPERTORIO:
+        raise ValueError(f"Objetivo inválido: {objetivo} (se espera {' o '.join(OBJETIVOS_REPERTORIO)})")
+    return f"prob_victoria_{luchador}" if objetivo == "victoria" else f"frac_sumision_{luchador}"
+
+
+#técnicas del catálogo que el luchador puede ejecutar en algún estado de la red, ordenadas por ID
+def tecnicas_candidatas(red, catalogo, luchador):
+    en_red = {red.mov_id_tecnica[m] for movs in red.tabla[luchador] for m in movs}
+    return sorted(en_red & set(catalogo.indice))
+
+
+#clave de un subconjunto en el cache: combates, semilla e IDs ordenados
+def _clave(repertorio, n, semilla):
+    return f"{n}:{semilla}:{','.join(sorted(repertorio))}"
+
+
+class CacheRepertorios:
+    """
+    Evaluaciones por subconjunto ({métrica: [estimación, semiancho]} de PROPORCIONES). Con ruta se lee y se guarda en
+    un JSON; un cache escrito para otro caso, luchador u horizonte se descarta.
+    """
+
+    def __init__(self, meta, ruta=None):
+        self.meta = meta
+        self.ruta = ruta
+        self.evaluaciones = {}
+        if ruta is not None and os.path.exists(ruta):
+            with open(ruta, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            if datos.get("meta") == meta:
+                self.evaluaciones = datos["evaluaciones"]
+            else:
+                print(f"⚠️ {ruta} es de otro caso o luchador, se reemplaza")
+
+    def __contains__(self, clave):
+        return clave in self.evaluaciones
+
+    def __getitem__(self, clave):
+        return self.evaluaciones[clave]
+
+    def __setitem__(self, clave, valores):
+        self.evaluaciones[clave] = valores
+
+    def __len__(self):
+        return len(self.evaluaciones)
+
+    #escritura atómica (temporal + os.replace) para no dejar un cache a medias si se interrumpe la búsqueda
+    def guardar(self):
+        if self.ruta is None:
+            return
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"meta": self.meta, "evaluaciones": self.evaluaciones}, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+
+
+def _iniciar_worker(red, catalogo, A, O, luchador, max_tiempo):
+    global _CONTEXTO
+    _CONTEXTO = (red, catalogo, A, O, luchador, max_tiempo)
+
+
+#simula un subconjunto (mismos bloques y semillas para todos) y retorna sus probabilidades con su semiancho al 95%
+def _evaluar_repertorio(args):
+    repertorio, n, semilla, tamano_bloque = args
+    red, catalogo, A, O, luchador, max_tiempo = _CONTEXTO
+    luchadores = {"A": A, "O": O}
+    luchadores[luchador] = dict(luchadores[luchador], repertorio=list(repertorio))
+    motor = MotorLote(red, catalogo, luchadores["A"], luchadores["O"], max_tiempo=max_tiempo)
+    agregado = MetricasCombates(semilla=semilla)
+    for semilla_bloque, n_bloque in bloques(n, semilla, tamano_bloque):
+        agregado.agregar_lote(motor.simular(n_bloque, np.random.default_rng(semilla_bloque)))
+    valores = {}
+    for metrica in PROPORCIONES:
+        estimacion, inferior, superior = agregado.intervalo(metrica)
+        valores[metrica] = [estimacion, (superior - inferior) / 2]
+    return repertorio, valores
+
+
+#pool de evaluación (o evaluación en el proceso actual con workers <= 1): entrega una función map
+@contextmanager
+def _evaluador(red, catalogo, A, O, luchador, workers, max_tiempo):
+    if workers <= 1:
+        _iniciar_worker(red, catalogo, A, O, luchador, max_tiempo)
+        yield lambda tareas: map(_evaluar_repertorio, tareas)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                             initargs=(red, catalogo, A, O, luchador, max_tiempo)) as pool:
+        yield lambda tareas: pool.map(_evaluar_repertorio, tareas,
+                                      chunksize=max(1, len(tareas) // (4 * workers)))
+
+
+#vecindario de la búsqueda local: intercambios, eliminaciones y (con cupo) agregados
+def vecindario(repertorio, candidatas, max_tamano):
+    actual = set(repertorio)
+    fuera = [t for t in candidatas if t not in actual]
+    vecinos = [tuple(sorted(actual - {t} | {u})) for t in sorted(actual) for u in fuera]
+    vecinos += [tuple(sorted(actual - {t})) for t in sorted(actual)]
+    if len(actual) < max_tamano:
+        vecinos += [tuple(sorted(actual | {u})) for u in fuera]
+    return vecinos
+
+
+def optimizar_repertorio(case_json, luchador="A", objetivo="victoria", max_tamano=10, n_matches=2_000, workers=1,
+                         semilla=0, candidatas=None, inicial=None, max_rondas=50, ruta_cache=None,
+                         n_confirmacion=N_CONFIRMACION, red=None, catalogo=None,
+                         tamano_bloque=TAMANO_BLOQUE_REPERTORIO, max_tiempo=MAX_TIEMPO, verbose=False):
+    """
+    Busca el repertorio de a lo más max_tamano técnicas (entre candidatas, por defecto todas las del catálogo que el
+    luchador puede ejecutar) que maximiza metrica_objetivo(luchador, objetivo) contra el oponente del caso. Cada
+    candidato se evalúa con n_matches combates y la misma semilla; ruta_cache guarda las evaluaciones entre
+    ejecuciones.
+
+    Retorna un diccionario con el repertorio encontrado, su valor en la búsqueda, la confirmación con n_confirmacion
+    combates de otra semilla (y la del repertorio original del caso), las evaluaciones simuladas y el historial.
+    """
+    metrica = metrica_objetivo(luchador, objetivo)
+    A, O = cargar_caso(case_json)
+    red = red if red is not None else cargar_red()
+    catalogo = catalogo if catalogo is not None else cargar_catalogo("Input/Grafo_Explicito.csv")
+    original = tuple(sorted({t.strip() for t in (A if luchador == "A" else O)["repertorio"]}))
+
+    candidatas = sorted(candidatas) if candidatas is not None else tecnicas_candidatas(red, catalogo, luchador)
+    actual = tuple(sorted(inicial or ()))
+    if len(actual) > max_tamano:
+        raise ValueError(f"El repertorio inicial tiene {len(actual)} técnicas (máximo {max_tamano})")
+
+    #el cache no depende del repertorio que se optimiza ni del objetivo (guarda todas las probabilidades)
+    luchadores = {"A": copy.deepcopy(A), "O": copy.deepcopy(O)}
+    luchadores[luchador].pop("repertorio", None)
+    meta = {"luchadores": luchadores, "luchador": luchador, "tamano_bloque": tamano_bloque, "max_tiempo": max_tiempo}
+    cache = CacheRepertorios(meta, ruta_cache)
+    simuladas = 0
+    historial = []
+
+    with _evaluador(red, catalogo, A, O, luchador, workers, max_tiempo) as mapear:
+
+        #valor de cada subconjunto con n combates y la semilla dada; solo se simulan los que no están en el cache
+        def evaluar(repertorios, n=n_matches, semilla_eval=semilla):
+            nonlocal simuladas
+            faltantes = list(dict.fromkeys(r for r in repertorios if _clave(r, n, semilla_eval) not in cache))
+            if faltantes:
+                for repertorio, valores in mapear([(r, n, semilla_eval, tamano_bloque) for r in faltantes]):
+                    cache[_clave(repertorio, n, semilla_eval)] = valores
+                simuladas += len(faltantes)
+                cache.guardar()
+            return [cache[_clave(r, n, semilla_eval)][metrica][0] for r in repertorios]
+
+        #mejor vecino (el primero en caso de empate, para que la búsqueda sea determinista)
+        def mejor(vecinos):
+            valores = evaluar(vecinos)
+            i = int(np.argmax(valores))
+            return vecinos[i], valores[i]
+
+        valor = evaluar([actual])[0]
+        historial.append({"fase": "inicial", "repertorio": list(actual), "valor": valor})
+
+        #fase voraz: agrega la mejor técnica mientras haya cupo y mejore
+        while len(actual) < max_tamano:
+            vecinos = [tuple(sorted(actual + (t,))) for t in candidatas if t not in actual]
+            if not vecinos:
+                break
+            vecino, valor_vecino = mejor(vecinos)
+            if valor_vecino <= valor:
+                break
+            actual, valor = vecino, valor_vecino
+            historial.append({"fase": "voraz", "repertorio": list(actual), "valor": valor})
+            if verbose:
+                print(f"Voraz ({len(actual)} técnicas): {metrica} = {valor:.4f}")
+
+        #fase local: mejor intercambio, eliminación o agregado mientras mejore
+        for _ in range(max_rondas):
+            vecinos = vecindario(actual, candidatas, max_tamano)
+            if not vecinos:
+                break
+            vecino, valor_vecino = mejor(vecinos)
+            if valor_vecino <= valor:
+                break
+            actual, valor = vecino, valor_vecino
+            historial.append({"fase": "local", "repertorio": list(actual), "valor": valor})
+            if verbose:
+                print(f"Local ({len(vecinos)} vecinos): {metrica} = {valor:.4f}")
+
+        #confirmación con una semilla independiente de la usada en la búsqueda
+        confirmacion = {}
+        if n_confirmacion:
+            semilla_confirmacion = semilla + 1
+            evaluar([actual, original], n_confirmacion, semilla_confirmacion)
+            confirmacion = {
+                "encontrado": cache[_clave(actual, n_confirmacion, semilla_confirmacion)],
+                "original": cache[_clave(original, n_confirmacion, semilla_confirmacion)]
+            }
+
+    if verbose:
+        print(f"Evaluaciones: {simuladas} simuladas, {len(cache)} en el cache")
+    return {
+        "metrica": metrica,
+        "repertorio": list(actual),
+        "valor": valor,
+        "confirmacion": confirmacion,
+        "simuladas": simuladas,
+        "historial": historial
+    }
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Repertorio.py Experimentos/Inputs/Caso1.json A victoria 10 2000 4 [semilla] [cache.json]
+if __name__ == "__main__":
+    caso = sys.argv[1] if len(sys.argv) > 1 else "Experimentos/Inputs/Caso1.json"
+    luchador = sys.argv[2] if len(sys.argv) > 2 else "A"
+    objetivo = sys.argv[3] if len(sys.argv) > 3 else "victoria"
+    max_tamano = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+    n = int(sys.argv[5]) if len(sys.argv) > 5 else 2_000
+    workers = int(sys.argv[6]) if len(sys.argv) > 6 else 1
+    semilla = int(sys.argv[7]) if len(sys.argv) > 7 else 0
+    ruta_cache = sys.argv[8] if len(sys.argv) > 8 else None
+
+    resultado = optimizar_repertorio(caso, luchador, objetivo, max_tamano, n, workers, semilla,
+                                     ruta_cache=ruta_cache, verbose=True)
+    print(f"Repertorio de {luchador} ({len(resultado['repertorio'])} técnicas): {', '.join(resultado['repertorio'])}")
+    for nombre, valores in resultado["confirmacion"].items():
+        estimacion, semiancho = valores[resultado["metrica"]]
+        print(f"  {nombre}: {resultado['metrica']} = {estimacion:.4f} ± {semiancho:.4f}")
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#BJJ_Shapley - Aporte de cada técnica del repertorio a la probabilidad de victoria (valores de Shapley)
+"""
+El juego es v(S) = probabilidad de victoria (o de sumisión) del luchador con repertorio S contra el oponente fijo del
+caso, y el valor de Shapley de una técnica es su aporte marginal v(S + t) - v(S) promediado sobre todos los órdenes
+en que se puede armar el repertorio. Los valores suman v(repertorio completo) - v(vacío).
+
+shapley_repertorio lo estima por muestreo de permutaciones: cada permutación recorre sus prefijos (de vacío al
+repertorio completo) y anota el aporte marginal de cada técnica al entrar. Con antiteticas=True cada permutación se
+acompaña de su inversa y el par cuenta como una sola muestra (promedio de ambos aportes), lo que baja la varianza.
+
+Cada v(S) se simula con los mismos n_matches combates (números aleatorios comunes: la matriz de sorteos de cada paso
+sale siempre de la misma semilla y se repite para cada subconjunto del lote), así v(S) es una función fija de S y se
+guarda en una tabla de subconjuntos ya evaluados que se reutiliza entre permutaciones (vacío, completo y los prefijos
+cortos y largos se repiten mucho). Los subconjuntos nuevos de cada ronda de permutaciones se simulan en lotes con
+MotorLote con un plantel de variantes del luchador (una por subconjunto), repartidos en un pool de procesos.
+
+Las técnicas del repertorio que el luchador no puede ejecutar en la red no cambian ningún combate: su valor es 0 y
+no entran a las permutaciones.
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from BJJ_Catalogo import cargar_catalogo
+from BJJ_Estadisticas import Momentos, valor_z
+from BJJ_Experimentos import cargar_caso, cargar_red
+from BJJ_Lote import GANA_A, GANA_O, SORTEOS, MotorLote
+from BJJ_Motor import MAX_TIEMPO
+from BJJ_Repertorio import metrica_objetivo, tecnicas_candidatas
+
+N_PERMUTACIONES = 200
+COMBATES_SUBCONJUNTO = 1_000
+#permutaciones por ronda y subconjuntos por tarea del pool
+PERMUTACIONES_RONDA = 10
+TAMANO_TAREA = 64
+
+#red, catálogo, luchadores y horizonte del proceso actual (se cargan una vez por worker)
+_CONTEXTO = None
+
+
+def _iniciar_worker(red, catalogo, A, O, luchador, max_tiempo):
+    global _CONTEXTO
+    _CONTEXTO = (red, catalogo, A, O, luchador, max_tiempo)
+
+
+#simula un lote de subconjuntos con los mismos n combates cada uno; retorna por subconjunto
+#(probabilidad de victoria, probabilidad de sumisión) del luchador
+def _evaluar_subconjuntos(args):
+    subconjuntos, n, semilla = args
+    red, catalogo, A, O, luchador, max_tiempo = _CONTEXTO
+    k = len(subconjuntos)
+    base = A if luchador == "A" else O
+    variantes = [dict(base, repertorio=list(s)) for s in subconjuntos]
+    if luchador == "A":
+        motor = MotorLote(red, catalogo, variantes, [O], max_tiempo=max_tiempo)
+    else:
+        motor = MotorLote(red, catalogo, [A], variantes, max_tiempo=max_tiempo)
+    rng = np.random.default_rng(semilla)
+
+    #sorteos comunes: la matriz de cada paso para n combates se repite para cada subconjunto
+    def sorteos(paso):
+        return np.tile(rng.random((n, SORTEOS)), (k, 1))
+
+    indices = np.repeat(np.arange(k), n)
+    fijo = np.zeros(k * n, dtype=np.int64)
+    if luchador == "A":
+        resultado = motor.simular(k * n, None, sorteos=sorteos, luchador_A=indices, luchador_O=fijo)
+    else:
+        resultado = motor.simular(k * n, None, sorteos=sorteos, luchador_A=fijo, luchador_O=indices)
+    gana = (resultado["ganador"] == (GANA_A if luchador == "A" else GANA_O)).reshape(k, n)
+    sumision = gana & resultado["sumision"].reshape(k, n)
+    return list(zip(gana.mean(axis=1).tolist(), sumision.mean(axis=1).tolist()))
+
+
+#pool de evaluación (o evaluación en el proceso actual con workers <= 1): entrega una función map
+@contextmanager
+def _evaluador(red, catalogo, A, O, luchador, workers, max_tiempo):
+    if workers <= 1:
+        _iniciar_worker(red, catalogo, A, O, luchador, max_tiempo)
+        yield lambda tareas: map(_evaluar_subconjuntos, tareas)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                             initargs=(red, catalogo, A, O, luchador, max_tiempo)) as pool:
+        yield lambda tareas: pool.map(_evaluar_subconjuntos, tareas)
+
+
+def shapley_repertorio(case_json, luchador="A", objetivo="victoria", n_permutaciones=N_PERMUTACIONES,
+                       n_matches=COMBATES_SUBCONJUNTO, workers=1, semilla=0, antiteticas=True, confianza=0.95,
+                       red=None, catalogo=None, tamano_tarea=TAMANO_TAREA, max_tiempo=MAX_TIEMPO, verbose=False):
+    """
+    Estima el valor de Shapley de cada técnica del repertorio del luchador para metrica_objetivo(luchador, objetivo) con
+    n_permutaciones permutaciones (contando las inversas de los pares antitéticos) y n_matches combates por
+    subconjunto.
+
+    Retorna un diccionario con la tabla ordenada por valor (técnica, nombre, categoría, valor de Shapley, semiancho
+    al nivel de confianza y aporte relativo), v(vacío), v(completo), los subconjuntos simulados y las permutaciones.
+    """
+    metrica = metrica_objetivo(luchador, objetivo)
+    columna = 0 if objetivo == "victoria" else 1
+    A, O = cargar_caso(case_json)
+    red = red if red is not None else cargar_red()
+    catalogo = catalogo if catalogo is not None else cargar_catalogo("Input/Grafo_Explicito.csv")
+
+    repertorio = sorted({t.strip() for t in (A if luchador == "A" else O)["repertorio"]})
+    ejecutables = set(tecnicas_candidatas(red, catalogo, luchador))
+    jugadores = [t for t in repertorio if t in ejecutables]
+    rng = np.random.default_rng(semilla)
+    semilla_combates = np.random.SeedSequence(semilla).spawn(1)[0]
+
+    memo = {}
+    aportes = {t: Momentos() for t in jugadores}
+    permutaciones = 0
+
+    with _evaluador(red, catalogo, A, O, luchador, workers, max_tiempo) as mapear:
+
+        #simula los subconjuntos que no están en la tabla (todos con la misma semilla de combates)
+        def evaluar(subconjuntos):
+            nuevos = list(dict.fromkeys(s for s in subconjuntos if s not in memo))
+            tareas = [(nuevos[i:i + tamano_tarea], n_matches, semilla_combates)
+                      for i in range(0, len(nuevos), tamano_tarea)]
+            for tarea, valores in zip(tareas, mapear(tareas)):
+                memo.update(zip(tarea[0], valores))
+
+        #aportes marginales de cada técnica a lo largo de los prefijos de una permutación
+        def marginales(orden):
+            prefijos = [frozenset(orden[:i]) for i in range(len(orden) + 1)]
+            valores = [memo[p][columna] for p in prefijos]
+            return {t: valores[i + 1] - valores[i] for i, t in enumerate(orden)}
+
+        while permutaciones < n_permutaciones and jugadores:
+            ronda = []
+            por_grupo = 2 if antiteticas else 1
+            while len(ronda) < PERMUTACIONES_RONDA and permutaciones + len(ronda) * por_grupo < n_permutaciones:
+                orden = list(rng.permutation(jugadores))
+                ronda.append([orden, orden[::-1]] if antiteticas else [orden])
+            evaluar([frozenset(orden[:i]) for grupo in ronda for orden in grupo for i in range(len(orden) + 1)])
+            for grupo in ronda:
+                por_orden = [marginales(orden) for orden in grupo]
+                for t in jugadores:
+                    aportes[t].agregar(sum(m[t] for m in por_orden) / len(por_orden))
+            permutaciones += sum(len(grupo) for grupo in ronda)
+            if verbose:
+                print(f"{permutaciones}/{n_permutaciones} permutaciones, {len(memo)} subconjuntos simulados")
+
+        evaluar([frozenset(), frozenset(jugadores)])
+    v_vacio = memo[frozenset()][columna]
+    v_completo = memo[frozenset(jugadores)][columna]
+
+    z = valor_z(confianza)
+    filas = []
+    for t in repertorio:
+        momentos = aportes.get(t, Momentos())
+        semiancho = z * float(np.sqrt(momentos.varianza(ddof=1) / momentos.n)) if momentos.n > 1 else 0.0
+        i = catalogo.indice.get(t)
+        filas.append({
+            "tecnica": t,
+            "nombre": catalogo.nombre[i] if i is not None else "",
+            "categoria": catalogo.categoria[i] if i is not None else "desconocida",
+            "shapley": momentos.media if t in aportes else 0.0,
+            "semiancho": semiancho,
+            "ejecutable": t in ejecutables
+        })
+    tabla = pd.DataFrame(filas).sort_values("shapley", ascending=False, ignore_index=True)
+    total = v_completo - v_vacio
+    tabla["aporte_relativo"] = tabla["shapley"] / total if total else np.nan
+    tabla.insert(0, "puesto", np.arange(1, len(tabla) + 1))
+
+    return {
+        "metrica": metrica,
+        "tabla": tabla,
+        "v_vacio": v_vacio,
+        "v_completo": v_completo,
+        "subconjuntos": len(memo),
+        "permutaciones": permutaciones
+    }
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+#uso: python BJJ_Shapley.py Experimentos/Inputs/Caso1.json [A|O|AO] victoria 200 1000 4 [semilla] [carpeta]
+if __name__ == "__main__":
+    caso = sys.argv[1] if len(sys.argv) > 1 else "Experimentos/Inputs/Caso1.json"
+    roles = sys.argv[2] if len(sys.argv) > 2 else "AO"
+    objetivo = sys.argv[3] if len(sys.argv) > 3 else "victoria"
+    n_permutaciones = int(sys.argv[4]) if len(sys.argv) > 4 else N_PERMUTACIONES
+    n = int(sys.argv[5]) if len(sys.argv) > 5 else COMBATES_SUBCONJUNTO
+    workers = int(sys.argv[6]) if len(sys.argv) > 6 else 1
+    semilla = int(sys.argv[7]) if len(sys.argv) > 7 else 0
+    carpeta = sys.argv[8] if len(sys.argv) > 8 else None
+
+    for luchador in roles:
+        resultado = shapley_repertorio(caso, luchador, objetivo, n_permutaciones, n, workers, semilla, verbose=True)
+        print(f"Luchador {luchador}: {resultado['metrica']} vacío = {resultado['v_vacio']:.4f}, "
+              f"completo = {resultado['v_completo']:.4f} ({resultado['subconjuntos']} subconjuntos simulados)")
+        print(resultado["tabla"].to_string(index=False))
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+            ruta = os.path.join(carpeta, f"shapley_{luchador}_{objetivo}.csv")
+            resultado["tabla"].to_csv(ruta, index=False)
+            print(f"Tabla guardada en {ruta}")
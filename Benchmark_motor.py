@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+#Benchmark_motor - compara combates por segundo del Simulador usando snakes (modes/fire), la tabla compilada y el motor por lotes
+import json
+import sys
+import time
+
+import numpy as np
+
+from BJJ_CPN import net
+from BJJ_Compilar import compilar_red
+from BJJ_Catalogo import cargar_catalogo
+from BJJ_Lote import MotorLote
+from BJJ_Motor import Simulador
+
+INPUT_DIR = "Experimentos/Inputs/Caso1.json"
+
+
+def medir(simulador, n):
+    inicio = time.perf_counter()
+    simulador.simular(n)
+    return n / (time.perf_counter() - inicio)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with open(INPUT_DIR, "r", encoding="utf-8") as f:
+        luchadores = json.load(f)
+    catalogo = cargar_catalogo("Input/Grafo_Explicito.csv")
+    red = compilar_red(net)
+
+    #misma semilla en ambos modos: los combates simulados son idénticos, solo cambia el costo
+    snakes = Simulador(net, luchadores["A"], luchadores["O"], catalogo, semilla=0, usar_tabla=False, red=red)
+    tabla = Simulador(net, luchadores["A"], luchadores["O"], catalogo, semilla=0, usar_tabla=True, red=red)
+
+    print(f"snakes (modes/fire): {medir(snakes, n):.1f} combates/s")
+    print(f"tabla compilada:     {medir(tabla, n):.1f} combates/s")
+
+    #motor por lotes con 100 mil combates en paralelo
+    lote = MotorLote(red, catalogo, luchadores["A"], luchadores["O"])
+    inicio = time.perf_counter()
+    lote.simular(100_000, np.random.default_rng(0))
+    print(f"motor por lotes:     {100_000 / (time.perf_counter() - inicio):.1f} combates/s")
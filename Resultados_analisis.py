@@ -1,86 +1,26 @@
 import pandas as pd
 import os
 import glob
+import hashlib
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
+from BJJ_Catalogo import cargar_catalogo, info_tecnica as info_tecnica_catalogo
+from BJJ_Estadisticas import MetricasCombates
+from BJJ_Almacen import ARCHIVO_COMBATES, existe_almacen, leer_almacen
+from BJJ_LogBinario import a_dataframe, decodificar
+from BJJ_Lote import GANA_A, GANA_O
 
 #NUMERO DE CASO DE ESTUDIO (PARA OUTPUT)
 caso = "Caso de estudio 4"
 
-#CARGA DE GRAFO TECNICAS
-try:
-    #selección de columnas relevantes
-    grafo_exp = pd.read_csv(
-        "Input/Grafo_Explicito.csv",
-        usecols=["ID", "Categoría", "Tiempo Posición", "Costo Stamina", "Tiempo Ejecución", "Puntaje"]
-    )
-
-    #normalización de datos.
-    grafo_exp["ID"] = grafo_exp["ID"].astype(str).str.strip()
-    grafo_exp["Categoría"] = grafo_exp["Categoría"].astype(str).str.lower().str.strip()
-    
-    # Conversión de columnas numéricas a int
-    for col in ["Tiempo Posición", "Costo Stamina", "Tiempo Ejecución", "Puntaje"]:
-        grafo_exp[col] = (
-            grafo_exp[col]
-            .fillna(0)              # si hay valores vacíos pone 0
-            .astype(float)          # primero pasar a float por si vienen como texto
-            .astype(int)            # finalmente int
-        )
-    #debug
-    print("Carga de archivo con técnicas correcta")
-
-except Exception as e:
-    print(f"No se pudo cargar el archivo de técnicas: {e}")
-    grafo_exp = None
+#CARGA DE GRAFO TECNICAS (catálogo compartido con el simulador, indexado por ID)
+RUTA_CATALOGO = "Input/Grafo_Explicito.csv"
+catalogo = cargar_catalogo(RUTA_CATALOGO)
 
 def info_tecnica(nombre_transicion):
-    if grafo_exp is None:
-        return {
-            "tiempo_posicion": 0,
-            "categoria": "desconocida",
-            "costo_stamina": 0,
-            "tiempo_ejecucion_s": 0,
-            "puntaje": 0
-        }
-
-    # Extraer ID antes del primer "_"
-    try:
-        id_tecnica = nombre_transicion.split("_")[0]
-    except Exception:
-        id_tecnica = None
-
-    if not id_tecnica:
-        return {
-            "tiempo_posicion": 0,
-            "categoria": "desconocida",
-            "costo_stamina": 0,
-            "tiempo_ejecucion_s": 0,
-            "puntaje": 0
-        }
-
-    fila = grafo_exp[grafo_exp["ID"] == id_tecnica]
-
-    if fila.empty:
-        return {
-            "tiempo_posicion": 0,
-            "categoria": "desconocida",
-            "costo_stamina": 0,
-            "tiempo_ejecucion_s": 0,
-            "puntaje": 0
-        }
-
-    fila = fila.iloc[0]
-
-    return {
-        "tiempo_posicion": fila["Tiempo Posición"],
-        "categoria": fila["Categoría"],
-        "costo_stamina": int(fila["Costo Stamina"]),
-        "tiempo_ejecucion_s": int(fila["Tiempo Ejecución"]),
-        "puntaje": int(fila["Puntaje"])
-    }
+    return info_tecnica_catalogo(nombre_transicion, catalogo)
 
 # =========================
 # RUTAS DEL PROYECTO
@@ -97,15 +37,250 @@ BASE_OUTPUT_DIR = os.path.join(
 os.makedirs(BASE_OUTPUT_DIR, exist_ok=True)
 
 
-#FUNCION DETECTAR SUMISION
-def detectar_victoria_sumision(df):
-        for _, row in df.iterrows():
-            if row["resultado"] != "exito":
-                continue
-            info = info_tecnica(row["tecnica"])
-            if info["categoria"] == "sumisión":
-                return row["actor"]
-        return None
+#CATEGORÍA DE CADA EVENTO: un solo cruce contra el catálogo por nombre de técnica distinto
+def categorias_tecnicas(tecnicas):
+    categorias = {nombre: info_tecnica(nombre)["categoria"] for nombre in tecnicas.unique()}
+    return tecnicas.map(categorias)
+
+
+#REGISTROS DE COMBATE en un solo DataFrame con las columnas "fuente" (archivo leído) y "archivo" (combate): cada CSV
+#es un combate, cada .bjjlog (BJJ_LogBinario) puede traer varios ("archivo#combate") y el almacén del caso
+#(BJJ_Almacen) se lee completo en una sola carga (un combate por match_id, salvo los de excluir_almacen)
+def cargar_registros(csv_files, log_files, input_dir=None, excluir_almacen=None):
+    partes = []
+    if input_dir is not None and existe_almacen(input_dir):
+        _, eventos, diccionario = leer_almacen(input_dir)
+        if excluir_almacen is not None and len(excluir_almacen):
+            eventos = eventos[~np.isin(eventos["match_id"], excluir_almacen)]
+        df_eventos = decodificar(eventos, diccionario, "match_id")
+        df_eventos["archivo"] = df_eventos.pop("match_id").astype(str)
+        partes.append(df_eventos.assign(fuente=ARCHIVO_COMBATES))
+    for file in csv_files:
+        partes.append(pd.read_csv(file).assign(fuente=os.path.basename(file), archivo=os.path.basename(file)))
+    for file in log_files:
+        df_log = a_dataframe(file).sort_values("combate", kind="stable")
+        df_log["archivo"] = os.path.basename(file) + "#" + df_log.pop("combate").astype(str)
+        partes.append(df_log.assign(fuente=os.path.basename(file)))
+    return pd.concat(partes, ignore_index=True)
+
+
+#MÉTRICAS POR COMBATE con groupby sobre todos los registros (una fila por archivo, en el orden de lectura), con su
+#fuente y el actor que ganó por sumisión (NaN si no hubo)
+def metricas_por_archivo(df):
+    g = df.groupby("archivo", sort=False)
+    finales = g[["fuente", "tiempo", "puntaje_A", "puntaje_O"]].last()
+    varianzas = g[["puntaje_A", "puntaje_O"]].var()
+
+    # Mantención promedio y efectividad por actor (0 si el actor no tiene acciones)
+    exito = df["resultado"] == "exito"
+    por_actor = (
+        df.assign(exito=exito)
+        .groupby(["archivo", "actor"], sort=False)
+        .agg(mantencion=("mantencion", "mean"), efectividad=("exito", "mean"))
+        .unstack("actor")
+        .reindex(index=finales.index, columns=pd.MultiIndex.from_product([["mantencion", "efectividad"], ["A", "O"]]))
+        .fillna(0)
+    )
+
+    # Primera técnica de sumisión exitosa de cada combate
+    sumision = exito & (categorias_tecnicas(df["tecnica"]) == "sumisión")
+    ganador_sumision = df[sumision].groupby("archivo", sort=False)["actor"].first().reindex(finales.index)
+
+    return pd.DataFrame({
+        "fuente": finales["fuente"].to_numpy(),
+        "archivo": finales.index,
+        "tiempo_combate": finales["tiempo"].to_numpy(),
+        "puntaje_A": finales["puntaje_A"].to_numpy(),
+        "puntaje_O": finales["puntaje_O"].to_numpy(),
+        "var_puntaje_A": varianzas["puntaje_A"].to_numpy(),
+        "var_puntaje_O": varianzas["puntaje_O"].to_numpy(),
+        "mantencion_A": por_actor[("mantencion", "A")].to_numpy(),
+        "mantencion_O": por_actor[("mantencion", "O")].to_numpy(),
+        "efectividad_A": por_actor[("efectividad", "A")].to_numpy() * 100,
+        "efectividad_O": por_actor[("efectividad", "O")].to_numpy() * 100,
+        "ganador_sumision": ganador_sumision.to_numpy()
+    })
+
+
+#MÉTRICAS DE LOS COMBATES DEL ALMACÉN SIN EVENTOS (guardados con guardar_eventos=False, o anexados sin eventos), salvo
+#los de excluir: tiempo, puntajes y ganador por sumisión salen del registro de combate; varianzas, mantención y
+#efectividad quedan en NaN (no entran a sus promedios ni percentiles)
+def metricas_sin_eventos(input_dir, con_eventos, excluir=None):
+    combates, _, _ = leer_almacen(input_dir)
+    ids = np.asarray(combates["match_id"])
+    conocidos = np.array([int(i) for i in con_eventos], dtype=np.uint64)
+    if excluir is not None and len(excluir):
+        conocidos = np.concatenate([conocidos, np.asarray(excluir, dtype=np.uint64)])
+    combates = combates[~np.isin(ids, conocidos)]
+    if len(combates) == 0:
+        return pd.DataFrame(columns=COLUMNAS_METRICAS)
+    print(f"Aviso: {len(combates)} combates del almacén sin eventos; se resumen desde {ARCHIVO_COMBATES} "
+          f"(tiempo, puntajes y ganador, sin mantención ni efectividad)")
+    ganador = np.asarray(combates["ganador"])
+    sumision = np.asarray(combates["sumision"]).astype(bool)
+    faltante = np.full(len(combates), np.nan)
+    return pd.DataFrame({
+        "fuente": ARCHIVO_COMBATES,
+        "archivo": np.asarray(combates["match_id"]).astype(str),
+        "tiempo_combate": np.asarray(combates["tiempo"]),
+        "puntaje_A": np.asarray(combates["puntaje_A"]),
+        "puntaje_O": np.asarray(combates["puntaje_O"]),
+        "var_puntaje_A": faltante,
+        "var_puntaje_O": faltante,
+        "mantencion_A": faltante,
+        "mantencion_O": faltante,
+        "efectividad_A": faltante,
+        "efectividad_O": faltante,
+        "ganador_sumision": np.where(sumision & (ganador == GANA_A), "A",
+                                     np.where(sumision & (ganador == GANA_O), "O", None)).astype(object)
+    })
+
+
+#FRECUENCIA DE TÉCNICAS (ID) POR COMBATE Y ACTOR, en orden de aparición
+def transiciones_por_archivo(df):
+    return (
+        df.assign(tecnica=df["tecnica"].str.split("_").str[0])
+        .groupby(["fuente", "archivo", "actor", "tecnica"], sort=False)
+        .size()
+        .reset_index(name="n")
+    )
+
+
+#FRECUENCIA TOTAL POR ACTOR: filas con las técnicas de A en orden de aparición y luego las que solo usó O
+def conteo_transiciones(transiciones):
+    orden = pd.unique(pd.concat([
+        transiciones.loc[transiciones["actor"] == "A", "tecnica"],
+        transiciones.loc[transiciones["actor"] == "O", "tecnica"]
+    ]))
+    conteo = transiciones.groupby(["tecnica", "actor"])["n"].sum().unstack("actor", fill_value=0)
+    return conteo.reindex(index=orden, columns=["A", "O"], fill_value=0)
+
+
+# =========================
+# CACHÉ INCREMENTAL POR ARCHIVO
+# =========================
+#junto a resumen_por_archivo.csv: la huella de cada fuente de registros (ruta, tamaño, mtime y hash del contenido) y
+#las métricas y transiciones de sus combates. Solo se reprocesan las fuentes nuevas o modificadas; del almacén, que es
+#de solo anexado, solo los match_id que no estaban en la caché. Si cambia el catálogo se descarta la caché completa.
+CACHE_FUENTES = "cache_fuentes.csv"
+CACHE_METRICAS = "cache_metricas.csv"
+CACHE_TRANSICIONES = "cache_transiciones.csv"
+
+COLUMNAS_FUENTES = ["fuente", "tamano", "mtime_ns", "hash", "hash_catalogo"]
+COLUMNAS_METRICAS = [
+    "fuente", "archivo", "tiempo_combate", "puntaje_A", "puntaje_O", "var_puntaje_A", "var_puntaje_O",
+    "mantencion_A", "mantencion_O", "efectividad_A", "efectividad_O", "ganador_sumision"
+]
+COLUMNAS_TRANSICIONES = ["fuente", "archivo", "actor", "tecnica", "n"]
+TEXTOS_CACHE = {columna: str for columna in ("fuente", "archivo", "hash", "hash_catalogo", "actor", "tecnica",
+                                             "ganador_sumision")}
+
+
+def hash_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+#fuentes de registros de la carpeta en orden de lectura: [(nombre, ruta)]
+def fuentes_registros(input_dir, csv_files, log_files):
+    fuentes = []
+    if existe_almacen(input_dir):
+        fuentes.append((ARCHIVO_COMBATES, os.path.join(input_dir, ARCHIVO_COMBATES)))
+    return fuentes + [(os.path.basename(file), file) for file in csv_files + log_files]
+
+
+#(fuentes, métricas, transiciones) de la caché; vacías si no existe o si se calculó con otro catálogo
+def cargar_cache(output_dir, hash_catalogo):
+    rutas = [os.path.join(output_dir, nombre) for nombre in (CACHE_FUENTES, CACHE_METRICAS, CACHE_TRANSICIONES)]
+    vacia = tuple(pd.DataFrame(columns=columnas)
+                  for columnas in (COLUMNAS_FUENTES, COLUMNAS_METRICAS, COLUMNAS_TRANSICIONES))
+    if not all(os.path.exists(ruta) for ruta in rutas):
+        return vacia
+    cache = tuple(pd.read_csv(ruta, dtype=TEXTOS_CACHE, float_precision="round_trip") for ruta in rutas)
+    if (cache[0]["hash_catalogo"] != hash_catalogo).any():
+        print("Catálogo modificado: se descarta la caché de análisis")
+        return vacia
+    return cache
+
+
+#escribe cada tabla a un temporal y lo renombra, así un corte no deja la caché a medio escribir
+def guardar_cache(output_dir, fuentes, metricas, transiciones):
+    for nombre, tabla in ((CACHE_METRICAS, metricas), (CACHE_TRANSICIONES, transiciones), (CACHE_FUENTES, fuentes)):
+        ruta = os.path.join(output_dir, nombre)
+        tabla.to_csv(ruta + ".tmp", index=False)
+        os.replace(ruta + ".tmp", ruta)
+
+
+#MÉTRICAS Y TRANSICIONES POR COMBATE de toda la carpeta, procesando solo lo que no está vigente en la caché
+def metricas_incrementales(input_dir, output_dir, csv_files, log_files):
+    hash_catalogo = hash_archivo(RUTA_CATALOGO)
+    cache_fuentes, cache_metricas, cache_transiciones = cargar_cache(output_dir, hash_catalogo)
+    previas = cache_fuentes.set_index("fuente")
+
+    fuentes = fuentes_registros(input_dir, csv_files, log_files)
+    huellas, vigentes, csv_nuevos, log_nuevos = [], set(), [], []
+    almacen_modificado = False
+    for fuente, ruta in fuentes:
+        estado = os.stat(ruta)
+        huella = {"fuente": fuente, "tamano": estado.st_size, "mtime_ns": estado.st_mtime_ns, "hash": None,
+                  "hash_catalogo": hash_catalogo}
+        previa = previas.loc[fuente] if fuente in previas.index else None
+        # Mismo tamaño y mtime: vigente sin leer el archivo; si no, decide el hash del contenido
+        if previa is not None and (previa["tamano"], previa["mtime_ns"]) == (estado.st_size, estado.st_mtime_ns):
+            huella["hash"] = previa["hash"]
+        else:
+            huella["hash"] = hash_archivo(ruta)
+        huellas.append(huella)
+
+        if previa is not None and huella["hash"] == previa["hash"]:
+            vigentes.add(fuente)
+        elif fuente == ARCHIVO_COMBATES:
+            almacen_modificado = True
+        elif ruta.endswith(".bjjlog"):
+            log_nuevos.append(ruta)
+        else:
+            csv_nuevos.append(ruta)
+
+    conservar_metricas = cache_metricas["fuente"].isin(vigentes)
+    conservar_transiciones = cache_transiciones["fuente"].isin(vigentes)
+    excluir_almacen = None
+    if almacen_modificado:
+        # Almacén de solo anexado: los combates ya analizados que sigue teniendo se toman de la caché
+        combates, _, _ = leer_almacen(input_dir)
+        ids = pd.Index(np.asarray(combates["match_id"]).astype(str))
+        del_almacen = cache_metricas["fuente"] == ARCHIVO_COMBATES
+        conservar_metricas |= del_almacen & cache_metricas["archivo"].isin(ids)
+        conservar_transiciones |= ((cache_transiciones["fuente"] == ARCHIVO_COMBATES)
+                                   & cache_transiciones["archivo"].isin(ids))
+        excluir_almacen = np.array([int(i) for i in cache_metricas.loc[conservar_metricas & del_almacen, "archivo"]],
+                                   dtype=np.uint64)
+
+    metricas = [cache_metricas[conservar_metricas]]
+    transiciones = [cache_transiciones[conservar_transiciones]]
+    if csv_nuevos or log_nuevos or almacen_modificado:
+        df = cargar_registros(csv_nuevos, log_nuevos, input_dir if almacen_modificado else None, excluir_almacen)
+        if len(df):
+            metricas.append(metricas_por_archivo(df))
+            transiciones.append(transiciones_por_archivo(df))
+        if almacen_modificado:
+            del_almacen = df.loc[df["fuente"] == ARCHIVO_COMBATES, "archivo"].unique() if len(df) else []
+            metricas.append(metricas_sin_eventos(input_dir, del_almacen, excluir_almacen))
+    print(f"Caché de análisis: {len(vigentes)} de {len(fuentes)} fuentes vigentes, "
+          f"{sum(len(m) for m in metricas[1:])} combates procesados")
+
+    # Orden de lectura de las fuentes (dentro de una fuente, lo cacheado va antes que lo anexado)
+    orden = {fuente: i for i, (fuente, _) in enumerate(fuentes)}
+    metricas = pd.concat([m for m in metricas if len(m)] or metricas[:1], ignore_index=True)
+    metricas = metricas.iloc[np.argsort(metricas["fuente"].map(orden).to_numpy(), kind="stable")]
+    transiciones = pd.concat([t for t in transiciones if len(t)] or transiciones[:1], ignore_index=True)
+    transiciones = transiciones.iloc[np.argsort(transiciones["fuente"].map(orden).to_numpy(), kind="stable")]
+
+    guardar_cache(output_dir, pd.DataFrame(huellas, columns=COLUMNAS_FUENTES),
+                  metricas[COLUMNAS_METRICAS], transiciones[COLUMNAS_TRANSICIONES])
+    return metricas.reset_index(drop=True), transiciones.reset_index(drop=True)
 
 
 # =========================
@@ -114,159 +289,26 @@ def detectar_victoria_sumision(df):
 def analyze_folder(input_dir, output_dir):
 
     csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
+    log_files = sorted(glob.glob(os.path.join(input_dir, "*.bjjlog")))
 
-    if not csv_files:
+    if not csv_files and not log_files and not existe_almacen(input_dir):
         raise RuntimeError("No se encontraron archivos CSV en la ruta definida.")
 
-    per_file_metrics = []
-    heatmap_data = {"A": {}, "O": {}}
-
-    # =========================
-    # CONTADORES GLOBALES DE VICTORIAS
-    # =========================
-    victorias_sum_A = 0
-    victorias_sum_O = 0
-    victorias_puntos_A = 0
-    victorias_puntos_O = 0
-
-
     # =========================
     # PROCESAMIENTO POR ARCHIVO
     # =========================
-    for file in csv_files:
-        df = pd.read_csv(file)
-
-        # Duración del combate
-        tiempo_total = df["tiempo"].iloc[-1]
-
-        # Puntaje final
-        puntaje_A = df["puntaje_A"].iloc[-1]
-        puntaje_O = df["puntaje_O"].iloc[-1]
-
-        # --- Varianza de puntaje interna (fluctuación dentro del combate)
-        var_puntaje_A = df["puntaje_A"].var()
-        var_puntaje_O = df["puntaje_O"].var()
-
-        # Mantención promedio por actor
-        mant_A = df[df["actor"] == "A"]["mantencion"]
-        mant_O = df[df["actor"] == "O"]["mantencion"]
-
-        prom_mant_A = mant_A.mean() if not mant_A.empty else 0
-        prom_mant_O = mant_O.mean() if not mant_O.empty else 0
-
-        # Efectividad por actor
-        acciones_A = df[df["actor"] == "A"]
-        acciones_O = df[df["actor"] == "O"]
-
-        efec_A = (
-            (acciones_A["resultado"] == "exito").sum() / len(acciones_A)
-            if len(acciones_A) > 0 else 0
-        )
-        efec_O = (
-            (acciones_O["resultado"] == "exito").sum() / len(acciones_O)
-            if len(acciones_O) > 0 else 0
-        )
-         # --- Detección de victoria
-        ganador_sumision = detectar_victoria_sumision(df)
-
-        # =========================
-        # CONTEO DE VICTORIAS (SUMISIÓN / PUNTOS)
-        # =========================
-        if ganador_sumision == "A":
-            victorias_sum_A += 1
-        elif ganador_sumision == "O":
-            victorias_sum_O += 1
-        else:
-            # Victoria por puntos (o empate)
-            if puntaje_A > puntaje_O:
-                victorias_puntos_A += 1
-            elif puntaje_O > puntaje_A:
-                victorias_puntos_O += 1        
-
-        # Datos para heatmap
-        for _, row in df.iterrows():
-            actor = row["actor"]
-            tecnica = row["tecnica"].split("_")[0]
-
-            heatmap_data.setdefault(actor, {})
-            heatmap_data[actor][tecnica] = heatmap_data[actor].get(tecnica, 0) + 1
-
-        per_file_metrics.append({
-            "archivo": os.path.basename(file),
-            "tiempo_combate": tiempo_total,
-            "puntaje_A": puntaje_A,
-            "puntaje_O": puntaje_O,
-            "var_puntaje_A": var_puntaje_A,
-            "var_puntaje_O": var_puntaje_O,
-            "mantencion_A": prom_mant_A,
-            "mantencion_O": prom_mant_O,
-            "efectividad_A": efec_A * 100,
-            "efectividad_O": efec_O * 100
-        })
-
-    df_summary = pd.DataFrame(per_file_metrics)
-
-    # =========================
-    # DDESVIACIÓN ESTANDAR ENTRE COMBATES
-    # =========================
-    std_tiempo_combates = df_summary["tiempo_combate"].std(ddof=0)
-
-    std_puntaje_A_combates = df_summary["puntaje_A"].std(ddof=0)
-    std_puntaje_O_combates = df_summary["puntaje_O"].std(ddof=0)
+    metricas, transiciones = metricas_incrementales(input_dir, output_dir, csv_files, log_files)
+    df_summary = metricas.drop(columns=["fuente", "ganador_sumision"])
+    ganador_sumision = metricas["ganador_sumision"].to_numpy()
 
     # =========================
-    # VICTORIAS TOTALES Y PROBABILIDAD
+    # MÉTRICAS GLOBALES (agregado en línea de BJJ_Estadisticas, con sketches de cuantiles)
     # =========================
-    victorias_A = victorias_sum_A + victorias_puntos_A
-    victorias_O = victorias_sum_O + victorias_puntos_O
-
-    total_victorias = victorias_A + victorias_O
-
-    prob_sumision_A = (victorias_sum_A / victorias_A * 100) if victorias_A > 0 else 0
-    prob_sumision_O = (victorias_sum_O / victorias_O * 100) if victorias_O > 0 else 0
-
-    prob_victoria_A = (victorias_A / total_victorias * 100) if total_victorias > 0 else 0
-    prob_victoria_O = (victorias_O / total_victorias * 100) if total_victorias > 0 else 0
-
-    # =========================
-    # MÉTRICAS GLOBALES
-    # =========================
-    metrics = {
-        "tiempo_promedio": df_summary["tiempo_combate"].mean(),
-        "std_tiempo_combates": std_tiempo_combates,
-        "victorias_A": victorias_A,
-        "victorias_O": victorias_O,
-        "victorias_sum_A": victorias_sum_A,
-        "victorias_sum_O": victorias_sum_O,
-        "victorias_puntos_A": victorias_puntos_A,
-        "victorias_puntos_O": victorias_puntos_O,
-        "prob_victoria_A_pct": prob_victoria_A,
-        "prob_victoria_O_pct": prob_victoria_O,
-        "prob_sumision_A": prob_sumision_A,
-        "prob_sumision_O": prob_sumision_O,
-        "puntaje_A_prom": df_summary["puntaje_A"].mean(),
-        "puntaje_O_prom": df_summary["puntaje_O"].mean(),
-        "std_puntaje_A_combates": std_puntaje_A_combates,
-        "std_puntaje_O_combates": std_puntaje_O_combates,
-        "mantencion_A_prom": df_summary["mantencion_A"].mean(),
-        "mantencion_O_prom": df_summary["mantencion_O"].mean(),
-        "coef_var_mant_A": (
-            df_summary["mantencion_A"].std(ddof=0) /
-            df_summary["mantencion_A"].mean()
-            if df_summary["mantencion_A"].mean() > 0 else 0
-        ),
-        "coef_var_mant_O": (
-            df_summary["mantencion_O"].std(ddof=0) /
-            df_summary["mantencion_O"].mean()
-            if df_summary["mantencion_O"].mean() > 0 else 0
-        ),
-        "efectividad_A_prom": df_summary["efectividad_A"].mean(),
-        "efectividad_O_prom": df_summary["efectividad_O"].mean()
-    }
-
-
-
-
+    agregado = MetricasCombates().agregar_resumen(df_summary, ganador_sumision)
+    metrics = agregado.metricas()
+    victorias_A, victorias_O = metrics["victorias_A"], metrics["victorias_O"]
+    victorias_sum_A, victorias_sum_O = metrics["victorias_sum_A"], metrics["victorias_sum_O"]
+    victorias_puntos_A, victorias_puntos_O = metrics["victorias_puntos_A"], metrics["victorias_puntos_O"]
 
     df_metrics = pd.DataFrame([metrics])
 
@@ -281,12 +323,17 @@ def analyze_folder(input_dir, output_dir):
         os.path.join(output_dir, f"metricas_general.csv"),
         index=False
     )
+    agregado.tabla_percentiles().to_csv(
+        os.path.join(output_dir, "percentiles.csv"),
+        index=False
+    )
+    agregado.guardar(os.path.join(output_dir, "estadisticas.json"))
 
     # =========================
-    # BOXPLOT – TIEMPOS
+    # BOXPLOT – TIEMPOS (desde el sketch de cuantiles)
     # =========================
     plt.figure()
-    plt.boxplot(df_summary["tiempo_combate"], vert=False)
+    plt.gca().bxp([agregado.cuantiles["tiempo_combate"].boxplot()], orientation="horizontal")
     plt.title("Distribución del tiempo de combate")
     plt.xlabel("Tiempo")
     plt.savefig(
@@ -297,7 +344,7 @@ def analyze_folder(input_dir, output_dir):
     # =========================
     # HEATMAP TRANSICIONES
     # =========================
-    heatmap_df = pd.DataFrame(heatmap_data).fillna(0)
+    heatmap_df = conteo_transiciones(transiciones)
 
     plt.figure(figsize=(10, 6))
     plt.imshow(heatmap_df, aspect="auto")